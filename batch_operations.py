@@ -0,0 +1,150 @@
+#region - Imports
+
+
+# First-party
+import os
+import time
+import threading
+
+
+#endregion
+#region - Constants
+
+
+SAME_DEVICE_WORKERS = 2  # Renames only touch directory entries, more threads add little
+OTHER_DEVICE_WORKERS = 4  # Copies to another disk or a network share are latency bound
+REPORT_INTERVAL = 0.25  # Seconds between progress reports of run_batch
+
+
+def choose_workers(source_folder, target_folder):
+    """Return the number of worker threads for transfers between two folders."""
+    try:
+        same_device = os.stat(source_folder).st_dev == os.stat(target_folder).st_dev
+    except OSError:
+        same_device = False
+    return SAME_DEVICE_WORKERS if same_device else OTHER_DEVICE_WORKERS
+
+
+#endregion
+#region - BatchOperation
+
+
+class BatchOperation:
+    """
+    Runs a file operation over many paths on worker threads.
+
+    Nothing here touches Tk, the UI thread polls the counters and collects the
+    results once finished is set.
+
+    Args:
+        paths (list): Source paths
+        operation (callable): operation(source, destination) performs the transfer
+        allocate (callable): allocate(source) returns the destination path, calls are serialized
+        workers (int): Number of worker threads
+    """
+    def __init__(self, paths, operation, allocate, workers=SAME_DEVICE_WORKERS):
+        self.paths = list(paths)
+        self.operation = operation
+        self.allocate = allocate
+        self.workers = max(1, min(workers, len(self.paths)))
+        self.done = []  # (source, destination)
+        self.errors = []  # (source, message)
+        self.cancelled = threading.Event()
+        self.finished = threading.Event()
+        self.started = None
+        self.elapsed = 0.0
+        self._next = 0
+        self._running = 0
+        self._lock = threading.Lock()
+
+
+    def start(self):
+        self.started = time.perf_counter()
+        if not self.paths:
+            self.finished.set()
+            return
+        self._running = self.workers
+        for _ in range(self.workers):
+            threading.Thread(target=self._work, daemon=True).start()
+
+
+    def cancel(self):
+        """Stop after the transfers already in progress, finished files stay where they are."""
+        self.cancelled.set()
+
+
+    @property
+    def processed(self):
+        return len(self.done) + len(self.errors)
+
+
+    def throughput(self):
+        """Files per second so far."""
+        elapsed = self.elapsed if self.finished.is_set() else time.perf_counter() - self.started
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+
+    def _work(self):
+        try:
+            while not self.cancelled.is_set():
+                with self._lock:
+                    if self._next >= len(self.paths):
+                        break
+                    source = self.paths[self._next]
+                    self._next += 1
+                    try:
+                        destination = self.allocate(source)
+                    except Exception as e:
+                        self.errors.append((source, str(e)))
+                        continue
+                try:
+                    self.operation(source, destination)
+                except Exception as e:
+                    with self._lock:
+                        self.errors.append((source, str(e)))
+                    continue
+                with self._lock:
+                    self.done.append((source, destination))
+        finally:
+            with self._lock:
+                self._running -= 1
+                if self._running == 0:
+                    self.elapsed = time.perf_counter() - self.started
+                    self.finished.set()
+
+
+#endregion
+#region - Headless
+
+
+def run_batch(batch, progress, verb, unit="files"):
+    """
+    Start a batch and block until it finishes, for callers without a UI thread to poll from.
+
+    Works with BatchOperation and MetadataExport. Ctrl+C cancels the batch
+    and waits for the transfers in progress, like the Cancel button does.
+
+    Args:
+        batch (BatchOperation): Batch to run, not started yet
+        progress (object): Reporter with update and close
+        verb (str): Shown before the counts, like "Moved"
+        unit (str): Shown in the throughput
+    """
+    total = len(batch.paths)
+    batch.start()
+    while True:
+        try:
+            finished = batch.finished.wait(REPORT_INTERVAL)
+        except KeyboardInterrupt:
+            batch.cancel()
+            continue
+        processed = batch.processed
+        status = "Cancelling..." if batch.cancelled.is_set() and not finished else f"{verb} {processed} of {total} ({batch.throughput():.0f} {unit}/s)"
+        progress.update(processed / total * 100 if total else 100, status, process_events=False)
+        if finished:
+            break
+    progress.close()
+    return batch
+
+
+#endregion
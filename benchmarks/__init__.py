@@ -0,0 +1,7 @@
+"""
+Benchmarks of Image-Watcher's hot paths, run on synthetic image folders.
+
+Run from the repository folder:
+    python -m benchmarks --files 1000,10000 --output results.json
+    python -m benchmarks --files 1000 --compare results.json
+"""
@@ -0,0 +1,4 @@
+from benchmarks.run_benchmarks import main
+
+
+main()
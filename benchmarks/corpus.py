@@ -0,0 +1,199 @@
+#region - Imports
+
+
+# First-party
+import io
+import os
+import json
+import zlib
+import random
+import struct
+import argparse
+
+# Third-party
+from PIL import Image, ImageDraw
+
+
+#endregion
+#region - Constants
+
+
+CORPUS_SCHEMA = 1
+MANIFEST_FILENAME = "corpus.json"
+# Image sizes with their weights, "small" keeps 200k files to a few GB
+PROFILES = {
+    "small": (((64, 64), 5), ((128, 192), 3), ((256, 256), 2)),
+    "realistic": (((512, 512), 4), ((512, 768), 3), ((768, 512), 2), ((1024, 1024), 1)),
+}
+FORMATS = ((".png", 85), (".jpg", 10), (".webp", 5))
+VARIANTS_PER_SIZE = 24  # Distinct pictures per size, files sharing one are near-duplicates
+MTIME_START = 1_700_000_000  # Fixed mtimes, so every run sorts the corpus the same way
+MTIME_STEP = 7
+IHDR_END = 33  # PNG signature and IHDR chunk, the parameters chunk goes right after them
+GENERATED_FILES = ("IW_database.json", "IW_index.json", "IW_searches.json")
+
+SUBJECTS = ("castle", "forest", "portrait of a knight", "city street", "mountain lake", "dragon", "space station",
+            "cat", "lighthouse", "desert ruins", "robot", "flower field", "harbor at dawn", "wizard tower")
+STYLES = ("oil painting", "watercolor", "digital art", "photograph", "concept art", "anime style", "pencil sketch",
+          "cinematic lighting", "volumetric fog", "highly detailed", "8k", "sharp focus", "soft light", "night")
+NEGATIVES = ("blurry", "lowres", "bad anatomy", "watermark", "text", "jpeg artifacts", "deformed", "extra fingers",
+             "cropped", "worst quality", "signature", "oversaturated")
+SAMPLERS = ("Euler a", "Euler", "DPM++ 2M", "DPM++ SDE", "DPM++ 2M SDE", "DDIM", "UniPC", "Heun")
+SCHEDULES = ("Automatic", "Karras", "Exponential", "SGM Uniform")
+MODELS = ("sd_xl_base_1.0", "dreamshaper_8", "realisticVision_v51", "juggernautXL_v9", "animagine_xl_3.1", "v1-5-pruned-emaonly")
+
+
+#endregion
+#region - Generation
+
+
+def parameters_text(rng, width, height):
+    """Return an A1111 style 'parameters' text: prompt, negative prompt and the settings line."""
+    positive = ", ".join([rng.choice(SUBJECTS)] + rng.sample(STYLES, rng.randint(2, 6)))
+    negative = ", ".join(rng.sample(NEGATIVES, rng.randint(1, 6)))
+    settings = [
+        f"Steps: {rng.choice((20, 25, 28, 30, 35, 40, 50))}",
+        f"Sampler: {rng.choice(SAMPLERS)}",
+        f"Schedule type: {rng.choice(SCHEDULES)}",
+        f"CFG scale: {rng.choice((3.5, 4, 5, 5.5, 6, 7, 7.5, 9))}",
+        f"Seed: {rng.randrange(2 ** 32)}",
+        f"Size: {width}x{height}",
+        f"Model hash: {rng.getrandbits(40):010x}",
+        f"Model: {rng.choice(MODELS)}",
+    ]
+    if rng.random() < 0.3:
+        settings.append(f"Denoising strength: {rng.choice((0.3, 0.45, 0.55, 0.7))}")
+    if rng.random() < 0.4:
+        settings.append("Clip skip: 2")
+    return f"{positive}\nNegative prompt: {negative}\n{', '.join(settings)}"
+
+
+def draw_variant(rng, size):
+    """Return a picture of random shapes on a gradient, which compresses like a real render."""
+    width, height = size
+    image = Image.linear_gradient("L").resize(size).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    for _ in range(6):
+        x0, y0 = rng.randrange(width), rng.randrange(height)
+        x1, y1 = x0 + rng.randint(4, width // 2), y0 + rng.randint(4, height // 2)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        if rng.random() < 0.5:
+            draw.ellipse((x0, y0, x1, y1), fill=color)
+        else:
+            draw.rectangle((x0, y0, x1, y1), fill=color)
+    return image
+
+
+def encode(image, ext):
+    buffer = io.BytesIO()
+    image.save(buffer, {".png": "PNG", ".jpg": "JPEG", ".webp": "WEBP"}[ext])
+    return buffer.getvalue()
+
+
+def png_with_parameters(base_png, text):
+    """Insert a 'parameters' tEXt chunk after IHDR, without encoding the pixels again."""
+    data = b"parameters\x00" + text.encode("latin-1", "replace")
+    chunk = struct.pack(">I", len(data)) + b"tEXt" + data + struct.pack(">I", zlib.crc32(b"tEXt" + data))
+    return base_png[:IHDR_END] + chunk + base_png[IHDR_END:]
+
+
+def jpeg_with_comment(base_jpeg, text):
+    """Insert a COM segment after SOI so every file has its own content fingerprint."""
+    data = text.encode("latin-1", "replace")[:65533]
+    return base_jpeg[:2] + b"\xff\xfe" + struct.pack(">H", len(data) + 2) + data + base_jpeg[2:]
+
+
+def read_manifest(folder):
+    try:
+        with open(os.path.join(folder, MANIFEST_FILENAME), 'r', encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def generate_corpus(folder, files, profile="small", seed=0):
+    """
+    Fill a folder with a reproducible set of images and return its manifest.
+
+    The same files, profile and seed always give the same bytes and mtimes.
+    A folder already holding that corpus is reused as it is, apart from the
+    database and index files, which are removed so every run starts cold.
+
+    Args:
+        folder (str): Corpus folder, created if needed
+        files (int): Number of images
+        profile (str): A key of PROFILES
+        seed (int): Random seed
+    """
+    manifest = {"schema": CORPUS_SCHEMA, "files": files, "profile": profile, "seed": seed}
+    os.makedirs(folder, exist_ok=True)
+    existing = read_manifest(folder)
+    if existing is None and os.listdir(folder):
+        raise ValueError(f"{folder} is not empty and holds no corpus, refusing to replace its files")
+    for name in GENERATED_FILES:
+        try:
+            os.remove(os.path.join(folder, name))
+        except FileNotFoundError:
+            pass
+    if existing and all(existing.get(key) == value for key, value in manifest.items()):
+        return existing
+    for entry in os.scandir(folder):
+        if entry.is_file():
+            os.remove(entry.path)
+    rng = random.Random(seed)
+    sizes, size_weights = zip(*PROFILES[profile])
+    extensions, format_weights = zip(*FORMATS)
+    bases = {}  # {(size, variant, ext): encoded bytes}
+    variants = {}  # {(size, variant): image}
+    total_bytes = 0
+    formats = dict.fromkeys(extensions, 0)
+    for i in range(files):
+        size = rng.choices(sizes, size_weights)[0]
+        ext = rng.choices(extensions, format_weights)[0]
+        variant = rng.randrange(VARIANTS_PER_SIZE)
+        text = parameters_text(rng, *size)
+        if (size, variant) not in variants:
+            variants[(size, variant)] = draw_variant(random.Random(f"{seed}-{size}-{variant}"), size)
+        if ext == ".webp":
+            # No metadata chunk to vary, change one pixel so the file is unique
+            image = variants[(size, variant)].copy()
+            image.putpixel((rng.randrange(size[0]), rng.randrange(size[1])), (rng.randrange(256), 0, 0))
+            data = encode(image, ext)
+        else:
+            key = (size, variant, ext)
+            if key not in bases:
+                bases[key] = encode(variants[(size, variant)], ext)
+            data = png_with_parameters(bases[key], text) if ext == ".png" else jpeg_with_comment(bases[key], text)
+        path = os.path.join(folder, f"{i:06d}-{rng.randrange(10 ** 9)}{ext}")
+        with open(path, 'wb') as f:
+            f.write(data)
+        mtime = MTIME_START + i * MTIME_STEP
+        os.utime(path, (mtime, mtime))
+        total_bytes += len(data)
+        formats[ext] += 1
+    manifest.update(total_bytes=total_bytes, formats=formats)
+    with open(os.path.join(folder, MANIFEST_FILENAME), 'w', encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+#endregion
+#region - Main
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic folder of images with Stable Diffusion metadata.")
+    parser.add_argument("folder")
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    manifest = generate_corpus(args.folder, args.files, args.profile, args.seed)
+    print(json.dumps(manifest, indent=2))
+
+
+if __name__ == "__main__":
+    main()
+
+
+#endregion
@@ -0,0 +1,348 @@
+#region - Imports
+
+
+# First-party
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+# Third-party
+import PIL
+from PIL import Image
+
+# Local
+from benchmarks.corpus import generate_corpus, PROFILES
+from image_manager import ImageManager
+from image_database_manager import DatabaseManager
+from filter_cache import FilterCache, FilterQuery, find_matches
+from metadata_export import MetadataExport, EXPORT_FORMATS
+from batch_operations import BatchOperation, SAME_DEVICE_WORKERS
+from file_transfer import move_file, copy_file
+from name_allocator import NameAllocator
+from watch_folder import VALID_EXTENSIONS, SAVED_FOLDER_NAME, IMAGE_DB_FILENAME, FILTER_FIELDS
+
+
+#endregion
+#region - Constants
+
+
+RESULTS_SCHEMA = 1
+ACTIVE_FILTERS = list(FILTER_FIELDS)
+
+STAGES = ("index", "database", "filter", "display", "export", "move")
+FILTER_QUERIES = (
+    ("single_term", "castle"),
+    ("and_terms", "castle night"),
+    ("or_terms", "castle ~ dragon"),
+    ("not_term", "-blurry"),
+    ("phrase", '"oil painting"'),
+    ("predicate", "steps>=30"),
+    ("predicate_range", "cfg:5..7"),
+    ("category", "sampler:dpm"),
+    ("predicate_and_term", "steps>=30 castle -watermark"),
+    ("similar_groups", "similar:*"),
+)
+TYPING_SEQUENCE = ("c", "ca", "cas", "cast", "castl", "castle", "castle n", "castle ni", "castle nig", "castle nigh", "castle night")
+DISPLAY_SIZE = (800, 600)
+DISPLAY_SAMPLE = 50  # Images decoded per display measurement
+TRANSFER_SAMPLE = 1000  # Files moved or copied per transfer measurement
+DEFAULT_CORPUS_ROOT = os.path.join(tempfile.gettempdir(), "iw_benchmark_corpus")
+
+
+#endregion
+#region - BenchmarkRun
+
+
+class BenchmarkRun:
+    """
+    Times stages against one corpus folder and collects the results.
+
+    Every measurement calls setup() untimed, then times func(setup result).
+    Results keep every repeat, plus the median and minimum, so two runs can
+    be compared without re-running either.
+
+    Args:
+        folder (str): Corpus folder
+        files (int): Number of images in the corpus
+        repeat (int): Timed runs of each measurement
+    """
+    def __init__(self, folder, files, repeat=3):
+        self.folder = folder
+        self.files = files
+        self.repeat = repeat
+        self.results = []
+
+
+    def measure(self, name, func, items, setup=None, repeat=None, **params):
+        seconds = []
+        for _ in range(repeat or self.repeat):
+            state = setup() if setup else None
+            start = time.perf_counter()
+            func(state)
+            seconds.append(time.perf_counter() - start)
+        median = statistics.median(seconds)
+        self.results.append({
+            "name": name,
+            "files": self.files,
+            "items": items,
+            "params": params,
+            "seconds": seconds,
+            "median_s": median,
+            "min_s": min(seconds),
+            "items_per_s": items / median if median > 0 else None,
+        })
+        print(f"  {name:<32} {median * 1000:10.2f} ms  ({items / median if median > 0 else 0:,.0f} items/s)")
+
+
+    def skip(self, name, reason):
+        self.results.append({"name": name, "files": self.files, "skipped": reason})
+        print(f"  {name:<32} skipped: {reason}")
+
+
+    def new_database_manager(self):
+        return DatabaseManager(None, self.folder, VALID_EXTENSIONS, IMAGE_DB_FILENAME, SAVED_FOLDER_NAME)
+
+
+    def remove_database(self):
+        try:
+            os.remove(os.path.join(self.folder, IMAGE_DB_FILENAME))
+        except FileNotFoundError:
+            pass
+
+
+#endregion
+#region - Stages
+
+
+def bench_index(run):
+    image_manager = ImageManager(run.folder, VALID_EXTENSIONS)
+    run.measure("refresh_image_list", lambda _: image_manager.refresh_image_list(), run.files)
+    return image_manager
+
+
+def bench_database(run, cold_repeat=1):
+    """update_database from no database file (cold) and from a current one (warm, includes loading it)."""
+    def cold_setup():
+        run.remove_database()
+        return run.new_database_manager()
+    run.measure("update_database_cold", lambda database_manager: database_manager.update_database(), run.files, cold_setup, cold_repeat)
+    run.measure("update_database_warm", lambda database_manager: database_manager.update_database(), run.files, run.new_database_manager)
+    run.measure("load_database", lambda database_manager: database_manager.load_database(), run.files, run.new_database_manager)
+    database_manager = run.new_database_manager()
+    database_manager.load_database()
+    return database_manager
+
+
+def bench_filter(run, database_manager, image_manager):
+    """The query path of apply_filters, with a new cache (first keystroke) and one holding the searchable texts."""
+    database = database_manager.load_database()
+    def apply(filter_cache, query):
+        matches = find_matches(database_manager, filter_cache, query, run.folder)
+        get_mtime = image_manager.get_mtime
+        image_manager.set_filter([path for path in matches if get_mtime(path) is not None], query.matches_record)
+    def warm_cache():
+        filter_cache = FilterCache()
+        filter_cache.validate(database_manager.revision)
+        filter_cache.sorted_paths(database)
+        filter_cache.searchable_texts(database, tuple(ACTIVE_FILTERS))
+        return filter_cache
+    for name, text in FILTER_QUERIES:
+        query = FilterQuery(text, ACTIVE_FILTERS)
+        run.measure(f"filter_cold:{name}", lambda filter_cache: apply(filter_cache, query), run.files, FilterCache, query=text)
+        run.measure(f"filter:{name}", lambda filter_cache: apply(filter_cache, query), run.files, warm_cache, query=text)
+    queries = [FilterQuery(text, ACTIVE_FILTERS) for text in TYPING_SEQUENCE]
+    def type_sequence(filter_cache):
+        for query in queries:
+            apply(filter_cache, query)
+    run.measure("filter:typing", type_sequence, len(queries), warm_cache, query=" > ".join(TYPING_SEQUENCE))
+    image_manager.clear_filter()
+    image_manager.refresh_image_list()
+
+
+def bench_display(run, image_files):
+    """ScalableImageLabel when a display is available, and the same decode and resize without Tk."""
+    sample = image_files[:DISPLAY_SAMPLE]
+    def decode_resize(_):
+        for path in sample:
+            with Image.open(path) as image:
+                # Fit and keep the aspect ratio, as the label's final resize does
+                ratio = min(DISPLAY_SIZE[0] / image.width, DISPLAY_SIZE[1] / image.height)
+                image.resize((max(1, int(image.width * ratio)), max(1, int(image.height * ratio))), Image.LANCZOS)
+    run.measure("decode_resize", decode_resize, len(sample))
+    try:
+        import tkinter as tk
+        from scalable_image_label import ScalableImageLabel
+        root = tk.Tk()
+    except Exception as e:
+        run.skip("set_image", f"no display ({e})")
+        run.skip("_resize_image", f"no display ({e})")
+        return
+    try:
+        root.geometry(f"{DISPLAY_SIZE[0]}x{DISPLAY_SIZE[1]}")
+        label = ScalableImageLabel(root)
+        label.pack(fill="both", expand=True)
+        root.update()
+        def set_images(_):
+            for path in sample:
+                label.set_image(path)
+            root.update_idletasks()
+        run.measure("set_image", set_images, len(sample))
+        label.set_image(sample[0])
+        def resize(_):
+            for _ in sample:
+                label._resize_image(*DISPLAY_SIZE, high_quality=True)
+        run.measure("_resize_image", resize, len(sample))
+    finally:
+        root.destroy()
+
+
+def bench_export(run, database_manager, image_manager, output_folder):
+    rows = []
+    for path in image_manager.image_files:
+        record = database_manager.get_metadata(path, image_manager.get_mtime(path))
+        if record:
+            rows.append((path, record))
+    for export_format, (_, ext) in EXPORT_FORMATS.items():
+        output_file = os.path.join(output_folder, f"export{ext}")
+        def export(_):
+            metadata_export = MetadataExport(rows, output_file, export_format)
+            metadata_export.start()
+            metadata_export.finished.wait()
+            if metadata_export.errors:
+                raise RuntimeError(metadata_export.errors[0][1])
+        run.measure(f"export:{export_format}", export, len(rows))
+
+
+def bench_move(run, image_files):
+    """Batched moves and copies as the file manager runs them, the corpus is put back afterwards."""
+    sample = image_files[:TRANSFER_SAMPLE]
+    moved_folder = os.path.join(run.folder, "benchmark_moved")
+    copied_folder = os.path.join(run.folder, "benchmark_copied")
+    name_allocator = NameAllocator()
+    def transfer(paths, target_folder, operation):
+        os.makedirs(target_folder, exist_ok=True)
+        name_allocator.forget(target_folder)
+        allocate = lambda path: name_allocator.reserve(target_folder, os.path.basename(path))
+        batch = BatchOperation(paths, operation, allocate, SAME_DEVICE_WORKERS)
+        batch.start()
+        batch.finished.wait()
+        if batch.errors:
+            raise RuntimeError(batch.errors[0][1])
+    def move_back():
+        if os.path.isdir(moved_folder):
+            transfer([entry.path for entry in os.scandir(moved_folder)], run.folder, move_file)
+    def clear_copies():
+        shutil.rmtree(copied_folder, ignore_errors=True)
+    try:
+        run.measure("move_batch", lambda _: transfer(sample, moved_folder, move_file), len(sample), move_back)
+        move_back()
+        run.measure("copy_batch", lambda _: transfer(sample, copied_folder, copy_file), len(sample), clear_copies)
+    finally:
+        move_back()
+        shutil.rmtree(moved_folder, ignore_errors=True)
+        clear_copies()
+
+
+#endregion
+#region - Results
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "pillow": PIL.__version__,
+        "git_commit": commit,
+    }
+
+
+def compare(results, baseline_path):
+    """Print the ratio of each median to the same measurement in an earlier results file."""
+    with open(baseline_path, 'r', encoding="utf-8") as f:
+        baseline = {(result["name"], result["files"]): result for result in json.load(f)["results"] if "median_s" in result}
+    print(f"\nCompared with {baseline_path} (new / old median, below 1.00 is faster):")
+    for result in results:
+        old = baseline.get((result["name"], result["files"]))
+        if old is None or "median_s" not in result or not old["median_s"]:
+            continue
+        print(f"  {result['name']:<32} {result['files']:>8}  {result['median_s'] / old['median_s']:6.2f}x")
+
+
+#endregion
+#region - Main
+
+
+def run_corpus(folder, files, stages, repeat, cold_repeat):
+    run = BenchmarkRun(folder, files, repeat)
+    image_manager = bench_index(run) if "index" in stages else ImageManager(folder, VALID_EXTENSIONS)
+    if "database" in stages:
+        database_manager = bench_database(run, cold_repeat)
+    else:
+        database_manager = run.new_database_manager()
+        if stages & {"filter", "export"}:
+            database_manager.update_database()
+    if "filter" in stages:
+        bench_filter(run, database_manager, image_manager)
+    if "display" in stages:
+        bench_display(run, image_manager.image_files)
+    if "export" in stages:
+        with tempfile.TemporaryDirectory() as output_folder:
+            bench_export(run, database_manager, image_manager, output_folder)
+    if "move" in stages:
+        bench_move(run, image_manager.image_files)
+    database_manager.flush_pending_save()
+    return run.results
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Time Image-Watcher's hot paths on synthetic image folders.")
+    parser.add_argument("--files", default="1000", help="Comma separated corpus sizes, for example 1000,10000,200000")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="small", help="Image sizes of the corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs of each measurement")
+    parser.add_argument("--cold-repeat", type=int, default=1, help="Timed runs of the cold database build")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"Comma separated subset of {', '.join(STAGES)}")
+    parser.add_argument("--corpus-root", default=DEFAULT_CORPUS_ROOT, help="Corpora are generated here once and reused")
+    parser.add_argument("--output", default=f"benchmark-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    parser.add_argument("--compare", metavar="BASELINE", help="Earlier results file to compare with")
+    args = parser.parse_args()
+    stages = set(args.stages.split(","))
+    unknown = stages - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    report = {"schema": RESULTS_SCHEMA, "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "environment": environment(), "corpora": [], "results": []}
+    for files in [int(count) for count in args.files.split(",")]:
+        folder = os.path.join(args.corpus_root, f"{args.profile}-{files}-{args.seed}")
+        print(f"Corpus {folder}")
+        start = time.perf_counter()
+        manifest = generate_corpus(folder, files, args.profile, args.seed)
+        print(f"  ready in {time.perf_counter() - start:.1f} s, {manifest['total_bytes'] / 1024 ** 2:.1f} MB")
+        report["corpora"].append(manifest)
+        report["results"].extend(run_corpus(folder, files, stages, args.repeat, args.cold_repeat))
+    with open(args.output, 'w', encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        compare(report["results"], args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+
+#endregion
@@ -0,0 +1,169 @@
+#region - Imports
+
+
+# First-party
+import os
+
+
+#endregion
+#region - Constants
+
+
+SCHEMA_VERSION = 3
+SUPPORTED_SCHEMAS = (2, 3)
+
+# Fields stored as-is, everything else is interned in the shared string table
+RAW_FIELDS = ("file_size", "width", "height", "modified_time_stamp", "dhash", "fingerprint", "Positive Prompt", "Negative Prompt")
+MAX_INTERNED_LENGTH = 256
+
+# Derived fields from older databases that are no longer stored
+DERIVED_FIELDS = ("modified_time",)
+
+
+#endregion
+#region - Paths
+
+
+def to_relative_key(file_path, base_folder, prefix=None):
+    """Return a folder relative key using forward slashes."""
+    prefix = prefix or os.path.join(base_folder, "")
+    if file_path.startswith(prefix):
+        relative = file_path[len(prefix):]
+    else:
+        relative = os.path.relpath(file_path, base_folder)
+    return relative.replace(os.sep, "/") if os.sep != "/" else relative
+
+
+def from_relative_key(key, base_folder, prefix=None):
+    prefix = prefix or os.path.join(base_folder, "")
+    return prefix + (key.replace("/", os.sep) if os.sep != "/" else key)
+
+
+#endregion
+#region - Encode
+
+
+def encode_database(database, base_folder, orphans=()):
+    """
+    Convert a path keyed database into the compact, columnar on-disk layout.
+
+    Orphans are records whose file is gone but whose content fingerprint is kept,
+    so a file that comes back under another name reuses its metadata.
+
+    Layout:
+        schema: format version
+        fields: field name table
+        interned: indices of fields whose string values reference the string table
+        strings: shared table of repeated values (model, sampler, schedule names...)
+        groups: records sharing the same fields, stored column by column
+            fields: field indices of the group
+            paths: folder relative paths, null for orphans
+            columns: one value list per field
+            mixed: column positions of interned fields that also hold inline values
+    """
+    fields, field_index = [], {}
+    strings, string_index = [], {}
+    interned = set()
+    groups, group_of = [], {}
+    prefix = os.path.join(base_folder, "")
+    entries = [(file_path, metadata) for file_path, metadata in database.items()]
+    entries.extend((None, metadata) for metadata in orphans)
+    for file_path, metadata in entries:
+        keys = tuple(key for key in metadata if key not in DERIVED_FIELDS)
+        group = group_of.get(keys)
+        if group is None:
+            for key in keys:
+                if key not in field_index:
+                    field_index[key] = len(fields)
+                    fields.append(key)
+                    if key not in RAW_FIELDS:
+                        interned.add(key)
+            group = group_of[keys] = {"fields": [field_index[key] for key in keys], "paths": [], "columns": [[] for _ in keys], "mixed": []}
+            groups.append(group)
+        group["paths"].append(to_relative_key(file_path, base_folder, prefix) if file_path else None)
+        for position, (key, column) in enumerate(zip(keys, group["columns"])):
+            value = metadata[key]
+            if key in interned:
+                if isinstance(value, str) and len(value) <= MAX_INTERNED_LENGTH:
+                    ref = string_index.get(value)
+                    if ref is None:
+                        ref = string_index[value] = len(strings)
+                        strings.append(value)
+                    value = ref
+                else:
+                    if not isinstance(value, str):
+                        value = [value]  # Keep non-string values apart from string references
+                    if position not in group["mixed"]:
+                        group["mixed"].append(position)
+            column.append(value)
+    return {
+        "schema": SCHEMA_VERSION,
+        "fields": fields,
+        "interned": sorted(field_index[key] for key in interned),
+        "strings": strings,
+        "groups": groups,
+    }
+
+
+#endregion
+#region - Decode
+
+
+def decode_database(data, base_folder):
+    """Convert any supported on-disk layout into a path keyed database and a list of orphan records."""
+    if not isinstance(data, dict):
+        return {}, []
+    if "schema" not in data:
+        return _decode_legacy(data, base_folder), []
+    if data["schema"] not in SUPPORTED_SCHEMAS:
+        print(f"ERROR: decode_database - unsupported database schema: {data['schema']}")
+        return {}, []
+    fields = data["fields"]
+    strings = data["strings"]
+    interned = set(data["interned"])
+    prefix = os.path.join(base_folder, "")
+    database = {}
+    orphans = []
+    for group in data["groups"]:
+        names = [fields[index] for index in group["fields"]]
+        mixed = set(group["mixed"])
+        columns = []
+        for position, (index, column) in enumerate(zip(group["fields"], group["columns"])):
+            if position in mixed:
+                column = [strings[value] if type(value) is int else _unwrap(value) for value in column]
+            elif index in interned:
+                column = list(map(strings.__getitem__, column))
+            columns.append(column)
+        paths = [from_relative_key(key, base_folder, prefix) if key is not None else None for key in group["paths"]]
+        for file_path, values in zip(paths, zip(*columns)):
+            if file_path is None:
+                orphans.append(dict(zip(names, values)))
+            else:
+                database[file_path] = dict(zip(names, values))
+    return database, orphans
+
+
+def _unwrap(value):
+    return value[0] if type(value) is list else value
+
+
+def _decode_legacy(data, base_folder):
+    """Read the original indented JSON layout keyed by absolute paths."""
+    database = {}
+    for file_path, metadata in data.items():
+        if not isinstance(metadata, dict):
+            continue
+        for key in DERIVED_FIELDS:
+            metadata.pop(key, None)
+        try:
+            relative = os.path.relpath(file_path, base_folder) if os.path.isabs(file_path) else file_path
+        except ValueError:
+            relative = ".."  # Different drive
+        if relative.startswith(".."):
+            # The folder was moved since the database was written
+            relative = os.path.basename(file_path)
+        database[os.path.join(base_folder, relative)] = metadata
+    return database
+
+
+#endregion
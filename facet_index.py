@@ -0,0 +1,128 @@
+#region - Imports
+
+
+# First-party
+import math
+
+
+#endregion
+#region - Constants
+
+
+# Facet name: record keys
+FACET_FIELDS = {
+    "Model": ("Model",),
+    "Sampler": ("Sampler",),
+    "Schedule type": ("Schedule type",),
+    "Size": ("width", "height"),
+    "CFG scale": ("CFG scale",),
+}
+
+
+#endregion
+#region - Facet values
+
+
+def facet_value(facet, record):
+    """Return (key, label) of a record for one facet, or None if the record has no value."""
+    if facet == "Size":
+        width, height = record.get("width"), record.get("height")
+        if not width or not height:
+            return None
+        label = f"{width}x{height}"
+        return label, label
+    if facet == "CFG scale":
+        try:
+            bucket = math.floor(float(record.get("CFG scale")))
+        except (TypeError, ValueError, OverflowError):
+            return None
+        return bucket, f"{bucket} - {bucket + 1}"
+    value = record.get(facet)
+    if value is None or value == "":
+        return None
+    label = str(value)
+    return label.lower(), label
+
+
+def facet_filter(facet, key):
+    """Return the filter text selecting one facet value."""
+    if facet == "Size":
+        width, height = key.split("x", 1)
+        return f"width={width} height={height}"
+    if facet == "CFG scale":
+        return f"cfg>={key} cfg<{key + 1}"
+    field = {"Model": "model", "Sampler": "sampler", "Schedule type": "schedule"}[facet]
+    return f'{field}="{key}"'
+
+
+#endregion
+#region - FacetCounts
+
+
+class FacetCounts:
+    """Per-value image counts of each facet, updated one path at a time."""
+    def __init__(self):
+        self.clear()
+
+
+    def clear(self):
+        self.counts = {facet: {} for facet in FACET_FIELDS}
+        self.labels = {facet: {} for facet in FACET_FIELDS}
+        self._keys_by_path = {}  # {path: (key per facet)}, lets a path be removed after its record is gone
+
+
+    def build(self, items):
+        """Count (path, record) pairs from scratch."""
+        self.clear()
+        for file_path, record in items:
+            self.add(file_path, record)
+
+
+    def add(self, file_path, record):
+        if file_path in self._keys_by_path:
+            self.remove(file_path)
+        keys = []
+        for facet in FACET_FIELDS:
+            value = facet_value(facet, record)
+            if value is None:
+                keys.append(None)
+                continue
+            key, label = value
+            counts = self.counts[facet]
+            counts[key] = counts.get(key, 0) + 1
+            self.labels[facet].setdefault(key, label)
+            keys.append(key)
+        self._keys_by_path[file_path] = tuple(keys)
+
+
+    def remove(self, file_path):
+        keys = self._keys_by_path.pop(file_path, None)
+        if keys is None:
+            return
+        for facet, key in zip(FACET_FIELDS, keys):
+            if key is None:
+                continue
+            counts = self.counts[facet]
+            counts[key] -= 1
+            if not counts[key]:
+                del counts[key]
+                del self.labels[facet][key]
+
+
+    def top(self, facet, limit=None):
+        """Return [(key, label, count)] of a facet, most common first."""
+        counts, labels = self.counts[facet], self.labels[facet]
+        if facet == "CFG scale":
+            ordered = sorted(counts)
+        else:
+            ordered = sorted(counts, key=lambda key: (-counts[key], key))
+        if limit is not None:
+            ordered = ordered[:limit]
+        return [(key, labels[key], counts[key]) for key in ordered]
+
+
+    def __len__(self):
+        return len(self._keys_by_path)
+
+
+#endregion
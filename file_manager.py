@@ -2,63 +2,76 @@
 
 # First-party
 import os
-import shutil
 import subprocess
 from tkinter import messagebox, filedialog
 
+# Local
+from file_operations import FileOperations
+from metadata_export import MetadataExport, EXPORT_FORMATS, format_metadata
+from progress_popup import ProgressPopup
+
 
 #endregion
-#region - FileManager
+#region - Constants
 
 
-class FileManager:
-    def __init__(self, watch_folder_path, image_manager, saved_folder_name="Saved Images"):
-        self.watch_folder_path = watch_folder_path
-        self.image_manager = image_manager
-        self.saved_folder_name = saved_folder_name
+BATCH_POLL_MS = 100
+MAX_LISTED_ERRORS = 10
 
 
+#endregion
+#region - FileManager
+
+
+class FileManager(FileOperations):
+    """The viewer's file commands, FileOperations with confirmations, folder pickers and progress popups."""
     def initialize_gui_in_filemanager(self, gui):
         self.gui = gui
 
-    def initialize_watch_folder(self, watch_folder_path):
-        self.watch_folder_path = watch_folder_path
-
 
 #endregion
 #region - Helper Functions
 
 
-    def _perform_file_operation(self, source_path, target_folder, operation):
+    def _perform_file_operation(self, source_path, target_folder, copy=False):
+        """Return the new path, or None if the operation failed"""
         try:
-            new_path = self._get_unique_path(source_path, target_folder)
-            operation(source_path, new_path)
-            return True
+            return self.transfer(source_path, target_folder, copy)
         except Exception as e:
             messagebox.showerror("Error", f"Could not perform operation: {str(e)}")
-            return False
-
-
-    def _get_unique_path(self, source_path, target_folder):
-        filename = os.path.basename(source_path)
-        new_path = os.path.join(target_folder, filename)
-        base, ext = os.path.splitext(filename)
-        counter = 1
-        while os.path.exists(new_path):
-            new_path = os.path.join(target_folder, f"{base}_{counter}{ext}")
-            counter += 1
-        return new_path
+            return None
 
 
-    def _get_unique_filename(self, filepath):
-        # Generate a unique filename if one already exists
-        base, ext = os.path.splitext(filepath)
-        counter = 1
-        unique_path = filepath
-        while os.path.exists(unique_path):
-            unique_path = f"{base}_{counter}{ext}"
-            counter += 1
-        return unique_path
+#endregion
+#region - Batch Operations
+
+
+    def _run_batch(self, batch, title, verb, on_finished, unit="files"):
+        """Show progress for a running batch and call on_finished on the UI thread when it ends."""
+        popup = ProgressPopup(self.gui.root, title, on_cancel=batch.cancel)
+        total = len(batch.paths)
+        def poll():
+            processed = batch.processed
+            status = f"{verb} {processed} of {total} ({batch.throughput():.0f} {unit}/s)"
+            if batch.cancelled.is_set():
+                status = "Cancelling..."
+            popup.update(processed / total * 100 if total else 100, status, process_events=False)
+            if not batch.finished.is_set():
+                self.gui.root.after(BATCH_POLL_MS, poll)
+                return
+            popup.close()
+            on_finished()
+        batch.start()
+        poll()
+
+
+    def _show_batch_errors(self, batch, action):
+        if not batch.errors:
+            return
+        lines = [f"{os.path.basename(path)}: {message}" for path, message in batch.errors[:MAX_LISTED_ERRORS]]
+        if len(batch.errors) > MAX_LISTED_ERRORS:
+            lines.append(f"...and {len(batch.errors) - MAX_LISTED_ERRORS} more")
+        messagebox.showerror("Error", f"Could not {action} {len(batch.errors)} image(s):\n\n" + "\n".join(lines))
 
 
 #endregion
@@ -89,19 +102,27 @@ class FileManager:
         current_image = self.gui.image_label.get_image_path()
         if not current_image:
             return None
-        if not quick_delete and not messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this image?"):
+        if not quick_delete and not messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this image?\n\nUse Ctrl+Z to undo."):
             return None
 
         try:
             current_index = self.image_manager.current_index
-            os.remove(current_image)
-            self.image_manager.refresh_image_list(reset_index=False)
+            self.stage_delete(current_image, current_index)
             return current_index
         except Exception as e:
             messagebox.showerror("Error", f"Could not delete image: {str(e)}")
             return None
 
 
+    def undo_delete(self):
+        """Restore the images of the last delete, single or batched, and return their paths."""
+        try:
+            return self.restore_last_delete()
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not restore image: {str(e)}")
+            return []
+
+
     def move_image_to_saved_folder(self, quick_move=False):
         if not self.image_manager or not self.gui.image_label.get_image_path():
             return None
@@ -115,37 +136,42 @@ class FileManager:
         # Move the image to the saved folder
         try:
             current_index = self.image_manager.current_index
-            new_path = self._get_unique_path(current_image, saved_folder)
-            os.rename(current_image, new_path)
-            self.image_manager.refresh_image_list(reset_index=False)
+            self.transfer(current_image, saved_folder)
             return current_index
         except Exception as e:
             messagebox.showerror("Error", f"Could not move image: {str(e)}")
             return None
 
 
-    def move_all_images(self):
+    def move_all_images(self, on_complete=None):
+        """Move every listed image on worker threads, on_complete(moved pairs) runs on the UI thread afterwards."""
         if not self.image_manager or not self.image_manager.image_files:
             messagebox.showinfo("Info", "No images to move.")
             return
-        messagebox.askokcancel("Move All Images", "This will move all images listed in the index, respecting filters.\n\nPlease select a folder to move the images to.")
+        if not messagebox.askokcancel("Move All Images", "This will move all images listed in the index, respecting filters.\n\nPlease select a folder to move the images to."):
+            return
         target_folder = filedialog.askdirectory(title="Select Folder to Move Images To")
         if not target_folder:
             return
-        if not os.path.exists(target_folder):
-            os.makedirs(target_folder)
-        # Move each image to the target folder
-        moved_count = 0
-        for image_path in self.image_manager.image_files:
-            success = self._perform_file_operation(image_path, target_folder, os.rename)
-            if success:
-                moved_count += 1
-        # Refresh the image list
-        if moved_count > 0:
-            self.image_manager.refresh_image_list(reset_index=False)
-            if messagebox.askyesno("Success", f"Successfully moved {moved_count} images to:\n{target_folder}\n\nWould you like to open this folder?"):
+        self._move_batch(self.image_manager.image_files, target_folder, on_complete)
+
+
+    def _move_batch(self, paths, target_folder, on_complete):
+        batch = self.transfer_batch(paths, target_folder)
+        self._run_batch(batch, "Moving Images", "Moved", lambda: self._finish_move_batch(batch, target_folder, on_complete))
+
+
+    def _finish_move_batch(self, batch, target_folder, on_complete):
+        self.finish_transfer_batch(batch)
+        if on_complete:
+            on_complete(batch.done)
+        self._show_batch_errors(batch, "move")
+        if batch.done:
+            summary = f"Successfully moved {len(batch.done)} images to:\n{target_folder}"
+            if batch.cancelled.is_set():
+                summary = f"Cancelled after moving {len(batch.done)} of {len(batch.paths)} images to:\n{target_folder}"
+            if messagebox.askyesno("Success", f"{summary}\n\nWould you like to open this folder?"):
                 os.startfile(target_folder)
-        return True
 
 
     def move_image_to(self):
@@ -157,10 +183,9 @@ class FileManager:
         if not target_folder:
             return
         current_index = self.image_manager.current_index
-        success = self._perform_file_operation(current_image, target_folder, os.rename)
+        success = self._perform_file_operation(current_image, target_folder)
         if success:
             messagebox.showinfo("Success", f"Moved image to:\n{target_folder}")
-            self.image_manager.refresh_image_list(reset_index=False)
             return current_index
         return None
 
@@ -173,8 +198,62 @@ class FileManager:
         target_folder = filedialog.askdirectory(title="Select Folder to Copy Image To")
         if not target_folder:
             return
-        self._perform_file_operation(current_image, target_folder, shutil.copy2)
-        messagebox.showinfo("Success", f"Copied image to:\n{target_folder}")
+        if self._perform_file_operation(current_image, target_folder, copy=True):
+            messagebox.showinfo("Success", f"Copied image to:\n{target_folder}")
+
+
+#endregion
+#region - Selection Operations
+
+
+    def delete_selected(self, quick_delete=False, on_complete=None):
+        """Stage the selected images for deletion in one worker pass, on_complete(deleted paths) runs on the UI thread afterwards."""
+        paths = self.image_manager.get_selection()
+        if not paths:
+            return
+        if not quick_delete and not messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete {len(paths)} selected image(s)?\n\nUse Ctrl+Z to undo."):
+            return
+        batch = self.delete_batch(paths)
+        self._run_batch(batch, "Deleting Images", "Deleted", lambda: self._finish_delete_selected(batch, on_complete))
+
+
+    def _finish_delete_selected(self, batch, on_complete):
+        deleted = self.finish_delete_batch(batch)
+        if on_complete:
+            on_complete(deleted)
+        self._show_batch_errors(batch, "delete")
+
+
+    def move_selected(self, on_complete=None):
+        """Move the selected images on worker threads, on_complete(moved pairs) runs on the UI thread afterwards."""
+        paths = self.image_manager.get_selection()
+        if not paths:
+            messagebox.showinfo("Info", "No images selected.")
+            return
+        target_folder = filedialog.askdirectory(title=f"Select Folder to Move {len(paths)} Images To")
+        if not target_folder:
+            return
+        self._move_batch(paths, target_folder, on_complete)
+
+
+    def copy_selected(self):
+        """Copy the selected images on worker threads."""
+        paths = self.image_manager.get_selection()
+        if not paths:
+            messagebox.showinfo("Info", "No images selected.")
+            return
+        target_folder = filedialog.askdirectory(title=f"Select Folder to Copy {len(paths)} Images To")
+        if not target_folder:
+            return
+        batch = self.transfer_batch(paths, target_folder, copy=True)
+        self._run_batch(batch, "Copying Images", "Copied", lambda: self._finish_copy_batch(batch, target_folder))
+
+
+    def _finish_copy_batch(self, batch, target_folder):
+        self.finish_transfer_batch(batch, copy=True)
+        self._show_batch_errors(batch, "copy")
+        if batch.done:
+            messagebox.showinfo("Success", f"Copied {len(batch.done)} images to:\n{target_folder}")
 
 
 #endregion
@@ -183,10 +262,7 @@ class FileManager:
 
     def format_metadata(self, metadata):
         # Format metadata as key: value on each line
-        lines = []
-        for key, value in metadata.items():
-            lines.append(f"{key}:\n{value}\n")
-        return "\n".join(lines)
+        return format_metadata(metadata)
 
 
     def export_current_image_metadata(self, database_manager):
@@ -195,7 +271,7 @@ class FileManager:
         if not current_image:
             messagebox.showinfo("Info", "No current image to export.")
             return
-        metadata = database_manager.extract_png_metadata(current_image)
+        metadata = database_manager.get_png_metadata(current_image, self.image_manager.get_mtime(current_image))
         if not metadata:
             messagebox.showinfo("Info", "No PNG metadata found for the current image.")
             return
@@ -214,28 +290,45 @@ class FileManager:
             messagebox.showerror("Error", f"Failed to export metadata: {str(e)}")
 
 
-    def export_all_metadata(self, database_manager):
-        """Batch export formatted PNG metadata for all images in the current list."""
+    def export_all_metadata(self, export_format="text"):
+        """Export metadata of all listed images from the database, as .txt files or one EXPORT_FORMATS file."""
         if not self.image_manager.image_files:
             messagebox.showinfo("Info", "No images to export.")
             return
-        target_folder = filedialog.askdirectory(title="Select Folder to Export Metadata")
-        if not target_folder:
+        if not self.database_manager.is_loaded():
+            messagebox.showinfo("Info", "The image database is still loading, please export once it is ready.")
             return
-        exported_count = 0
-        for image_path in self.image_manager.image_files:
-            metadata = database_manager.extract_png_metadata(image_path)
-            if not metadata:
-                continue
-            formatted = self.format_metadata(metadata)
-            base_filename = os.path.splitext(os.path.basename(image_path))[0] + ".txt"
-            output_file = os.path.join(target_folder, base_filename)
-            output_file = self._get_unique_filename(output_file)
-            try:
-                with open(output_file, "w", encoding="utf-8") as f:
-                    f.write(formatted)
-                exported_count += 1
-            except Exception:
-                # Skip files that cannot be written
-                pass
-        messagebox.showinfo("Export Completed", f"Metadata exported for {exported_count} image(s) into:\n{target_folder}")
+        # The database is kept current by the reconcile and live updates, no image is read on the UI thread
+        rows = self.export_rows(self.image_manager.image_files, parse_stale=False)
+        if export_format == "text":
+            target_folder = filedialog.askdirectory(title="Select Folder to Export Metadata")
+            if not target_folder:
+                return
+            self._export_text_files(rows, target_folder)
+            return
+        label, extension = EXPORT_FORMATS[export_format]
+        output_file = filedialog.asksaveasfilename(title=f"Export Metadata as {label}", defaultextension=extension, initialfile=f"metadata{extension}", filetypes=[(label, f"*{extension}")])
+        if not output_file:
+            return
+        export = MetadataExport(rows, output_file, export_format)
+        # A failed or cancelled export leaves no file, so nothing counts as exported
+        finish = lambda: self._finish_export(export, 0 if export.errors or export.cancelled.is_set() else export.written, output_file, "rows")
+        self._run_batch(export, "Exporting Metadata", "Exported", finish, unit="rows")
+
+
+    def _export_text_files(self, rows, target_folder):
+        batch = self.text_export_batch(rows, target_folder)
+        if batch is None:
+            messagebox.showinfo("Info", "No PNG metadata found for the listed images.")
+            return
+        self._run_batch(batch, "Exporting Metadata", "Exported", lambda: self._finish_export(batch, len(batch.done), target_folder, "files"))
+
+
+    def _finish_export(self, batch, exported, destination, unit):
+        self._show_batch_errors(batch, "export")
+        if not exported:
+            return
+        summary = f"Metadata exported for {exported} image(s) into:\n{destination}\n\n{batch.throughput():.0f} {unit}/s"
+        if batch.cancelled.is_set():
+            summary = f"Cancelled after exporting {exported} of {len(batch.paths)} image(s) into:\n{destination}"
+        messagebox.showinfo("Export Completed", summary)
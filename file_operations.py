@@ -0,0 +1,229 @@
+#region - Imports
+
+# First-party
+import os
+
+# Local
+from batch_operations import BatchOperation, choose_workers, SAME_DEVICE_WORKERS
+from file_transfer import copy_file, move_file, FSYNC_FILE
+from metadata_export import TEXT_FILE_WRITERS, format_metadata, record_metadata
+from name_allocator import NameAllocator
+from trash_staging import TrashStaging, StagedDelete
+from watchdog_manager import FileChanges
+
+
+#endregion
+#region - FileOperations
+
+
+class FileOperations:
+    """
+    Moves, copies, deletes and exports images, and keeps the index and database in step, without any UI.
+
+    FileManager adds the viewer's dialogs and progress popups on top of this.
+    The command line uses it directly and waits on the batches with run_batch.
+    Errors are raised or collected in the batch, never shown.
+
+    Args:
+        watch_folder_path (str): Watched folder
+        image_manager (ImageManager): Index updated after each operation, or None
+        saved_folder_name (str): Name of the saved images subfolder
+        database_manager (DatabaseManager): Records that follow the files, or None
+    """
+    def __init__(self, watch_folder_path, image_manager=None, saved_folder_name="Saved Images", database_manager=None):
+        self.watch_folder_path = watch_folder_path
+        self.image_manager = image_manager
+        self.saved_folder_name = saved_folder_name
+        self.database_manager = database_manager
+        self.name_allocator = NameAllocator()
+        self.trash = TrashStaging(watch_folder_path)
+        self.fsync_policy = FSYNC_FILE  # A move across devices only unlinks the source once the copy is on disk
+
+
+    def initialize_watch_folder(self, watch_folder_path):
+        self.watch_folder_path = watch_folder_path
+        self.trash = TrashStaging(watch_folder_path)
+
+
+#endregion
+#region - Single Files
+
+
+    def transfer(self, source_path, target_folder, copy=False):
+        """Move or copy one image into a folder under a free name and return the new path, raises on failure."""
+        operation = self._copy_file if copy else self._move_file
+        new_path = self._get_unique_path(source_path, target_folder)
+        self._into_reserved(operation)(source_path, new_path)
+        if copy:
+            self._record_copied(source_path, new_path)
+            self._update_index(created=[new_path])
+        else:
+            self._record_moved(source_path, new_path)
+            self._update_index(moved=[(source_path, new_path)])
+        return new_path
+
+
+    def stage_delete(self, file_path, index=None):
+        """Move one image into trash staging and drop its record, kept for undo, raises OSError if it can't be moved."""
+        # A rename into staging, the purger removes the data later
+        entry = self.trash.stage(file_path, index=index)
+        if self.database_manager:
+            entry.record = self.database_manager.remove_record(file_path)
+        self._update_index(removed=[file_path])
+        return entry
+
+
+    def restore_last_delete(self):
+        """Restore the images of the last delete, single or batched, and return their paths, raises OSError if none could be restored."""
+        entries = self.trash.undo()
+        # The records go back first so a standing filter can test the restored images
+        if entries and self.database_manager:
+            self.database_manager.restore_records([(entry.original_path, entry.record) for entry in entries])
+        restored = [entry.original_path for entry in entries]
+        self._update_index(created=restored)
+        return restored
+
+
+    def export_rows(self, paths, parse_stale=True):
+        """
+        Return the (path, record) rows of the images that have a record.
+
+        Args:
+            paths (list): Images to export
+            parse_stale (bool): Parse files the database doesn't know or holds an older version of,
+                otherwise rows come from the loaded records alone and no image is opened
+        """
+        if not parse_stale:
+            database = self.database_manager.load_database()
+            return [(image_path, database[image_path]) for image_path in paths if image_path in database]
+        # Current records are a dictionary lookup, only unknown or stale files are parsed
+        get_mtime = self.image_manager.get_mtime if self.image_manager else lambda path: None
+        rows = []
+        for image_path in paths:
+            record = self.database_manager.get_metadata(image_path, get_mtime(image_path))
+            if record:
+                rows.append((image_path, record))
+        return rows
+
+
+#endregion
+#region - Batches
+
+
+    def transfer_batch(self, paths, target_folder, copy=False, workers=None):
+        """Return a BatchOperation moving or copying paths into a folder, finish it with finish_transfer_batch."""
+        os.makedirs(target_folder, exist_ok=True)
+        self.name_allocator.forget(target_folder)  # List the folder once for the whole batch
+        allocate = lambda source_path: self._get_unique_path(source_path, target_folder)
+        workers = workers or choose_workers(self.watch_folder_path, target_folder)
+        operation = self._copy_file if copy else self._move_file
+        return BatchOperation(paths, self._into_reserved(operation), allocate, workers)
+
+
+    def finish_transfer_batch(self, batch, copy=False):
+        # One index and database update for the whole batch
+        if copy:
+            for source_path, new_path in batch.done:
+                self._record_copied(source_path, new_path)
+            self._update_index(created=[new_path for _, new_path in batch.done])
+            return
+        self._update_index(moved=batch.done)
+        if self.database_manager:
+            self.database_manager.move_records(batch.done)
+
+
+    def delete_batch(self, paths):
+        """Return a BatchOperation staging paths for deletion, finish it with finish_delete_batch."""
+        # Renames into staging on the same device, the purger removes the data later
+        return BatchOperation(paths, os.replace, self.trash.staging_path, SAME_DEVICE_WORKERS)
+
+
+    def finish_delete_batch(self, batch):
+        """Drop the records of the deleted images, keeping them for undo, and return the deleted paths."""
+        deleted = [source_path for source_path, _ in batch.done]
+        records = self.database_manager.remove_records(deleted) if self.database_manager else {}
+        self.trash.push([StagedDelete(source_path, staged_path, records.get(source_path)) for source_path, staged_path in batch.done])
+        self._update_index(removed=deleted)
+        return deleted
+
+
+    def text_export_batch(self, rows, target_folder):
+        """Return a BatchOperation writing a .txt file of metadata per (path, record) row, or None if no row has any."""
+        texts = {}
+        for image_path, record in rows:
+            metadata = record_metadata(record)
+            if metadata:
+                texts[image_path] = format_metadata(metadata)
+        if not texts:
+            return None
+        os.makedirs(target_folder, exist_ok=True)
+        self.name_allocator.forget(target_folder)  # List the folder once for the whole export
+        def allocate(image_path):
+            return self.name_allocator.reserve(target_folder, os.path.splitext(os.path.basename(image_path))[0] + ".txt")
+        def write(image_path, output_file):
+            with open(output_file, "w", encoding="utf-8") as f:
+                f.write(texts[image_path])
+        return BatchOperation(list(texts), self._into_reserved(write), allocate, TEXT_FILE_WRITERS)
+
+
+#endregion
+#region - Helper Functions
+
+
+    def _move_file(self, source_path, new_path):
+        # A rename on the same device, a copy and unlink across devices
+        move_file(source_path, new_path, self.fsync_policy)
+
+
+    def _copy_file(self, source_path, new_path):
+        copy_file(source_path, new_path, self.fsync_policy)
+
+
+    def _record_moved(self, old_path, new_path):
+        # The database record follows the file, its metadata is not parsed again
+        if self.database_manager:
+            self.database_manager.move_record(old_path, new_path)
+
+
+    def _record_copied(self, source_path, new_path):
+        if self.database_manager:
+            self.database_manager.copy_record(source_path, new_path)
+
+
+    def _update_index(self, moved=(), created=(), removed=()):
+        """Apply the outcome of file operations to the index in one incremental update, without a rescan"""
+        if not self.image_manager:
+            return
+        changes = FileChanges()
+        for source_path, new_path in moved:
+            changes.add_moved(source_path, new_path)
+        for file_path in created:
+            changes.add_created(file_path)
+        for file_path in removed:
+            changes.add_removed(file_path)
+        if changes:
+            self.image_manager.apply_file_changes(changes)
+
+
+    def _get_unique_path(self, source_path, target_folder):
+        # Claims the name with an empty placeholder, the operation replaces it
+        return self.name_allocator.reserve(target_folder, os.path.basename(source_path))
+
+
+    def _get_unique_filename(self, filepath):
+        # Generate a unique filename if one already exists
+        return self.name_allocator.reserve(os.path.dirname(filepath), os.path.basename(filepath))
+
+
+    def _into_reserved(self, operation):
+        """Wrap an operation so a failed transfer gives its reserved name back"""
+        def run(source_path, new_path):
+            try:
+                operation(source_path, new_path)
+            except Exception:
+                self.name_allocator.release(new_path)
+                raise
+        return run
+
+
+#endregion
@@ -0,0 +1,131 @@
+#region - Imports
+
+
+# First-party
+import os
+import errno
+import shutil
+
+
+#endregion
+#region - Constants
+
+
+COPY_CHUNK_BYTES = 8 * 1024 * 1024  # Buffer of the user space fallback
+KERNEL_COPY_BYTES = 1024 ** 3  # Largest range asked of copy_file_range and sendfile in one call
+# Fsync policies, how much is flushed to disk before a transfer counts as done
+FSYNC_NONE = "none"  # Leave it to the OS
+FSYNC_FILE = "file"  # Flush the copied data, a move only unlinks the source after this
+FSYNC_FOLDER = "folder"  # Also flush the target folder so the new name survives a crash
+# Errors meaning a kernel copy path is unavailable for this pair of files, the next one is tried
+_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF, errno.ETXTBSY, errno.ENOTSOCK}
+
+
+#endregion
+#region - Transfers
+
+
+def copy_file(source_path, destination_path, fsync=FSYNC_NONE):
+    """
+    Copy a file's data, then its timestamps and permission bits.
+
+    The data is copied by the kernel when possible, copy_file_range first,
+    then sendfile, otherwise through one large reusable buffer. An existing
+    destination, such as a reserved placeholder, is overwritten. A failed
+    copy removes the partial destination.
+
+    Args:
+        source_path (str): File to copy
+        destination_path (str): New file
+        fsync (str): FSYNC_NONE, FSYNC_FILE or FSYNC_FOLDER
+    """
+    try:
+        with open(source_path, 'rb') as source, open(destination_path, 'wb') as destination:
+            _copy_data(source.fileno(), destination.fileno(), os.fstat(source.fileno()).st_size)
+            if fsync != FSYNC_NONE:
+                os.fsync(destination.fileno())
+        shutil.copystat(source_path, destination_path)
+    except BaseException:
+        try:
+            os.remove(destination_path)
+        except OSError:
+            pass
+        raise
+    if fsync == FSYNC_FOLDER:
+        _fsync_folder(os.path.dirname(destination_path))
+
+
+def move_file(source_path, destination_path, fsync=FSYNC_FILE):
+    """Rename a file, or copy then unlink it when the destination is on another device."""
+    try:
+        os.replace(source_path, destination_path)
+        return
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    copy_file(source_path, destination_path, fsync)
+    os.remove(source_path)
+
+
+def _copy_data(source_fd, destination_fd, size):
+    """Copy a file from its start, kernel side while the platform allows it, then through a buffer."""
+    copied = 0
+    for copy_range in _kernel_copiers(source_fd, destination_fd):
+        copied = _copy_ranges(copy_range, copied, size)
+        if copied >= size:
+            return
+    os.lseek(source_fd, copied, os.SEEK_SET)
+    os.lseek(destination_fd, copied, os.SEEK_SET)
+    buffer = bytearray(COPY_CHUNK_BYTES)
+    view = memoryview(buffer)
+    with open(source_fd, 'rb', buffering=0, closefd=False) as source:
+        while True:
+            read = source.readinto(buffer)
+            if not read:
+                break
+            written = 0
+            while written < read:
+                written += os.write(destination_fd, view[written:read])
+
+
+def _kernel_copiers(source_fd, destination_fd):
+    """Yield copy(offset, count) functions, copying the same range of both files without a user space buffer."""
+    if hasattr(os, "copy_file_range"):
+        yield lambda offset, count: os.copy_file_range(source_fd, destination_fd, count, offset, offset)
+    if hasattr(os, "sendfile"):
+        def send(offset, count):
+            os.lseek(destination_fd, offset, os.SEEK_SET)
+            return os.sendfile(destination_fd, source_fd, offset, count)
+        yield send
+
+
+def _copy_ranges(copy_range, offset, size):
+    """Copy until size is reached, return the offset reached when the copier gives up."""
+    while offset < size:
+        try:
+            copied = copy_range(offset, min(size - offset, KERNEL_COPY_BYTES))
+        except OSError as e:
+            if e.errno in _FALLBACK_ERRNOS:
+                return offset
+            raise
+        if not copied:
+            return offset
+        offset += copied
+    return offset
+
+
+def _fsync_folder(folder):
+    """Flush a folder entry, not supported on Windows where opening a folder fails."""
+    try:
+        fd = os.open(folder, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+#endregion
@@ -0,0 +1,457 @@
+#region - Imports
+
+
+# First-party
+import os
+import shlex
+from collections import OrderedDict
+
+# Local
+from parameter_store import parse_predicate
+
+
+#endregion
+#region - Constants
+
+
+SIMILAR_PREFIX = "similar:"
+MAX_CACHED_QUERIES = 32
+FIELD_SEPARATOR = "\x00"  # Joins searchable fields, a typed term can never span two fields
+POSTINGS_PER_TEXT_TEST = 4  # A union adds postings several times faster than a term is tested against a text
+MAX_CACHED_TERMS = 64
+MAX_INDEXED_FIELD_SETS = 2  # Each set of searchable fields keeps its own texts and postings
+
+
+#endregion
+#region - FilterQuery
+
+
+def join_fields(record, fields):
+    """Return the lower cased searchable text of the given record fields."""
+    values = []
+    for field in fields:
+        if field == "Size":
+            values.append(f"{record.get('width', '')}x{record.get('height', '')}")
+        else:
+            values.append(str(record.get(field, '')))
+    return FIELD_SEPARATOR.join(values).lower()
+
+
+def split_words(text):
+    """Return the distinct whitespace separated words of a searchable text."""
+    return set(text.replace(FIELD_SEPARATOR, " ").split())
+
+
+def is_single_word(term):
+    """A term without whitespace is in a text exactly when it is part of one of the text's words."""
+    return term.split() == [term]
+
+
+def split_filter_text(filter_text):
+    """Split filter text like shlex, closing a quote that is still being typed."""
+    try:
+        return shlex.split(filter_text)
+    except ValueError:
+        try:
+            return shlex.split(filter_text + '"')
+        except ValueError:
+            return filter_text.split()
+
+
+class FilterQuery:
+    """Parsed filter text, comparable with other queries to decide if a previous result can be refined."""
+    def __init__(self, filter_text, active_filters, include_saved=False):
+        tokens = [token.lower() for token in split_filter_text(filter_text)]
+        self.fields = tuple(active_filters)
+        self.include_saved = include_saved
+        # Typed parameter predicates (steps>=30, cfg:5..7, seed=1234) are answered by the parameter store
+        self.predicates = []
+        self._predicate_of = {}
+        similar_names = []
+        text_tokens = []
+        for token in tokens:
+            if token.startswith(SIMILAR_PREFIX):
+                similar_names.append(token[len(SIMILAR_PREFIX):])
+                continue
+            predicate = parse_predicate(token)
+            if predicate:
+                self.predicates.append(predicate)
+                self._predicate_of[token] = predicate
+            elif self.fields:
+                text_tokens.append(token)
+        self.similar_names = tuple(similar_names)
+        self.use_or = "~" in text_tokens
+        # Negative terms are "-" prefixed, positive terms are everything else but the "~" operator
+        self.positive_terms = tuple(dict.fromkeys(token for token in text_tokens if token != "~" and not token.startswith('-')))
+        self.negative_terms = tuple(dict.fromkeys(token[1:] for token in text_tokens if token.startswith('-') and len(token) > 1))
+        self.predicate_tokens = frozenset(self._predicate_of)
+        self.key = (self.positive_terms, self.negative_terms, self.use_or, self.predicate_tokens, self.similar_names, self.fields, self.include_saved)
+
+
+    def is_empty(self):
+        return not self.positive_terms and not self.negative_terms and not self.predicates and not self.similar_names
+
+
+    def narrows(self, other):
+        """Return True if every image matching this query also matches the other one."""
+        if self.similar_names or other.similar_names:
+            return False
+        if (self.fields, self.include_saved) != (other.fields, other.include_saved):
+            return False
+        if not other.predicate_tokens <= self.predicate_tokens:
+            return False
+        # Excluding a shorter term excludes everything a longer term containing it would
+        if not all(any(term in old for term in self.negative_terms) for old in other.negative_terms):
+            return False
+        if not other.positive_terms:
+            return True
+        if self.use_or != other.use_or:
+            # All new terms are required, so one of them containing any old term is enough
+            return not self.use_or and any(old in term for old in other.positive_terms for term in self.positive_terms)
+        if self.use_or:
+            # Any new term must contain one of the old terms
+            return all(any(old in term for old in other.positive_terms) for term in self.positive_terms)
+        # Every old term must be contained in one of the new terms
+        return all(any(old in term for term in self.positive_terms) for old in other.positive_terms)
+
+
+    def new_predicates(self, base=None):
+        """Return the predicates that candidates already matching the base query still have to pass."""
+        if base is None:
+            return self.predicates
+        return [predicate for token, predicate in self._predicate_of.items() if token not in base.predicate_tokens]
+
+
+    def select(self, candidates, texts, base=None, index=None):
+        """
+        Return the candidates whose lower cased searchable text matches the text terms.
+
+        Args:
+            candidates (iterable): Paths to test, all of them must be keys of texts
+            texts (dict): {path: searchable text}
+            base (FilterQuery): Query every candidate is already known to match, its terms are not tested again
+            index (TextIndex): Postings of texts, terms it can answer are looked up instead of tested
+        """
+        positive, negative = self.positive_terms, self.negative_terms
+        if base is not None and not self.use_or and not base.use_or:
+            positive = tuple(term for term in positive if term not in base.positive_terms)
+            negative = tuple(term for term in negative if term not in base.negative_terms)
+        if index is not None and (positive or negative):
+            candidates, positive, negative = self._narrow(list(candidates), positive, negative, index)
+        if not positive and not negative:
+            return list(candidates)
+        # Specialize the common shapes, this runs over every candidate on each keystroke
+        if not negative and len(positive) == 1:
+            term = positive[0]
+            return [file_path for file_path in candidates if term in texts[file_path]]
+        if not positive and len(negative) == 1:
+            term = negative[0]
+            return [file_path for file_path in candidates if term not in texts[file_path]]
+        if self.use_or:
+            return [file_path for file_path in candidates if self._matches_any(texts[file_path], positive, negative)]
+        return [file_path for file_path in candidates if self._matches_all(texts[file_path], positive, negative)]
+
+
+    def _narrow(self, candidates, positive, negative, index):
+        """Apply the postings of the terms the index can answer, and return the candidates and the terms still to test."""
+        if positive and self.use_or:
+            found = [index.lookup(term, len(candidates) * POSTINGS_PER_TEXT_TEST) for term in positive]
+            if None not in found:
+                # Any match has a word of one of the terms, the texts are only tested for what the postings can't tell
+                paths = set().union(*found)
+                candidates = list(filter(paths.__contains__, candidates))
+                if all(map(is_single_word, positive)):
+                    positive = ()
+        elif positive:
+            untested = []
+            for term in positive:
+                paths = index.lookup(term, len(candidates) * POSTINGS_PER_TEXT_TEST)
+                if paths is not None:
+                    candidates = list(filter(paths.__contains__, candidates))
+                if paths is None or not is_single_word(term):
+                    untested.append(term)
+            positive = tuple(untested)
+        untested = []
+        for term in negative:
+            # Only exact postings can exclude, a phrase is tested
+            paths = index.lookup(term, len(candidates) * POSTINGS_PER_TEXT_TEST) if is_single_word(term) else None
+            if paths is None:
+                untested.append(term)
+            elif paths:
+                candidates = [file_path for file_path in candidates if file_path not in paths]
+        return candidates, positive, tuple(untested)
+
+
+    def matches_record(self, record):
+        """Test one database record, used to check new files against a standing query."""
+        if self.similar_names:
+            return False  # Near-duplicate views are not extended by new files
+        for predicate in self.predicates:
+            if not predicate.test_record(record):
+                return False
+        if not self.positive_terms and not self.negative_terms:
+            return True
+        text = join_fields(record, self.fields)
+        if self.use_or:
+            return self._matches_any(text, self.positive_terms, self.negative_terms)
+        return self._matches_all(text, self.positive_terms, self.negative_terms)
+
+
+    @staticmethod
+    def _matches_all(text, positive, negative):
+        for term in positive:
+            if term not in text:
+                return False
+        for term in negative:
+            if term in text:
+                return False
+        return True
+
+
+    @staticmethod
+    def _matches_any(text, positive, negative):
+        for term in negative:
+            if term in text:
+                return False
+        if not positive:
+            return True
+        for term in positive:
+            if term in text:
+                return True
+        return False
+
+
+#endregion
+#region - TextIndex
+
+
+class TextIndex:
+    """
+    Postings of the words of the searchable texts, kept in step by FilterCache.
+
+    A typed term is looked up in the vocabulary, and the texts holding one of
+    the words containing it come from their postings, so a keystroke costs a
+    scan of the distinct words instead of every text.
+    """
+    def __init__(self):
+        self.postings = {}  # {word: {paths}}
+        self._words = {}  # {term: [words containing it]}, dropped when the vocabulary changes
+
+
+    def add(self, file_path, text):
+        for word in split_words(text):
+            paths = self.postings.get(word)
+            if paths is None:
+                self.postings[word] = {file_path}
+                self._words.clear()
+            else:
+                paths.add(file_path)
+
+
+    def remove(self, file_path, text):
+        for word in split_words(text):
+            paths = self.postings[word]
+            paths.discard(file_path)
+            if not paths:
+                del self.postings[word]
+                self._words.clear()
+
+
+    def lookup(self, term, budget):
+        """
+        Return the paths whose text may contain term, exactly those for a single word.
+
+        A phrase is looked up by its longest word. Returns None for a term with no word,
+        or when the postings to join add up to more than budget, testing the texts is cheaper then.
+        """
+        parts = term.split()
+        if not parts:
+            return None
+        postings = [self.postings[word] for word in self.words_containing(max(parts, key=len))]
+        if sum(map(len, postings)) > budget:
+            return None
+        return set().union(*postings)
+
+
+    def words_containing(self, part):
+        words = self._words.get(part)
+        if words is not None:
+            return words
+        # Typing extends the previous term, so only the words found for it are scanned again
+        vocabulary = self.postings
+        for known_part, known_words in self._words.items():
+            if known_part in part and len(known_words) < len(vocabulary):
+                vocabulary = known_words
+        words = [word for word in vocabulary if part in word]
+        if len(self._words) >= MAX_CACHED_TERMS:
+            self._words.clear()
+        self._words[part] = words
+        return words
+
+
+#endregion
+#region - FilterCache
+
+
+class FilterCache:
+    """LRU cache of filter results, plus the lower cased searchable text of each record."""
+    def __init__(self, max_queries=MAX_CACHED_QUERIES):
+        self.max_queries = max_queries
+        self.results = OrderedDict()  # {query key: (query, [paths])}
+        self.revision = None
+        self._texts = OrderedDict()  # {fields: (revision, {path: record}, {path: text}, TextIndex)}
+        self._order = (None, [])  # (revision, paths newest first)
+
+
+    def clear(self):
+        self.results.clear()
+        self._texts.clear()
+        self._order = (None, [])
+        self.revision = None
+
+
+    def validate(self, revision):
+        """Drop cached results when the database changed since they were computed."""
+        if revision != self.revision:
+            self.results.clear()
+            self.revision = revision
+
+
+    def lookup(self, query):
+        """
+        Return (base query, paths) for the best cached starting point of a query.
+
+        The paths are the final result when the base query is the query itself,
+        otherwise they are a superset to refine. Returns (None, None) when a full scan is needed.
+        """
+        entry = self.results.get(query.key)
+        if entry is not None:
+            self.results.move_to_end(query.key)
+            return entry
+        best = (None, None)
+        for cached_query, paths in reversed(self.results.values()):
+            if (best[1] is None or len(paths) < len(best[1])) and query.narrows(cached_query):
+                best = (cached_query, paths)
+        return best
+
+
+    def store(self, query, paths):
+        self.results[query.key] = (query, paths)
+        self.results.move_to_end(query.key)
+        while len(self.results) > self.max_queries:
+            self.results.popitem(last=False)
+
+
+    def sorted_paths(self, database):
+        """Return the database paths newest first by their stored mtime, sorted once per revision."""
+        if self._order[0] != self.revision:
+            mtimes = {file_path: record.get('modified_time_stamp') or 0 for file_path, record in database.items()}
+            self._order = (self.revision, sorted(mtimes, key=mtimes.__getitem__, reverse=True))
+        return self._order[1]
+
+
+    def searchable_texts(self, database, fields):
+        """Return {path: lower cased text of the fields}, only records changed since the last call are joined and indexed again."""
+        entry = self._texts.get(fields)
+        if entry is not None:
+            self._texts.move_to_end(fields)
+            if entry[0] == self.revision:
+                return entry[2]
+        records, texts, index = ({}, {}, TextIndex()) if entry is None else entry[1:]
+        for file_path in [file_path for file_path in records if file_path not in database]:
+            index.remove(file_path, texts.pop(file_path))
+            del records[file_path]
+        for file_path, record in database.items():
+            if records.get(file_path) is not record:
+                records[file_path] = record
+                text = join_fields(record, fields)
+                old_text = texts.get(file_path)
+                if text != old_text:
+                    if old_text is not None:
+                        index.remove(file_path, old_text)
+                    index.add(file_path, text)
+                    texts[file_path] = text
+        self._texts[fields] = (self.revision, records, texts, index)
+        while len(self._texts) > MAX_INDEXED_FIELD_SETS:
+            self._texts.popitem(last=False)
+        return texts
+
+
+    def text_index(self, fields):
+        """Return the TextIndex of the texts searchable_texts last returned for the fields."""
+        return self._texts[fields][3]
+
+
+#endregion
+#region - Matching
+
+
+def find_matches(database_manager, filter_cache, query, folder):
+    """
+    Return the database paths matching a query newest first, or grouped for near-duplicates.
+
+    A cached broader result is refined when there is one. Nothing here needs
+    Tk, the viewer and the benchmarks run the same matching.
+
+    Args:
+        database_manager (DatabaseManager): Records and the parameter and hash indexes
+        filter_cache (FilterCache): Results and searchable texts of earlier queries
+        query (FilterQuery): Query to answer
+        folder (str): Watched folder, 'similar:' names are resolved in it
+    """
+    database = database_manager.load_database()
+    filter_cache.validate(database_manager.revision)
+    base, matches = filter_cache.lookup(query)
+    if base is not None and base.key == query.key:
+        return matches
+    # Apply filters on database, narrowed to the cached, near-duplicate and predicate matches first
+    candidates = filter_cache.sorted_paths(database) if matches is None else matches
+    similar_order = find_similar_images(database_manager, query.similar_names, folder) if query.similar_names else None
+    if similar_order is not None:
+        candidates = [filepath for filepath in similar_order if filepath in database]
+    predicates = query.new_predicates(base)
+    if predicates:
+        predicate_matches = database_manager.parameter_store.query(predicates)
+        candidates = [filepath for filepath in candidates if filepath in predicate_matches]
+    if not query.include_saved and base is None:
+        is_saved_path = database_manager.is_saved_path
+        candidates = [filepath for filepath in candidates if not is_saved_path(filepath)]
+    if query.positive_terms or query.negative_terms:
+        texts = filter_cache.searchable_texts(database, query.fields)
+        matches = query.select(candidates, texts, base, filter_cache.text_index(query.fields))
+    else:
+        matches = list(candidates)
+    filter_cache.store(query, matches)
+    return matches
+
+
+def find_similar_images(database_manager, names, folder):
+    """Return near-duplicate paths for 'similar:' filter names, '*' lists every group."""
+    database = database_manager.load_database()
+    mtime = lambda path: database[path].get('modified_time_stamp', 0)
+    results = []
+    for name in names:
+        if name == "*":
+            groups = [sorted(group, key=mtime, reverse=True) for group in database_manager.group_similar()]
+            groups.sort(key=lambda group: mtime(group[0]), reverse=True)
+            for group in groups:
+                results.extend(group)
+            continue
+        file_path = find_image_by_name(name, database, folder)
+        if file_path:
+            results.extend(database_manager.find_similar(file_path))
+    # Drop repeats while keeping the first position
+    return list(dict.fromkeys(results))
+
+
+def find_image_by_name(name, database, folder):
+    file_path = os.path.join(folder, name)
+    if file_path in database:
+        return file_path
+    for file_path in database:
+        if os.path.basename(file_path).lower() == name:
+            return file_path
+    return None
+
+
+#endregion
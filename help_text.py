@@ -8,7 +8,7 @@ Key Features:
 ----------------------------------------
 • Live Updates: Automatically detects new images added to the watched folder.
 • Image Navigation: Easily browse through images using the navigation buttons or keyboard shortcuts (Left/Right arrow keys).
-• Image Deletion: Quickly delete unwanted images with a simple click or the 'Del' key.
+• Image Deletion: Quickly delete unwanted images with a simple click or the 'Del' key, 'Ctrl+Z' brings them back.
 • Image Saving: Move images to a designated 'Saved Images' folder for later use with a click or the 'Ins' key.
 • Quick Actions: Toggle quick move and delete options to bypass confirmation dialogs.
 • Image Statistics: Displays image metadata such as file size, dimensions, and modification date.
@@ -30,6 +30,10 @@ Keyboard Shortcuts:
 ----------------------------------------
 • Left/Right Arrow Keys: Navigate through images.
 • Del: Delete the current image.
+• Ctrl+Z: Restore the last deleted image, or the last deleted selection.
+• Space: Select or deselect the current image, Shift+Space selects a range.
+• Ctrl+A: Select all listed images, Esc clears the selection.
+• G: Toggle the thumbnail grid.
 • Ins: Move the current image to the saved folder.
 
 Notes:
@@ -42,10 +46,10 @@ Notes:
 FILTER_HELP_TEXT = """
 - Use the 'Search' menu and select a filter type(s).
 - Enter keywords based on the selected type(s).
-- Press 'Enter' to apply the filter.
+- Results update as you type, press 'Enter' to apply the filter right away.
 - Use the 'Clear' button to reset filters.
 - Use the 'Refresh' button to update the database.
-- Live Mode is disabled when filters are active.
+- Live Mode keeps running while a filter is active, new images that match it are added to the results.
 ----------------------------------------
 - Operators:
 ----------------------------------------
@@ -77,4 +81,38 @@ Show "mountain" OR "lake" at "sunset" but NOT "beach".
 
 2)  -"mountain ~ lake" sunset beach
 NOT images of "mountain" OR "lake" at "sunset" AND "beach".
+----------------------------------------
+- Parameter Filters:
+----------------------------------------
+Compare generation parameters by value instead of text.
+Fields: steps, cfg, seed, width, height, denoise, clipskip,
+sampler, schedule, model, format
+
+• Compare: steps>=30   cfg<7   seed=1234
+• Range: cfg:5..7   (open ended: steps:30..)
+• Exact value: sampler="euler a"   model!=sdxl
+• Contains: model:pony
+• Exclude: -steps<20
+
+Parameter filters ignore the 'Search' menu and can be mixed with text terms.
+----------------------------------------
+- Near-Duplicates:
+----------------------------------------
+• similar:"image.png" shows images that look like image.png, closest first.
+• similar:* shows every group of near-duplicate images.
+Both are also available from the 'Search' menu.
+----------------------------------------
+- Saved Searches:
+----------------------------------------
+Search > Saved Searches saves the current filter under a name and reopens it with one click.
+Their results are kept up to date as images are added, removed or moved.
+----------------------------------------
+- Facets:
+----------------------------------------
+Search > Facets lists the models, samplers, schedule types, sizes and CFG ranges of the listed images with their counts.
+Click a value to add it to the filter.
+----------------------------------------
+- Saved Images:
+----------------------------------------
+Enable 'Include Saved Images' in the 'Search' menu to search the Saved Images folder too.
 """
@@ -4,57 +4,59 @@
 # First-party
 import os
 import json
-import time
-import tkinter as tk
-from tkinter import ttk
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
 
 # Third-party
-import png
 from PIL import Image
 
+# Local
+from parameter_store import ParameterStore
+from database_format import encode_database, decode_database
+from facet_index import FacetCounts
+from phash_index import PerceptualHashIndex, compute_dhash, DEFAULT_MAX_DISTANCE
+from perf_monitor import timed
+from progress_reporting import NullProgress
+
 
 #endregion
-#region - ProgressPopup
-
-
-class ProgressPopup:
-    def __init__(self, parent):
-        self.popup = tk.Toplevel(parent)
-        self.popup.title("Updating Database")
-        self.popup.transient(parent)
-        self.popup.grab_set()
-        # Center the popup
-        self.popup.update_idletasks()
-        width = self.popup.winfo_width()
-        height = self.popup.winfo_height()
-        x = parent.winfo_x() + (parent.winfo_width() // 2) - (width // 2)
-        y = parent.winfo_y() + (parent.winfo_height() // 2) - (height // 2)
-        self.popup.geometry(f"+{x}+{y}")
-        # Status label
-        self.status_label = tk.Label(self.popup, text="Scanning files...", pady=10)
-        self.status_label.pack()
-        # Detail label
-        self.detail_label = tk.Label(self.popup, text="")
-        self.detail_label.pack()
-        # Progress bar
-        self.progressbar = ttk.Progressbar(self.popup, length=250, mode='determinate')
-        self.progressbar.pack(fill="x", padx=10, pady=10)
-        # Percent label
-        self.percent_label = tk.Label(self.popup, text="0%", anchor="e", width=10)
-        self.percent_label.pack(fill="x", padx=10, pady=(0, 10))
-        self.popup.protocol("WM_DELETE_WINDOW", lambda: None)  # Disable close button
-
-    def update(self, progress, status="", detail=""):
-        self.progressbar['value'] = progress
-        self.percent_label['text'] = f"{int(progress)}%"
-        if status:
-            self.status_label['text'] = status
-        if detail:
-            self.detail_label['text'] = detail
-        self.popup.update()
-
-    def close(self):
-        self.popup.destroy()
+#region - Constants
+
+
+SAVE_DELAY_MS = 2000  # Batch window for saves triggered by live file events
+BASIC_METADATA_KEYS = ("file_size", "width", "height", "format", "modified_time_stamp", "dhash", "fingerprint")
+REQUIRED_FIELDS = ("dhash", "fingerprint")  # Records without these are processed again, an unchanged file missing only its fingerprint just gets one
+FINGERPRINT_BYTES = 64 * 1024
+MAX_ORPHAN_RECORDS = 5000
+PARSE_CHUNK_SIZE = 64  # Files handed to a worker process at a time
+APP_FOLDER_PREFIX = ".IW_"  # Trash staging and thumbnail cache folders, never indexed
+
+
+def compute_fingerprint(file_path):
+    """Cheap content fingerprint: the file size plus a hash of the header chunks"""
+    with open(file_path, 'rb') as f:
+        head = f.read(FINGERPRINT_BYTES)
+        size = os.fstat(f.fileno()).st_size
+    return f"{size:x}-{hashlib.blake2b(head, digest_size=12).hexdigest()}"
+
+
+def read_records(watch_folder, valid_extensions, files):
+    """
+    Worker process half of a parallel update, parse files into records without a shared database.
+
+    Args:
+        watch_folder (str): Watch folder of the database
+        valid_extensions (tuple): Image extensions
+        files (list): (path, fingerprint) pairs
+
+    Returns:
+        list: (path, record) pairs, record is None if the file could not be read
+    """
+    reader = DatabaseManager(None, watch_folder, valid_extensions, "")
+    records = {}
+    for file_path, fingerprint in files:
+        reader._process_single_file(file_path, records, fingerprint=fingerprint)
+    return [(file_path, records.get(file_path)) for file_path, _ in files]
 
 
 #endregion
@@ -62,19 +64,35 @@ class ProgressPopup:
 
 
 class DatabaseManager:
-    def __init__(self, root, watch_folder, valid_extensions, image_db_filename):
+    def __init__(self, root, watch_folder, valid_extensions, image_db_filename, saved_folder_name=None):
         self.root = root
         self.watch_folder = watch_folder
         self.valid_extensions = valid_extensions
         self.database_filename = image_db_filename
+        self.saved_folder_name = saved_folder_name
         self.database_path = os.path.join(self.watch_folder, self.database_filename)
+        self.saved_folder = os.path.join(self.watch_folder, saved_folder_name) if saved_folder_name else None
         self._cached_database = None
+        self._save_job = None
+        self.parameter_store = ParameterStore()
+        self.hash_index = PerceptualHashIndex()
+        self.facets = FacetCounts()  # Watch folder images only, the Saved Images folder is not part of the image list
+        self.loading_in_background = False
+        self.revision = 0  # Bumped on every change to the cached database
+        self.record_listeners = []  # listener(path, record) after each change, record is None on removal, path is None on reload
+        # Records are content addressed, the path keyed database is an index over them
+        self._records = {}  # {fingerprint: record}
+        self._paths_by_fingerprint = {}
+        self._orphans = {}  # Fingerprints whose files are gone, oldest first
 
     def update_watch_folder(self, new_folder):
         """Update the watch folder and reset database cache"""
+        self.flush_pending_save()
         self.watch_folder = new_folder
         self.database_path = os.path.join(self.watch_folder, self.database_filename)
-        self._cached_database = None  # Clear the cache
+        self.saved_folder = os.path.join(self.watch_folder, self.saved_folder_name) if self.saved_folder_name else None
+        self._reset_cache(None)  # Clear the cache
+        self.loading_in_background = False
 
 
 #endregion
@@ -82,21 +100,147 @@ class DatabaseManager:
 
 
     def load_database(self):
-        """Load the image database from JSON file"""
+        """Load the image database from JSON file, keys are resolved against the current watch folder"""
         if self._cached_database is None:
-            try:
-                with open(self.database_path, 'r', encoding="utf-8") as f:
-                    self._cached_database = json.load(f)
-            except (FileNotFoundError, json.JSONDecodeError):
-                self._cached_database = {}
+            self._reset_cache(*self._read_database_file())
         return self._cached_database
 
 
+    def is_loaded(self):
+        return self._cached_database is not None
+
+
+    def _read_database_file(self):
+        """Return (database, orphan records) from the database file"""
+        try:
+            with open(self.database_path, 'r', encoding="utf-8") as f:
+                return decode_database(json.load(f), self.watch_folder)
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, IndexError, TypeError):
+            return {}, []
+
+
+    def _reset_cache(self, database, orphans=()):
+        """Replace the cached database and rebuild the indexes kept alongside it"""
+        self._cached_database = database
+        self.revision += 1
+        self.parameter_store.clear()
+        self.hash_index.clear()
+        self.facets.clear()
+        self._records = {}
+        self._paths_by_fingerprint = {}
+        self._orphans = {}
+        self._notify(None, None)
+        if database is None:
+            return
+        self.parameter_store.build(database)
+        self.facets.build((file_path, record) for file_path, record in database.items() if not self.is_saved_path(file_path))
+        for file_path, record in database.items():
+            self._link_fingerprint(file_path, record)
+        for record in orphans:
+            fingerprint = record.get('fingerprint')
+            if fingerprint and fingerprint not in self._records:
+                self._records[fingerprint] = record
+                self._orphans[fingerprint] = None
+
+
     def save_database(self, database):
         """Save the image database to JSON file"""
-        with open(self.database_path, 'w', encoding="utf-8") as f:
-            json.dump(database, f, indent=4)
-        self._cached_database = database  # Update the cached database
+        self._cancel_pending_save()
+        if database is not self._cached_database:
+            self._reset_cache(database)  # Update the cached database
+        orphans = [self._records[fingerprint] for fingerprint in self._orphans]
+        data = encode_database(database, self.watch_folder, orphans)
+        temp_path = self.database_path + ".tmp"
+        with open(temp_path, 'w', encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(temp_path, self.database_path)
+
+
+    def schedule_save(self):
+        """Save the cached database once the current batch of changes settles"""
+        if not self.root:
+            self.save_database(self.load_database())
+            return
+        self._cancel_pending_save()
+        self._save_job = self.root.after(SAVE_DELAY_MS, self.flush_pending_save)
+
+
+    def flush_pending_save(self):
+        """Write a pending batched save immediately"""
+        if self._save_job is None:
+            return
+        self._save_job = None
+        self.save_database(self.load_database())
+
+
+    def _cancel_pending_save(self):
+        if self._save_job is not None:
+            if self.root:
+                self.root.after_cancel(self._save_job)
+            self._save_job = None
+
+
+#endregion
+#region - Metadata lookup
+
+
+    def get_metadata(self, file_path, mtime=None, image=None):
+        """Return the record for a path, parsing the file only if it is unknown or stale"""
+        if self.loading_in_background and not self.is_loaded():
+            # Don't block on the database file, parse just this image
+            records = {}
+            self._process_single_file(file_path, records, image)
+            return records.get(file_path)
+        database = self.load_database()
+        if mtime is None:
+            mtime = self._get_mtime(file_path)
+        record = database.get(file_path)
+        if record is not None and record.get('modified_time_stamp') == mtime:
+            return record
+        # Unknown or stale: reuse a record with the same content, or parse now and keep the result
+        fingerprint = self._get_fingerprint(file_path)
+        if self._is_tracked(file_path) and self._attach_known_record(file_path, database, fingerprint, mtime):
+            self.schedule_save()
+            return database[file_path]
+        records = {}
+        self._process_single_file(file_path, records, image, fingerprint)
+        record = records.get(file_path)
+        if record is not None and self._is_tracked(file_path):
+            self._set_record(database, file_path, record)
+            self.schedule_save()
+        return record
+
+
+    def get_png_metadata(self, file_path, mtime=None, image=None):
+        """Return only the PNG text metadata of a record"""
+        if not self._is_valid_png(file_path):
+            return None
+        record = self.get_metadata(file_path, mtime, image)
+        if not record:
+            return None
+        return {key: value for key, value in record.items() if key not in BASIC_METADATA_KEYS}
+
+
+#endregion
+#region - Near-duplicates
+
+
+    def get_hash_index(self):
+        """Return the perceptual hash index, building it on first use"""
+        database = self.load_database()
+        if not self.hash_index.built:
+            self.hash_index.build(database)
+        return self.hash_index
+
+
+    def find_similar(self, file_path, max_distance=DEFAULT_MAX_DISTANCE):
+        """Return paths of images that look like file_path, closest first"""
+        return self.get_hash_index().find_similar(file_path, max_distance)
+
+
+    def group_similar(self, max_distance=DEFAULT_MAX_DISTANCE):
+        """Return groups of near-duplicate images"""
+        return self.get_hash_index().group_similar(max_distance)
 
 
 #endregion
@@ -132,6 +276,7 @@ class DatabaseManager:
     def _get_png_chunks(self, filepath):
         """Extract raw chunks from PNG file"""
         try:
+            import png  # Imported on first use, startup reads no PNG chunks
             png_reader = png.Reader(filepath)
             return png_reader.chunks()
         except Exception as e:
@@ -174,28 +319,44 @@ class DatabaseManager:
 #region - Update database
 
 
-    def update_database(self, recursive=False):
-        """Creates or updates the database of images and their metadata"""
-        if not self.root:
-            return super().update_database(recursive)
+    @timed("update_database")
+    def update_database(self, recursive=False, progress=None, workers=1):
+        """
+        Creates or updates the database of images and their metadata.
+
+        Args:
+            recursive (bool): Include subfolders
+            progress (object): Reporter with update and close, a ProgressPopup is shown by default when there is a Tk root
+            workers (int): Processes parsing new and changed files, 1 parses them in this process
+        """
         database = self.load_database()
         current_files = set()
-        # Create progress popup
-        progress_popup = ProgressPopup(self.root)
+        if progress is None:
+            if self.root:
+                from progress_popup import ProgressPopup  # Tk is only loaded by the GUI
+                progress = ProgressPopup(self.root)
+            else:
+                progress = NullProgress()
         # Collect all valid files first
         all_files, total_files = self._collect_valid_files(recursive)
-        self._sync_files_with_database(database, current_files, progress_popup, all_files, total_files)
-        progress_popup.update(100, "Cleaning up database...", "")
+        if workers > 1:
+            self._sync_files_in_parallel(database, current_files, progress, all_files, workers)
+        else:
+            self._sync_files_with_database(database, current_files, progress, all_files, total_files)
+        progress.update(100, "Cleaning up database...", "")
         self._cleanup_removed_files(database, current_files)
         self.save_database(database)
-        progress_popup.close()
+        progress.close()
         return database
 
 
     def _collect_valid_files(self, recursive):
         walk_iter = os.walk(self.watch_folder) if recursive else [(self.watch_folder, [], os.listdir(self.watch_folder))]
+        if not recursive and self.saved_folder and os.path.isdir(self.saved_folder):
+            walk_iter.append((self.saved_folder, [], os.listdir(self.saved_folder)))
         all_files = []
-        for root, _, files in walk_iter:
+        for root, folders, files in walk_iter:
+            folders[:] = [folder for folder in folders if not folder.startswith(APP_FOLDER_PREFIX)]
             for file in files:
                 if file.lower().endswith(self.valid_extensions):
                     all_files.append(os.path.join(root, file))
@@ -224,49 +385,436 @@ class DatabaseManager:
             detail = os.path.basename(file_path)
             progress_popup.update(progress, status, detail)
             # Process file if necessary
-            if self._should_process_file(file_path, database):
-                self._process_single_file(file_path, database)
+            self._ingest_file(file_path, database)
+
+
+    def _sync_files_in_parallel(self, database, current_files, progress, all_files, workers):
+        """Like _sync_files_with_database, with the files that need parsing read by a pool of worker processes"""
+        if not all_files:
+            self._delete_database()
+            progress.update(100, "No images found, database deleted", "")
+            return
+        pending = []
+        for file_path in all_files:
+            current_files.add(file_path)
+            if not self._should_process_file(file_path, database):
+                continue
+            fingerprint = self._get_fingerprint(file_path)
+            if database is self._cached_database and self._attach_known_record(file_path, database, fingerprint):
+                continue
+            if self._add_fingerprint(file_path, database, fingerprint):
+                continue
+            pending.append((file_path, fingerprint))
+        if not pending:
+            return
+        progress.update(0, f"Processing {len(pending)} files with {workers} workers")
+        chunks = [pending[i:i + PARSE_CHUNK_SIZE] for i in range(0, len(pending), PARSE_CHUNK_SIZE)]
+        done = 0
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(read_records, self.watch_folder, self.valid_extensions, chunk) for chunk in chunks]
+            for future in futures:  # In submission order, so the database is filled in the same order as a serial update
+                results = future.result()
+                for file_path, record in results:
+                    if record is not None:
+                        self._set_record(database, file_path, record)
+                done += len(results)
+                progress.update(done / len(pending) * 100, f"Processed {done} of {len(pending)} files", os.path.basename(results[-1][0]))
 
 
     def _should_process_file(self, file_path, database):
         """Determine if a file needs to be processed based on modification time"""
-        if file_path not in database:
+        if file_path not in database or not self._is_current(database[file_path]):
             return True
         last_modified = os.path.getmtime(file_path)
         return database[file_path].get('modified_time_stamp') != last_modified
 
 
-    def _process_single_file(self, file_path, database):
+    def _is_current(self, record):
+        return all(key in record for key in REQUIRED_FIELDS)
+
+
+    def _ingest_file(self, file_path, database):
+        """Add or refresh a file, reusing the record of identical content before parsing it"""
+        if not self._should_process_file(file_path, database):
+            return False
+        fingerprint = self._get_fingerprint(file_path)
+        if database is self._cached_database and self._attach_known_record(file_path, database, fingerprint):
+            return True
+        if self._add_fingerprint(file_path, database, fingerprint):
+            return True
+        self._process_single_file(file_path, database, fingerprint=fingerprint)
+        return file_path in database
+
+
+    def _add_fingerprint(self, file_path, database, fingerprint, mtime=None):
+        """Complete a record from before content fingerprints whose file is unchanged, without parsing it again"""
+        record = database.get(file_path)
+        if record is None or not fingerprint or not self._lacks_only_fingerprint(record):
+            return False
+        mtime = self._get_mtime(file_path) if mtime is None else mtime
+        if mtime is None or record.get('modified_time_stamp') != mtime:
+            return False
+        self._set_record(database, file_path, dict(record, fingerprint=fingerprint))
+        return True
+
+
+    def _lacks_only_fingerprint(self, record):
+        return 'fingerprint' not in record and all(key in record for key in REQUIRED_FIELDS if key != 'fingerprint')
+
+
+    def _process_single_file(self, file_path, database, image=None, fingerprint=None):
         """Process a single image file and update its metadata in the database"""
         try:
-            with Image.open(file_path) as image:
+            if image is None:
+                with Image.open(file_path) as image:
+                    metadata = self._extract_basic_metadata(file_path, image)
+                    metadata["dhash"] = self._compute_hash(file_path, image)
+            else:
                 metadata = self._extract_basic_metadata(file_path, image)
-                if file_path.lower().endswith('.png'):
-                    png_metadata = self.extract_png_metadata(file_path)
-                    if png_metadata:
-                        metadata.update(png_metadata)
-                database[file_path] = metadata
+                metadata["dhash"] = self._compute_hash(file_path, image)
+            metadata["fingerprint"] = fingerprint or self._get_fingerprint(file_path)
+            if file_path.lower().endswith('.png'):
+                png_metadata = self.extract_png_metadata(file_path)
+                if png_metadata:
+                    metadata.update(png_metadata)
+            self._set_record(database, file_path, metadata)
         except Exception as e:
             print(f"ERROR: _process_single_file - processing {file_path}: {e}")
 
 
     def _extract_basic_metadata(self, file_path, image):
         """Extract basic metadata common to all image types"""
+        stat = os.stat(file_path)
         return {
-            "file_size": os.path.getsize(file_path),
+            "file_size": stat.st_size,
             "width": image.size[0],
             "height": image.size[1],
             "format": image.format,
-            "modified_time": time.strftime('%Y-%m-%d, %I:%M:%S %p', time.localtime(os.path.getmtime(file_path))),
-            "modified_time_stamp": os.path.getmtime(file_path)
+            "modified_time_stamp": stat.st_mtime
         }
 
 
+    def _compute_hash(self, file_path, image):
+        """Perceptual hash from a reduced-size decode, None if the image can't be decoded"""
+        try:
+            return compute_dhash(image)
+        except Exception as e:
+            print(f"ERROR: _compute_hash - hashing {file_path}: {e}")
+            return None
+
+
+    def _get_fingerprint(self, file_path):
+        try:
+            return compute_fingerprint(file_path)
+        except OSError as e:
+            print(f"ERROR: _get_fingerprint - reading {file_path}: {e}")
+            return None
+
+
     def _cleanup_removed_files(self, database, current_files):
-        """Remove database entries for files that no longer exist"""
+        """Remove database entries for files that no longer exist, their records are kept as orphans"""
         removed_files = set(database.keys()) - current_files
         for file_path in removed_files:
-            del database[file_path]
+            self._drop_record(database, file_path)
+
+
+#endregion
+#region - Background update
+
+
+    def scan_changes(self, file_mtimes, known_state=None):
+        """
+        Worker thread half of a background update, touches no shared state.
+
+        Args:
+            file_mtimes (dict): {path: mtime} of the files currently in the watch folder
+            known_state (tuple): Result of known_state for the loaded database, or None to read the database file
+
+        Returns:
+            tuple: ((database, orphans) read from disk or None, {path: updated record}, [removed paths],
+                {path: (fingerprint, mtime)} of reused records and of records that only need their fingerprint)
+        """
+        loaded = None
+        if known_state is None:
+            loaded = self._read_database_file()
+            database, orphans = loaded
+            known_state = self._known_state(database, {record.get('fingerprint') for record in orphans} | {record.get('fingerprint') for record in database.values()})
+        known_mtimes, known_fingerprints, unfingerprinted = known_state
+        file_mtimes = dict(file_mtimes)
+        file_mtimes.update(self.scan_saved_folder())
+        updated, reused = {}, {}
+        for file_path, mtime in file_mtimes.items():
+            if known_mtimes.get(file_path) == mtime:
+                continue
+            fingerprint = self._get_fingerprint(file_path)
+            if fingerprint and (fingerprint in known_fingerprints or unfingerprinted.get(file_path) == mtime):
+                reused[file_path] = (fingerprint, mtime)
+            else:
+                self._process_single_file(file_path, updated, fingerprint=fingerprint)
+        removed = [file_path for file_path in known_mtimes if file_path not in file_mtimes]
+        return loaded, updated, removed, reused
+
+
+    def known_state(self):
+        """
+        Return what scan_changes needs to know of the loaded database, or None if it is not loaded yet.
+
+        Returns:
+            tuple: ({path: mtime} of current records, {fingerprints}, {path: mtime} of records from before fingerprints)
+        """
+        if not self.is_loaded():
+            return None
+        return self._known_state(self._cached_database, set(self._records))
+
+
+    def _known_state(self, database, fingerprints):
+        unfingerprinted = {path: record.get('modified_time_stamp') for path, record in database.items() if self._lacks_only_fingerprint(record)}
+        return self._valid_mtimes(database), fingerprints, unfingerprinted
+
+
+    def scan_saved_folder(self):
+        """Return {path: mtime} of the images in the saved folder"""
+        file_mtimes = {}
+        if not self.saved_folder:
+            return file_mtimes
+        try:
+            with os.scandir(self.saved_folder) as entries:
+                for entry in entries:
+                    if entry.name.lower().endswith(self.valid_extensions) and entry.is_file():
+                        file_mtimes[entry.path] = entry.stat().st_mtime
+        except OSError:
+            pass
+        return file_mtimes
+
+
+    def _valid_mtimes(self, database):
+        # Records from before content fingerprints get a None mtime so they are processed again
+        return {path: record.get('modified_time_stamp') if self._is_current(record) else None for path, record in database.items()}
+
+
+    def apply_scan_results(self, loaded, updated, removed, reused):
+        """UI thread half of a background update"""
+        self.loading_in_background = False
+        if not self.is_loaded():
+            self._reset_cache(*(loaded if loaded is not None else ({}, [])))
+        cached = self._cached_database
+        # Drop first so moved files leave their records as orphans for the reuse below
+        removed = [file_path for file_path in removed if not os.path.exists(file_path)]
+        for file_path in removed:
+            self._drop_record(cached, file_path)
+        for file_path, record in updated.items():
+            self._set_record(cached, file_path, record)
+        for file_path, (fingerprint, mtime) in reused.items():
+            if not self._attach_known_record(file_path, cached, fingerprint, mtime) and not self._add_fingerprint(file_path, cached, fingerprint, mtime):
+                self._process_single_file(file_path, cached, fingerprint=fingerprint)
+        if updated or removed or reused:
+            self.schedule_save()
+
+
+#endregion
+#region - Incremental updates
+
+
+    def apply_file_changes(self, changes):
+        """Upsert or delete only the entries touched by live file events"""
+        database = self.load_database()
+        changed = False
+        for src, dest in changes.moved.items():
+            record = self._drop_record(database, src)
+            changed |= record is not None
+            if not self._is_tracked(dest):
+                continue
+            if record is not None and record.get('modified_time_stamp') == self._get_mtime(dest):
+                self._set_record(database, dest, record)  # Renamed, the metadata is still valid
+                changed = True
+            else:
+                changed |= self._upsert_file(dest, database)
+        for file_path in changes.removed:
+            changed |= self._drop_record(database, file_path) is not None
+        for file_path in changes.created:
+            if self._is_tracked(file_path):
+                changed |= self._upsert_file(file_path, database)
+        if changed:
+            self.schedule_save()
+        return changed
+
+
+    def move_record(self, old_path, new_path):
+        """Carry the record of a moved or renamed file over to its new path"""
+        return self.move_records([(old_path, new_path)]) > 0
+
+
+    def move_records(self, moves):
+        """Apply a batch of (old path, new path) moves with a single save, return the number of records kept"""
+        if not self.is_loaded():
+            return 0
+        database = self._cached_database
+        kept = 0
+        changed = False
+        for old_path, new_path in moves:
+            record = self._drop_record(database, old_path)
+            changed |= record is not None
+            if not self._is_tracked(new_path):
+                continue
+            changed = True
+            if record is not None and record.get('modified_time_stamp') == self._get_mtime(new_path):
+                self._set_record(database, new_path, record)
+            else:
+                self._upsert_file(new_path, database)
+            kept += new_path in database
+        if changed:
+            self.schedule_save()
+        return kept
+
+
+    def copy_record(self, src_path, dest_path):
+        """Give a copied file the record of its source instead of parsing it again"""
+        if not self.is_loaded() or not self._is_tracked(dest_path):
+            return False
+        database = self._cached_database
+        record = database.get(src_path)
+        if record is None or not self._attach_known_record(dest_path, database, record.get('fingerprint')):
+            self._upsert_file(dest_path, database)
+        self.schedule_save()
+        return dest_path in database
+
+
+    def remove_record(self, file_path):
+        """Drop the record of a deleted file and return it, so an undo can put it back"""
+        return self.remove_records([file_path]).get(file_path)
+
+
+    def remove_records(self, file_paths):
+        """Drop the records of a batch of deleted files with a single save, return {path: record}"""
+        if not self.is_loaded():
+            return {}
+        database = self._cached_database
+        removed = {}
+        for file_path in file_paths:
+            record = self._drop_record(database, file_path)
+            if record is not None:
+                removed[file_path] = record
+        if removed:
+            self.schedule_save()
+        return removed
+
+
+    def restore_records(self, items):
+        """Put back a batch of (path, record) pairs with a single save, return the number of paths in the database"""
+        if not self.is_loaded():
+            return 0
+        database = self._cached_database
+        restored = 0
+        for file_path, record in items:
+            if not self._is_tracked(file_path):
+                continue
+            if record is not None and record.get('modified_time_stamp') == self._get_mtime(file_path):
+                self._set_record(database, file_path, record)
+            else:
+                self._upsert_file(file_path, database)
+            restored += file_path in database
+        self.schedule_save()
+        return restored
+
+
+    def is_saved_path(self, file_path):
+        return bool(self.saved_folder) and file_path.startswith(self.saved_folder) and os.path.dirname(file_path) == self.saved_folder
+
+
+    def _upsert_file(self, file_path, database):
+        """Process a file if it is new or modified, return True if the database changed"""
+        if not os.path.exists(file_path):
+            return self._drop_record(database, file_path) is not None
+        return self._ingest_file(file_path, database)
+
+
+    def _attach_known_record(self, file_path, database, fingerprint, mtime=None):
+        """Point a path at the record of identical content, return False if the content is unknown"""
+        record = self._records.get(fingerprint) if fingerprint else None
+        if record is None:
+            return False
+        mtime = self._get_mtime(file_path) if mtime is None else mtime
+        if mtime is None:
+            return False
+        if record.get('modified_time_stamp') != mtime:
+            record = dict(record, modified_time_stamp=mtime)
+        self._set_record(database, file_path, record)
+        return True
+
+
+    def _set_record(self, database, file_path, record):
+        """Store a record and keep the indexes of the cached database in sync"""
+        previous = database.get(file_path)
+        database[file_path] = record
+        if database is self._cached_database:
+            self.revision += 1
+            if previous is not None and previous.get('fingerprint') != record.get('fingerprint'):
+                self._unlink_fingerprint(file_path, previous)
+            self._link_fingerprint(file_path, record)
+            self.parameter_store.upsert(file_path, record)
+            if not self.is_saved_path(file_path):
+                self.facets.add(file_path, record)
+            if self.hash_index.built:
+                self.hash_index.upsert(file_path, record)
+            self._notify(file_path, record)
+
+
+    def _drop_record(self, database, file_path):
+        record = database.pop(file_path, None)
+        if record is not None and database is self._cached_database:
+            self.revision += 1
+            self._unlink_fingerprint(file_path, record)
+            self.parameter_store.remove(file_path)
+            self.hash_index.remove(file_path)
+            self.facets.remove(file_path)
+            self._notify(file_path, None)
+        return record
+
+
+    def _notify(self, file_path, record):
+        for listener in self.record_listeners:
+            listener(file_path, record)
+
+
+    def _link_fingerprint(self, file_path, record):
+        fingerprint = record.get('fingerprint')
+        if not fingerprint:
+            return
+        self._records[fingerprint] = record
+        self._paths_by_fingerprint.setdefault(fingerprint, set()).add(file_path)
+        self._orphans.pop(fingerprint, None)
+
+
+    def _unlink_fingerprint(self, file_path, record):
+        """Keep the record of content that no longer has a file, so it can come back under another name"""
+        fingerprint = record.get('fingerprint')
+        paths = self._paths_by_fingerprint.get(fingerprint)
+        if not paths:
+            return
+        paths.discard(file_path)
+        if paths:
+            return
+        del self._paths_by_fingerprint[fingerprint]
+        self._orphans[fingerprint] = None
+        while len(self._orphans) > MAX_ORPHAN_RECORDS:
+            oldest = next(iter(self._orphans))
+            del self._orphans[oldest]
+            del self._records[oldest]
+
+
+    def _is_tracked(self, file_path):
+        """Check if a path is an image directly inside the watch folder or the saved folder"""
+        if not file_path.lower().endswith(self.valid_extensions):
+            return False
+        folder = os.path.dirname(file_path)
+        return folder == self.watch_folder or (bool(self.saved_folder) and folder == self.saved_folder)
+
+
+    def _get_mtime(self, file_path):
+        try:
+            return os.path.getmtime(file_path)
+        except OSError:
+            return None
 
 
 #endregion
@@ -3,31 +3,66 @@
 
 # First-party
 import os
+import json
+
+# Local
+from perf_monitor import timed
 
 
 #endregion
 #region - ImageManager
 
 
+SNAPSHOT_SCHEMA = 1
+
+
 class ImageManager:
-    def __init__(self, folder, extensions):
+    def __init__(self, folder, extensions, snapshot_path=None):
         self.folder = folder
         self.valid_extensions = extensions
         self.image_files = []
         self.current_index = -1
         self.current_image_path = None
         self._last_position = 0
-        self.refresh_image_list()
+        self._mtimes = {}
+        self._matcher = None  # Standing filter query, None when the whole folder is shown
+        self._view_mtime = None
+        self._view_listener = None
+        self.selected = set()
+        self._selection_anchor = None  # Last toggled path, one end of a range selection
+        self.restored_from_snapshot = bool(snapshot_path) and self.load_snapshot(snapshot_path)
+        if not self.restored_from_snapshot:
+            self.refresh_image_list()
+
+
+    def scan_folder(self):
+        """List the watched folder and return {path: mtime}, safe to call from a worker thread."""
+        mtimes = {}
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if entry.name.lower().endswith(self.valid_extensions):
+                    try:
+                        if entry.is_file():
+                            mtimes[os.path.join(self.folder, entry.name)] = entry.stat().st_mtime
+                    except OSError:
+                        continue  # Removed while listing
+        return mtimes
 
 
+    @timed("refresh_image_list")
     def refresh_image_list(self, reset_index=True):
-        """Refresh the list of images in the watched folder."""
+        """Refresh the list of images in the watched folder, a filtered view only takes in the differences."""
         current_path = self.get_current_image()
-        self.image_files = [
-            os.path.join(self.folder, f) for f in os.listdir(self.folder)
-            if f.lower().endswith(self.valid_extensions)
-        ]
-        self.image_files.sort(key=os.path.getmtime, reverse=True)
+        mtimes = self.scan_folder()
+        if self._matcher is not None:
+            for path in [path for path in self._mtimes if path not in mtimes]:
+                self._remove_path(path)
+            for path, mtime in mtimes.items():
+                if self._mtimes.get(path) != mtime:
+                    self._add_path(path, mtime)
+        else:
+            self._mtimes = mtimes
+            self.image_files = sorted(self._mtimes, key=self._mtimes.get, reverse=True)
         if not self.image_files:
             self.current_index = -1
             return
@@ -92,4 +127,227 @@ class ImageManager:
         return self.get_current_image()
 
 
+#endregion
+#region - Snapshot
+
+
+    def save_snapshot(self, snapshot_path):
+        """Persist the ordered index so the next launch can show the newest image without a scan."""
+        files = [[os.path.basename(path), self._mtimes[path]] for path in sorted(self._mtimes, key=self._mtimes.get, reverse=True)]
+        try:
+            temp_path = snapshot_path + ".tmp"
+            with open(temp_path, 'w', encoding="utf-8") as f:
+                json.dump({"schema": SNAPSHOT_SCHEMA, "files": files}, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temp_path, snapshot_path)
+        except OSError as e:
+            print(f"ERROR: save_snapshot - writing {snapshot_path}: {e}")
+
+
+    def load_snapshot(self, snapshot_path):
+        """Restore the ordered index from a snapshot, return False if there is none."""
+        try:
+            with open(snapshot_path, 'r', encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("schema") != SNAPSHOT_SCHEMA:
+                return False
+            self._mtimes = {os.path.join(self.folder, name): mtime for name, mtime in data["files"]}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return False
+        self.image_files = list(self._mtimes)
+        # Drop stale entries at the head so the first image shown exists
+        while self.image_files and not os.path.exists(self.image_files[0]):
+            del self._mtimes[self.image_files.pop(0)]
+        if not self.image_files:
+            return False
+        self.current_index = 0
+        return True
+
+
+    def reconcile(self, mtimes):
+        """Replace the index with a background scan result, keeping the current image, a filter has to be set again."""
+        current_path = self.get_current_image()
+        self.clear_filter()
+        # Files added by live events while the scan was running are kept
+        for path in self._mtimes:
+            if path not in mtimes and os.path.exists(path):
+                mtimes[path] = self._mtimes[path]
+        self._mtimes = mtimes
+        self.image_files = sorted(mtimes, key=mtimes.get, reverse=True)
+        self.selected.intersection_update(mtimes)
+        if not self.image_files:
+            self.current_index = -1
+        elif current_path in mtimes:
+            self.current_index = self._index_of(current_path)
+        else:
+            self.current_index = max(0, min(self.current_index, len(self.image_files) - 1))
+
+
+#endregion
+#region - Incremental Updates
+
+
+    def apply_file_changes(self, changes):
+        """Apply created, removed and moved file events to the index without rescanning the folder."""
+        for src, dest in changes.moved.items():
+            self._remove_path(src)
+            self._add_path(dest)
+        for path in changes.removed:
+            self._remove_path(path)
+        for path in changes.created:
+            self._add_path(path)
+        if not self.image_files:
+            self.current_index = -1
+        else:
+            self.current_index = max(0, min(self.current_index, len(self.image_files) - 1))
+
+
+    def get_mtime(self, path):
+        """Return the modification time recorded for an indexed path, or None."""
+        return self._mtimes.get(path)
+
+
+    def indexed_count(self):
+        """Return the number of images in the folder, including those hidden by a filter."""
+        return len(self._mtimes)
+
+
+    def _add_path(self, path, mtime=None):
+        if os.path.join(self.folder, os.path.basename(path)) != path:
+            return
+        if not path.lower().endswith(self.valid_extensions):
+            return
+        if mtime is None:
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                self._remove_path(path)
+                return
+        if path in self._mtimes:
+            if self._mtimes[path] == mtime:
+                return
+            self._remove_path(path)
+        self._mtimes[path] = mtime
+        if self._matcher is None or self._matcher(path):
+            self.image_files.insert(self._insertion_point(mtime), path)
+            if self._view_listener:
+                self._view_listener(path, True)
+
+
+    def _remove_path(self, path):
+        if path not in self._mtimes:
+            return
+        index = self._index_of(path)
+        del self._mtimes[path]
+        self.selected.discard(path)
+        if index is not None:
+            del self.image_files[index]
+            if self._view_listener:
+                self._view_listener(path, False)
+
+
+    def _insertion_point(self, mtime):
+        """Binary search for the position of mtime in the newest-first list."""
+        low, high = 0, len(self.image_files)
+        while low < high:
+            mid = (low + high) // 2
+            if self._sort_mtime(self.image_files[mid]) >= mtime:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+
+    def _index_of(self, path):
+        mtime = self._mtimes[path]
+        index = self._insertion_point(mtime) - 1
+        # Walk back over entries sharing the same timestamp
+        while index >= 0 and self._sort_mtime(self.image_files[index]) == mtime:
+            if self.image_files[index] == path:
+                return index
+            index -= 1
+        return self.image_files.index(path) if path in self.image_files else None
+
+
+    def _sort_mtime(self, path):
+        mtime = self._mtimes.get(path)
+        if mtime is None and self._view_mtime is not None:
+            mtime = self._view_mtime(path)  # Filtered views can list images outside the folder
+        return mtime or 0
+
+
+#endregion
+#region - Filtered View
+
+
+    def set_filter(self, paths, matcher, view_mtime=None, view_listener=None):
+        """
+        Show only the given paths and keep the view current as files come and go.
+
+        Args:
+            paths (list): Filtered paths, newest first
+            matcher (callable): matcher(path) returns True if a new or modified image belongs in the view
+            view_mtime (callable): Sort mtime of listed paths that are not in the watched folder
+            view_listener (callable): view_listener(path, added) is called when a path enters or leaves the view
+        """
+        self.image_files = paths
+        self._matcher = matcher
+        self._view_mtime = view_mtime
+        self._view_listener = view_listener
+
+
+    def clear_filter(self):
+        """Stop the standing query, the caller refreshes the list to show every image again."""
+        self._matcher = None
+        self._view_mtime = None
+        self._view_listener = None
+
+
+#endregion
+#region - Selection
+
+
+    def toggle_selection(self, path=None):
+        """Select or deselect a path, the current image by default, return True if it is now selected."""
+        path = path or self.get_current_image()
+        if path is None:
+            return False
+        self._selection_anchor = path
+        if path in self.selected:
+            self.selected.discard(path)
+            return False
+        self.selected.add(path)
+        return True
+
+
+    def select_range(self, path=None):
+        """Select every listed image between the last toggled image and path, the current image by default."""
+        path = path or self.get_current_image()
+        if path is None:
+            return
+        if self._selection_anchor not in self.image_files:
+            self.toggle_selection(path)
+            return
+        start, end = sorted((self.image_files.index(self._selection_anchor), self.image_files.index(path)))
+        self.selected.update(self.image_files[start:end + 1])
+
+
+    def select_all(self):
+        """Select every listed image, with a filter active only the filtered ones."""
+        self.selected.update(self.image_files)
+
+
+    def clear_selection(self):
+        self.selected.clear()
+        self._selection_anchor = None
+
+
+    def is_selected(self, path):
+        return path in self.selected
+
+
+    def get_selection(self):
+        """Return the selected paths newest first, the cost follows the selection size rather than the list size."""
+        return sorted(self.selected, key=self._sort_mtime, reverse=True)
+
+
 #endregion
@@ -4,18 +4,26 @@
 import os
 import sys
 import time
-import shlex
 import ctypes
+import threading
 import tkinter as tk
-from tkinter import TclError, filedialog
+from collections import OrderedDict
+from tkinter import TclError, filedialog, messagebox, simpledialog
 
 # Local
+from startup_trace import StartupTrace, TRACE_FLAG, TRACE_ENV_VAR
 import help_text
 from file_manager import FileManager
 from image_manager import ImageManager
 from watchdog_manager import WatchdogManager
 from interface_manager import ImageWatcherGUI
-from image_database_manager import DatabaseManager
+from image_database_manager import DatabaseManager, BASIC_METADATA_KEYS
+from filter_cache import FilterCache, FilterQuery, SIMILAR_PREFIX, find_matches
+from facet_index import FacetCounts, facet_filter
+from saved_searches import SavedSearches
+from thumbnail_cache import ThumbnailCache
+from perf_monitor import monitor as perf_monitor, timed, PERF_FLAG, PERF_ENV_VAR
+from watch_folder import VALID_EXTENSIONS, SAVED_FOLDER_NAME, IMAGE_DB_FILENAME, IMAGE_INDEX_FILENAME, SAVED_SEARCHES_FILENAME, FILTER_FIELDS
 
 
 #endregion
@@ -26,9 +34,10 @@ TITLE = "Image-Watcher"
 INITIAL_WINDOW_SIZE = "800x750"
 MIN_WINDOW_SIZE = "200x150"
 
-VALID_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.tif', '.tiff')
-SAVED_FOLDER_NAME = "Saved Images"
-IMAGE_DB_FILENAME = "IW_database.json"
+FILTER_DELAY_MS = 150  # Pause in typing before the filter runs
+TRASH_PURGE_INTERVAL_MS = 5 * 60 * 1000
+NAVIGATE_SETTLE_MS = 80  # Longer than the key repeat interval, a held key only shows its landing image
+STATS_LAYOUT_CACHE_SIZE = 64  # Stats layouts kept for images navigated back to
 
 
 #endregion
@@ -36,7 +45,8 @@ IMAGE_DB_FILENAME = "IW_database.json"
 
 
 class ImageWatcher:
-    def __init__(self):
+    def __init__(self, startup_trace=None):
+        self.startup_trace = startup_trace or StartupTrace()
         self.root = tk.Tk()
         self.application_path = None
         self.set_appid()
@@ -47,37 +57,41 @@ class ImageWatcher:
         self.image_manager = None
         self.database_manager = None
         self.watchdog_manager = None
+        self.saved_searches = None
+        self.thumbnail_cache = None  # Started when the thumbnail grid is first shown
         self.watch_folder_path = None
         self.current_image_path = None
         self._drag_data = {"x": 0, "y": 0}
         self.last_known_file_count = 0
         self.last_index = 0
+        self._reconcile_generation = 0
+        self._navigate_job = None
+        self.perf_always_on = perf_monitor.enabled  # Started with --perf, hiding the HUD keeps collecting
+        self._stats_layouts = OrderedDict()  # {(path, mtime, database revision): (label text, text segments)}
+        self._stats_shown_key = None  # Layout in the stats pane, None when it needs a render
 
         self.live_check_var = tk.BooleanVar(value=True)
         self.show_stats_var = tk.BooleanVar(value=True)
         self.quick_move_var = tk.BooleanVar(value=False)
         self.quick_delete_var = tk.BooleanVar(value=False)
+        self.include_saved_var = tk.BooleanVar(value=False)
         self.swap_nav_row_var = tk.BooleanVar(value=False)
         self.always_on_top_var = tk.BooleanVar(value=False)
         self.show_command_row_var = tk.BooleanVar(value=True)
+        self.show_grid_var = tk.BooleanVar(value=False)
+        self.show_perf_hud_var = tk.BooleanVar(value=False)
         self.image_scale_mode_var = tk.StringVar(value="fill")
         self.text_stat_size_var = tk.StringVar(value="Medium")
         self.image_paned_window_swap_var = tk.BooleanVar(value=False)
         self.image_paned_window_horizontal_var = tk.BooleanVar(value=False)
 
-        self.previous_live_state = None
         self.filter_active = False
-        self.filter_states = {
-            "ALL": tk.BooleanVar(value=True),
-            "Positive Prompt": tk.BooleanVar(value=True),
-            "Negative Prompt": tk.BooleanVar(value=True),
-            "Steps": tk.BooleanVar(value=True),
-            "Sampler": tk.BooleanVar(value=True),
-            "Schedule type": tk.BooleanVar(value=True),
-            "CFG scale": tk.BooleanVar(value=True),
-            "Size": tk.BooleanVar(value=True),
-            "Model": tk.BooleanVar(value=True)
-        }
+        self.filter_cache = FilterCache()
+        self.view_facets = None  # Facet counts of the filtered view, built when first shown
+        self._filter_job = None
+        self._last_filter_text = ""
+        self.filter_states = {"ALL": tk.BooleanVar(value=True)}
+        self.filter_states.update((field, tk.BooleanVar(value=True)) for field in FILTER_FIELDS)
 
 
 #endregion
@@ -123,41 +137,140 @@ class ImageWatcher:
 
 
     def run(self):
+        self.startup_trace.mark("tk ready")
         self.watch_folder_path = filedialog.askdirectory(title="Select Folder to Watch")
         if not self.watch_folder_path:
             self.root.destroy()
             return
+        self.startup_trace.mark("folder chosen")
         self.help_text = help_text
-        self.image_manager = ImageManager(self.watch_folder_path, VALID_EXTENSIONS)
-        self.database_manager = DatabaseManager(self.root, self.watch_folder_path, VALID_EXTENSIONS, IMAGE_DB_FILENAME)
-        self.file_manager = FileManager(self.watch_folder_path, self.image_manager, SAVED_FOLDER_NAME)
+        # Restore the last index snapshot, the folder and database are reconciled in the background
+        self.image_manager = ImageManager(self.watch_folder_path, VALID_EXTENSIONS, self.get_snapshot_path())
+        self.database_manager = DatabaseManager(self.root, self.watch_folder_path, VALID_EXTENSIONS, IMAGE_DB_FILENAME, SAVED_FOLDER_NAME)
+        self.file_manager = FileManager(self.watch_folder_path, self.image_manager, SAVED_FOLDER_NAME, self.database_manager)
+        self.saved_searches = SavedSearches(os.path.join(self.watch_folder_path, SAVED_SEARCHES_FILENAME))
+        self.database_manager.record_listeners.append(self._on_record_changed)
+        source = "snapshot" if self.image_manager.restored_from_snapshot else "folder scan"
+        self.startup_trace.mark(f"index ({source})")
         self.gui = ImageWatcherGUI(self.root, self)
         self.gui.setup_gui()
         self.file_manager.initialize_gui_in_filemanager(self.gui)
-        self.setup_watchdog()
-        self.database_manager.update_database()
-        self.update_display()
+        self.root.update_idletasks()
+        self.startup_trace.mark("window built")
+        self.show_first_image()
+        # Nothing below is needed to show the first image, let it paint first
+        self.root.after_idle(self.start_background_services)
         self.root.focus_force()
         self.root.mainloop()
 
 
+    def start_background_services(self):
+        """Start watching the folder and reconciling the index and database, after the first image is shown."""
+        self.setup_watchdog()
+        self.startup_trace.mark("watchdog started")
+        self.start_background_reconcile()
+        self.schedule_trash_purge()
+
+
     def on_closing(self):
         if self.watchdog_manager:
             self.watchdog_manager.stop()
+        if self.database_manager:
+            self.database_manager.flush_pending_save()
+        if self.image_manager:
+            self.image_manager.save_snapshot(self.get_snapshot_path())
+        if self.thumbnail_cache:
+            self.thumbnail_cache.stop()
         self.root.destroy()
 
 
+    def get_snapshot_path(self):
+        return os.path.join(self.watch_folder_path, IMAGE_INDEX_FILENAME)
+
+
+    def get_thumbnail_cache(self):
+        """Return the thumbnail cache of the watched folder, starting its workers on first use."""
+        if self.thumbnail_cache is None:
+            self.thumbnail_cache = ThumbnailCache(self.watch_folder_path)
+            self.thumbnail_cache.start()
+        return self.thumbnail_cache
+
+
+    def show_first_image(self):
+        """Show the newest known image."""
+        self.last_known_file_count = len(self.image_manager.image_files)
+        if self.image_manager.image_files:
+            self.navigate(index=0)
+        self.gui.update_count_label()
+        self.root.update_idletasks()
+        self.startup_trace.mark(f"first image ({len(self.image_manager.image_files)} images)")
+
+
+    def start_background_reconcile(self):
+        """Scan the folder and sync the database on a worker thread, then apply the result on the UI thread."""
+        self._reconcile_generation += 1
+        generation = self._reconcile_generation
+        image_manager = self.image_manager
+        database_manager = self.database_manager
+        database_manager.loading_in_background = not database_manager.is_loaded()
+        self.gui.set_export_enabled(database_manager.is_loaded())
+        known_state = database_manager.known_state()
+        def worker():
+            try:
+                file_mtimes = image_manager.scan_folder()
+                scan_results = database_manager.scan_changes(file_mtimes, known_state)
+            except Exception as e:
+                print(f"ERROR: start_background_reconcile - scanning {image_manager.folder}: {e}")
+                return
+            self.root.after(0, lambda: self._finish_background_reconcile(generation, file_mtimes, scan_results))
+        threading.Thread(target=worker, daemon=True).start()
+
+
+    def _finish_background_reconcile(self, generation, file_mtimes, scan_results):
+        if generation != self._reconcile_generation:
+            return  # The folder changed while scanning
+        was_newest = self.image_manager.current_index == 0
+        current_image = self.image_manager.get_current_image()
+        self.image_manager.reconcile(file_mtimes)
+        self.database_manager.apply_scan_results(*scan_results)
+        self.gui.set_export_enabled(True)
+        self.image_manager.save_snapshot(self.get_snapshot_path())
+        self.last_known_file_count = len(self.image_manager.image_files)
+        if self.filter_active:
+            self.apply_filters()
+        elif not self.image_manager.image_files:
+            self.gui.image_label.clear()
+            self.gui.update_count_label()
+        elif was_newest or current_image not in file_mtimes:
+            if self.image_manager.get_latest_image() != current_image:
+                self.navigate(index=0)
+            else:
+                self.update_image_stats()
+        else:
+            self.update_image_stats()
+        self.gui.update_count_label()
+        self.startup_trace.mark("index reconciled", once=True)
+
+
 #endregion
 #region - Watchdog
 
 
     def setup_watchdog(self):
-        self.watchdog_manager = WatchdogManager(self.watch_folder_path, self.schedule_update)
+        self.watchdog_manager = WatchdogManager(self.watch_folder_path, self.schedule_update, VALID_EXTENSIONS)
         self.watchdog_manager.setup_watchdog(self.live_check_var.get())
 
 
-    def schedule_update(self):
-        self.root.after(0, self.update_display)
+    def schedule_update(self, file_changes=None):
+        self.root.after(0, lambda: self.process_file_changes(file_changes))
+
+
+    @timed("process_file_changes")
+    def process_file_changes(self, file_changes=None):
+        """Sync the database and index with live file events, then update the display."""
+        if file_changes and self.database_manager:
+            self.database_manager.apply_file_changes(file_changes)
+        self.update_display(file_changes)
 
 
     def toggle_live_updates(self):
@@ -174,21 +287,21 @@ class ImageWatcher:
         """Check if files have changed and update index if needed."""
         if not self.image_manager or not self.watch_folder_path:
             return False
-        if self.filter_active:
-            return False  # Skip refreshing if a filter is active
         current_files = [
             f for f in os.listdir(self.watch_folder_path)
             if f.lower().endswith(VALID_EXTENSIONS)
         ]
-        if len(current_files) != len(self.image_manager.image_files):
+        if len(current_files) != self.image_manager.indexed_count():
             self.image_manager.refresh_image_list(reset_index=False)
             return True
         return False
 
 
+    @timed("navigate")
     def navigate(self, direction="next", index=None):
         if not self.image_manager:
             return
+        self._cancel_step_navigation()
         # Check for file changes if live mode is disabled
         if not self.live_check_var.get():
             self.check_file_changes()
@@ -205,34 +318,79 @@ class ImageWatcher:
                 self.gui.quick_switch_tooltip.config(text="Click to return to first image")
 
 
+    def step_navigate(self, direction):
+        """Arrow key and wheel navigation, repeated steps only move the counter until they stop."""
+        if not self.image_manager:
+            return
+        if self._navigate_job is None:
+            self.navigate(direction)  # A single step shows the image right away
+        else:
+            self.root.after_cancel(self._navigate_job)
+            image_path = self.image_manager.navigate_images(direction)
+            if image_path:
+                self.gui.update_count_label()
+                self._show_navigation_preview(image_path)
+        self._navigate_job = self.root.after(NAVIGATE_SETTLE_MS, self.flush_navigation)
+
+
+    def flush_navigation(self):
+        """Show the image the counter points at if repeated steps skipped over it or only previewed it."""
+        self._cancel_step_navigation()
+        current_image = self.image_manager.get_current_image() if self.image_manager else None
+        image_label = self.gui.image_label
+        if current_image and (image_label.preview_active or current_image != image_label.get_image_path()):
+            self.navigate(index=self.image_manager.current_index)
+
+
+    def _cancel_step_navigation(self):
+        if self._navigate_job is not None:
+            self.root.after_cancel(self._navigate_job)
+            self._navigate_job = None
+
+
+    def _show_navigation_preview(self, image_path):
+        # Only thumbnails already on disk, decoding the image is what repeated steps skip
+        if self.thumbnail_cache:
+            thumbnail = self.thumbnail_cache.get_cached(image_path)
+            if thumbnail is not None:
+                self.gui.image_label.set_preview(image_path, thumbnail)
+
+
     def change_folder(self):
         new_folder = filedialog.askdirectory(title="Select New Folder to Watch")
         if new_folder:
             # Stop existing observer if it exists
-            if self.observer:
-                self.observer.stop()
-                self.observer.join()
-                self.observer = None
+            if self.watchdog_manager:
+                self.watchdog_manager.stop()
+            self.image_manager.save_snapshot(self.get_snapshot_path())
             # Update folder and managers
             self.watch_folder_path = new_folder
-            self.image_manager = ImageManager(self.watch_folder_path, VALID_EXTENSIONS)
+            self.image_manager = ImageManager(self.watch_folder_path, VALID_EXTENSIONS, self.get_snapshot_path())
+            self.file_manager.image_manager = self.image_manager
             self.file_manager.initialize_watch_folder(self.watch_folder_path)
             # Update database manager with new path
             self.database_manager.update_watch_folder(new_folder)
+            self.filter_cache.clear()
+            self.saved_searches = SavedSearches(os.path.join(self.watch_folder_path, SAVED_SEARCHES_FILENAME))
+            if self.thumbnail_cache:
+                self.thumbnail_cache.stop()
+                self.thumbnail_cache = None
+                if self.show_grid_var.get():
+                    self.gui.thumbnail_grid.show(self.get_thumbnail_cache())
             # Setup new watchdog for the new path
-            self.watchdog_manager = WatchdogManager(self.watch_folder_path, self.schedule_update)
+            self.watchdog_manager = WatchdogManager(self.watch_folder_path, self.schedule_update, VALID_EXTENSIONS)
             if self.live_check_var.get():
                 self.watchdog_manager.setup_watchdog(True)
-            # Update database and display
-            self.database_manager.update_database()
-            self.update_display()
-            self.watch_folder_path = new_folder
+            # Show the newest image, then update the index and database in the background
+            self.show_first_image()
+            self.start_background_reconcile()
 
 
 #endregion
 #region - Image Display
 
 
+    @timed("display_image")
     def display_image(self, image_path):
         try:
             self.gui.image_label.set_image(image_path)
@@ -241,16 +399,17 @@ class ImageWatcher:
             print("ERROR: display_image - loading image:", e)
 
 
-    def update_display(self):
+    def update_display(self, file_changes=None):
         if self.image_manager:
             # Store current image path and index
             current_image_path = self.image_manager.get_current_image()
             current_index = self.image_manager.current_index
             if self.live_check_var.get():
-                self.refresh_index(reset_index=False)
+                self.refresh_index(reset_index=False, file_changes=file_changes)
             old_file_count = self.last_known_file_count
             self.last_index = self.image_manager.current_index
-            self.apply_filters()
+            if not self.filter_active:
+                self.apply_filters()  # A filtered view is kept current by its standing query
             new_file_count = len(self.image_manager.image_files)
             self.last_known_file_count = new_file_count
             # Reset current index if needed
@@ -276,10 +435,13 @@ class ImageWatcher:
             self.gui.update_count_label()
 
 
-    def refresh_index(self, reset_index=True):
+    def refresh_index(self, reset_index=True, file_changes=None):
         if self.image_manager:
             self.current_image_path = self.image_manager.get_current_image()
-            self.image_manager.refresh_image_list(reset_index=reset_index)
+            if file_changes:
+                self.image_manager.apply_file_changes(file_changes)
+            else:
+                self.image_manager.refresh_image_list(reset_index=reset_index)
             # Check if current image is still available
             if not self.current_image_path or self.current_image_path not in self.image_manager.image_files:
                 # If current image is gone, show the most recent image
@@ -295,52 +457,45 @@ class ImageWatcher:
 #region - Image Stats
 
 
+    @timed("update_image_stats")
     def update_image_stats(self):
         if not self.show_stats_var.get() or not self.image_manager:
             return
         current_image = self.image_manager.get_current_image()
         if not current_image:
             return
+        if not self.gui.stats_pane_visible():
+            self._stats_shown_key = None  # Rendered by on_stats_pane_shown once the pane can be seen
+            return
+        if self.gui.image_label.preview_active:
+            # The label holds a thumbnail, its size and hash must not reach the stats or the database
+            self._stats_shown_key = None  # Rendered once flush_navigation sets the full image
+            return
         try:
-            file_size = os.path.getsize(current_image)
-            file_name = os.path.basename(current_image)
-            image_width = self.gui.image_label.original_image.width
-            image_height = self.gui.image_label.original_image.height
-            mod_time = os.path.getmtime(current_image)
-            mod_time_human_readable = time.strftime('%Y-%m-%d, %I:%M:%S %p', time.localtime(mod_time))
-            # Basic stats
-            label_stats = (
-                f"File: {file_name}\n"
-                f"Size: {file_size / 1024:.1f} KB\n"
-                f"Dimensions: {image_width}x{image_height}\n"
-                f"Modified: {mod_time_human_readable}"
-            )
+            mtime = self.image_manager.get_mtime(current_image)
+            key = (current_image, mtime, self.database_manager.revision)
+            if key == self._stats_shown_key:
+                return
+            layout = self._stats_layouts.get(key)
+            if layout is None:
+                layout = self._build_stats_layout(current_image, mtime)
+                if mtime is not None:
+                    self._stats_layouts[key] = layout
+                    if len(self._stats_layouts) > STATS_LAYOUT_CACHE_SIZE:
+                        self._stats_layouts.popitem(last=False)
+            else:
+                self._stats_layouts.move_to_end(key)
+            label_stats, segments = layout
             self.gui.stats_label.config(text=label_stats)
-            # Add PNG metadata to text widget if available
+            # One insert of all (text, tags) segments, the bold tag is configured with the widget
             self.gui.stats_text.config(state="normal")
             self.gui.stats_text.delete('1.0', "end")
-            # Configure text tags
-            self.gui.stats_text.tag_configure("bold", font=("TkDefaultFont", 10, "bold"))
-            if current_image.lower().endswith('.png'):
-                png_metadata = self.database_manager.extract_png_metadata(current_image)
-                if png_metadata:
-                    # Prompts
-                    for key in ["Positive Prompt", "Negative Prompt"]:
-                        if key in png_metadata:
-                            if key != "Positive Prompt":
-                                self.gui.stats_text.insert("end", "\n")
-                            self.gui.stats_text.insert("end", f"{key}:", "bold")
-                            self.gui.stats_text.insert("end", f"\n{png_metadata[key]}\n")
-                            del png_metadata[key]
-                    # Other parameters
-                    self.gui.stats_text.insert("end", "\n")
-                    self.gui.stats_text.insert("end", "Parameters:", "bold")
-                    self.gui.stats_text.insert("end", "\n")
-                    for key, value in png_metadata.items():
-                        self.gui.stats_text.insert("end", f"{key}: ", "bold")
-                        self.gui.stats_text.insert("end", f"{value}\n")
+            if segments:
+                self.gui.stats_text.insert("end", *segments)
             self.gui.stats_text.config(state="disabled")
+            self._stats_shown_key = key
         except Exception as e:
+            self._stats_shown_key = None
             self.gui.stats_label.config(text=f"Error reading stats: {str(e)}")
             self.gui.stats_text.config(state="normal")
             self.gui.stats_text.delete('1.0', "end")
@@ -348,95 +503,101 @@ class ImageWatcher:
             self.gui.stats_text.config(state="disabled")
 
 
+    def on_stats_pane_shown(self, event=None):
+        """Render stats skipped while the pane was hidden or collapsed."""
+        if self._stats_shown_key is None and self.gui.stats_pane_visible():
+            self.update_image_stats()
+
+
+    def _build_stats_layout(self, current_image, mtime):
+        """Return the stats label text and the stats text as alternating (text, tags) insert arguments."""
+        # Serve stats from the database record, only files unknown to it are read
+        image = self.gui.image_label.original_image
+        record = self.database_manager.get_metadata(current_image, mtime, image) or {}
+        if mtime is None:
+            mtime = record.get('modified_time_stamp')
+        if mtime is None:
+            mtime = os.path.getmtime(current_image)
+        file_size = record.get('file_size')
+        if file_size is None:
+            file_size = os.path.getsize(current_image)
+        file_name = os.path.basename(current_image)
+        mod_time_human_readable = time.strftime('%Y-%m-%d, %I:%M:%S %p', time.localtime(mtime))
+        # Basic stats
+        label_stats = (
+            f"File: {file_name}\n"
+            f"Size: {file_size / 1024:.1f} KB\n"
+            f"Dimensions: {image.width}x{image.height}\n"
+            f"Modified: {mod_time_human_readable}"
+        )
+        # PNG metadata, if available
+        segments = []
+        if current_image.lower().endswith('.png'):
+            png_metadata = {key: value for key, value in record.items() if key not in BASIC_METADATA_KEYS}
+            if png_metadata:
+                # Prompts
+                for key in ["Positive Prompt", "Negative Prompt"]:
+                    if key in png_metadata:
+                        prefix = "\n" if key != "Positive Prompt" else ""
+                        segments += [prefix, (), f"{key}:", "bold", f"\n{png_metadata.pop(key)}\n", ()]
+                # Other parameters
+                segments += ["\n", (), "Parameters:", "bold", "\n", ()]
+                for key, value in png_metadata.items():
+                    segments += [f"{key}: ", "bold", f"{value}\n", ()]
+        return label_stats, segments
+
+
 #endregion
 #region - Filtering Logic
 
 
+    def schedule_filter(self, event=None):
+        """Filter as the user types, once typing pauses for FILTER_DELAY_MS."""
+        if not self.image_manager or self.gui.filter_entry.get() == self._last_filter_text:
+            return
+        if self._filter_job is not None:
+            self.root.after_cancel(self._filter_job)
+        self._filter_job = self.root.after(FILTER_DELAY_MS, self.apply_filters)
+
+
+    @timed("apply_filters")
     def apply_filters(self):
+        if self._filter_job is not None:
+            self.root.after_cancel(self._filter_job)
+            self._filter_job = None
         if not self.image_manager:
             return
-        # Load database and get filter text
-        database = self.database_manager.load_database()
+        # Get filter text
         filter_text = self.gui.filter_entry.get().strip()
-        # Handle live mode based on filter state
-        if filter_text.strip():
-            # Store current live state and disable if active
-            if self.live_check_var.get():
-                self.previous_live_state = True
-                self.live_check_var.set(False)
-                self.gui.view_menu.entryconfig("Toggle: Live Mode", state="disable")
-                self.toggle_live_updates()
-        else:
-            # Restore previous live state if there was one
-            if self.previous_live_state:
-                self.gui.view_menu.entryconfig("Toggle: Live Mode", state="normal")
-                self.live_check_var.set(True)
-                self.toggle_live_updates()
-                self.previous_live_state = None
-        # Use shlex.split to support phrases enclosed in quotes
-        tokens = [token.lower() for token in shlex.split(filter_text)]
-        use_or = "~" in tokens
-        # Extract positive terms (ignoring the "~" tokens and negative tokens)
-        positive_terms = [token for token in tokens if token != "~" and not token.startswith('-')]
-        # Negative terms
-        negative_terms = [token[1:] for token in tokens if token.startswith('-')]
+        self._last_filter_text = self.gui.filter_entry.get()
         active_filters = [key for key, var in self.filter_states.items() if var.get() and key != "ALL"]
-        # If no filter text tokens or no active filters: refresh image list and stop filtering
-        if not tokens or not active_filters:
+        self.view_facets = None
+        query = FilterQuery(filter_text, active_filters, self.include_saved_var.get())
+        # If no text terms (or no active filters) and no predicates: refresh image list and stop filtering
+        if query.is_empty():
+            # Only rebuild the index when leaving a filtered view
+            if self.filter_active:
+                self.image_manager.clear_filter()
+                self.image_manager.refresh_image_list()
             self.filter_active = False
-            self.image_manager.refresh_image_list()
             self.navigate(index=0)
             self.gui.update_count_label()
             return
         self.filter_active = True
-        # Apply filters on database
-        filtered_images = []
-        for filepath, metadata in database.items():
-            if not os.path.exists(filepath):  # Skip if file doesn't exist
-                continue
-            found_negative = False
-            found_positive = True  # Default for AND logic
-            if positive_terms:
-                if use_or:
-                    # For OR, image qualifies if any active filter field contains ANY positive term
-                    found_positive = False
-                    for filter_key in active_filters:
-                        if filter_key == "Size":
-                            value_str = f"{metadata.get('width', '')}x{metadata.get('height', '')}".lower()
-                        else:
-                            value_str = str(metadata.get(filter_key, '')).lower()
-                        if any(term in value_str for term in positive_terms):
-                            found_positive = True
-                            break
-                else:
-                    # For AND, each term must be found in at least one active field
-                    for term in positive_terms:
-                        term_found = False
-                        for filter_key in active_filters:
-                            if filter_key == "Size":
-                                value_str = f"{metadata.get('width', '')}x{metadata.get('height', '')}".lower()
-                            else:
-                                value_str = str(metadata.get(filter_key, '')).lower()
-                            if term in value_str:
-                                term_found = True
-                                break
-                        if not term_found:
-                            found_positive = False
-                            break
-            # Check negative terms in each active filter field
-            for filter_key in active_filters:
-                if filter_key == "Size":
-                    value_str = f"{metadata.get('width', '')}x{metadata.get('height', '')}".lower()
-                else:
-                    value_str = str(metadata.get(filter_key, '')).lower()
-                if any(neg in value_str for neg in negative_terms):
-                    found_negative = True
-                    break
-            if found_positive and not found_negative:
-                filtered_images.append(filepath)
-        # Update image manager with filtered results
+        saved_search = self.saved_searches.match(query) if self.saved_searches else None
+        if saved_search is not None and saved_search.materialized:
+            # Kept current as records change, so it is already newest first and free of removed files
+            filtered_images = list(saved_search.paths)
+        else:
+            # Results come newest first, or grouped for near-duplicates, skip files the live index no longer has
+            get_mtime = self.image_manager.get_mtime
+            is_saved_path = self.database_manager.is_saved_path
+            filtered_images = [filepath for filepath in self.get_filter_matches(query) if get_mtime(filepath) is not None or is_saved_path(filepath)]
+            if saved_search is not None:
+                saved_search.materialize(filtered_images, self.database_manager.load_database())
+        # Update image manager with filtered results, live mode keeps adding new matches to them
         current_image = self.image_manager.get_current_image()
-        self.image_manager.image_files = sorted(filtered_images, key=os.path.getmtime, reverse=True)
+        self.image_manager.set_filter(filtered_images, self.compile_filter(query), self._get_record_mtime, self._on_filtered_view_change)
         # Try to maintain the current image position if it's in the filtered results
         if current_image and current_image in filtered_images:
             new_index = filtered_images.index(current_image)
@@ -451,16 +612,129 @@ class ImageWatcher:
         self.gui.update_count_label()
 
 
+    def get_filter_matches(self, query):
+        """Return the database paths matching a query newest first, refining a cached broader result when possible."""
+        return find_matches(self.database_manager, self.filter_cache, query, self.watch_folder_path)
+
+
+    def compile_filter(self, query):
+        """Return a standing query test for images added while the filter is active."""
+        database_manager = self.database_manager
+        def matcher(filepath):
+            record = database_manager.load_database().get(filepath)
+            if record is None:
+                return False
+            if not query.include_saved and database_manager.is_saved_path(filepath):
+                return False
+            return query.matches_record(record)
+        return matcher
+
+
+    def _get_record_mtime(self, filepath):
+        record = self.database_manager.load_database().get(filepath)
+        return record.get('modified_time_stamp') if record else None
+
+
+    def get_facets(self):
+        """Return the facet counts of the images currently listed."""
+        database = self.database_manager.load_database()
+        if not self.filter_active:
+            return self.database_manager.facets
+        if self.view_facets is None:
+            self.view_facets = FacetCounts()
+            self.view_facets.build((filepath, database[filepath]) for filepath in self.image_manager.image_files if filepath in database)
+        return self.view_facets
+
+
+    def _on_filtered_view_change(self, filepath, added):
+        if self.view_facets is None:
+            return
+        record = self.database_manager.load_database().get(filepath) if added else None
+        if record is not None:
+            self.view_facets.add(filepath, record)
+        else:
+            self.view_facets.remove(filepath)
+
+
+    def add_facet_filter(self, facet, key):
+        """Narrow the current filter to one facet value."""
+        filter_text = self.gui.filter_entry.get().strip()
+        self.gui.filter_entry.delete(0, "end")
+        self.gui.filter_entry.insert(0, f"{filter_text} {facet_filter(facet, key)}".strip())
+        self.apply_filters()
+
+
+    def show_similar_images(self):
+        current_image = self.image_manager.get_current_image() if self.image_manager else None
+        if not current_image:
+            return
+        self.gui.filter_entry.delete(0, "end")
+        self.gui.filter_entry.insert(0, f'{SIMILAR_PREFIX}"{os.path.basename(current_image)}"')
+        self.apply_filters()
+
+
+    def show_duplicate_groups(self):
+        self.gui.filter_entry.delete(0, "end")
+        self.gui.filter_entry.insert(0, f"{SIMILAR_PREFIX}*")
+        self.apply_filters()
+
+
     def reset_filters(self):
         self.gui.filter_entry.delete(0, "end")
-        # Restore previous live state if there was one
-        if self.previous_live_state:
-            self.live_check_var.set(True)
-            self.toggle_live_updates()
-            self.previous_live_state = None
         self.apply_filters()
 
 
+#endregion
+#region - Saved Searches
+
+
+    def save_current_search(self):
+        filter_text = self.gui.filter_entry.get().strip()
+        if not filter_text:
+            messagebox.showinfo("Save Search", "Enter a filter to save first.")
+            return
+        if SIMILAR_PREFIX in filter_text:
+            messagebox.showinfo("Save Search", "Near-duplicate filters can't be saved.")
+            return
+        name = simpledialog.askstring("Save Search", "Name of the saved search:", initialvalue=filter_text, parent=self.root)
+        if not name or not name.strip():
+            return
+        name = name.strip()
+        if name in self.saved_searches.searches and not messagebox.askyesno("Save Search", f"Replace the saved search '{name}'?"):
+            return
+        active_filters = [key for key, var in self.filter_states.items() if var.get() and key != "ALL"]
+        self.saved_searches.add(name, filter_text, active_filters, self.include_saved_var.get())
+        self.apply_filters()  # Builds the result list of the new saved search
+
+
+    def open_saved_search(self, name):
+        search = self.saved_searches.searches.get(name)
+        if not search:
+            return
+        for key, var in self.filter_states.items():
+            if key != "ALL":
+                var.set(key in search.fields)
+        self.filter_states["ALL"].set(all(var.get() for key, var in self.filter_states.items() if key != "ALL"))
+        self.include_saved_var.set(search.include_saved)
+        self.gui.filter_entry.delete(0, "end")
+        self.gui.filter_entry.insert(0, search.filter_text)
+        self.apply_filters()
+
+
+    def delete_saved_search(self, name):
+        if messagebox.askyesno("Delete Saved Search", f"Delete the saved search '{name}'?"):
+            self.saved_searches.remove(name)
+
+
+    def _on_record_changed(self, filepath, record):
+        if self.saved_searches:
+            self.saved_searches.on_record_changed(filepath, record, self.database_manager.is_saved_path)
+
+
+#endregion
+#region - Filter Types
+
+
     def handle_all_filter(self):
         all_state = self.filter_states["ALL"].get()
         for key in self.filter_states:
@@ -480,20 +754,79 @@ class ImageWatcher:
         self.apply_filters()
 
 
+#endregion
+#region - Selection
+
+
+    def toggle_selection(self):
+        self.image_manager.toggle_selection()
+        self.gui.update_count_label()
+
+
+    def select_range(self):
+        self.image_manager.select_range()
+        self.gui.update_count_label()
+
+
+    def select_all(self):
+        self.image_manager.select_all()
+        self.gui.update_count_label()
+
+
+    def clear_selection(self):
+        self.image_manager.clear_selection()
+        self.gui.update_count_label()
+
+
 #endregion
 #region - File Handling
 
 
     def delete_image(self):
+        self.flush_navigation()
+        if self.image_manager.selected:
+            self.file_manager.delete_selected(self.quick_delete_var.get(), on_complete=self._after_selection_operation)
+            return
         current_index = self.file_manager.delete_image(self.quick_delete_var.get())
         self._after_process_navigation(current_index)
 
 
+    def undo_delete(self):
+        restored = self.file_manager.undo_delete()
+        if not restored:
+            return
+        image_path = restored[0]
+        if image_path in self.image_manager.image_files:
+            self.navigate(index=self.image_manager.image_files.index(image_path))
+        self.last_known_file_count = len(self.image_manager.image_files)
+        self.gui.update_count_label()
+
+
+    def schedule_trash_purge(self):
+        """Empty expired files from delete staging on a worker thread, then check again later."""
+        self.file_manager.trash.start_purge()
+        self.root.after(TRASH_PURGE_INTERVAL_MS, self.schedule_trash_purge)
+
+
     def move_image_to_saved_folder(self):
+        self.flush_navigation()
         current_index = self.file_manager.move_image_to_saved_folder(self.quick_move_var.get())
         self._after_process_navigation(current_index)
 
 
+    def move_selected(self):
+        self.file_manager.move_selected(on_complete=self._after_selection_operation)
+
+
+    def copy_selected(self):
+        self.file_manager.copy_selected()
+
+
+    def _after_selection_operation(self, processed):
+        if processed:
+            self._after_process_navigation(self.image_manager.current_index)
+
+
     def _after_process_navigation(self, current_index):
         if current_index is not None:
             if len(self.image_manager.image_files) > 0:
@@ -505,27 +838,49 @@ class ImageWatcher:
 
 
     def move_all_images(self):
-        if self.file_manager.move_all_images():
+        self.file_manager.move_all_images(on_complete=self._after_move_all)
+
+
+    def _after_move_all(self, moved):
+        if moved:
             self.navigate(index=0)
             self.gui.update_count_label()
             self.reset_filters()
 
 
     def move_image_to(self):
+        self.flush_navigation()
         current_index = self.file_manager.move_image_to()
         self._after_process_navigation(current_index)
 
 
     def copy_image_to(self):
+        self.flush_navigation()
         self.file_manager.copy_image_to()
 
 
     def export_current_image_metadata(self):
+        self.flush_navigation()
         self.file_manager.export_current_image_metadata(self.database_manager)
 
 
-    def export_all_metadata(self):
-        self.file_manager.export_all_metadata(self.database_manager)
+    def export_all_metadata(self, export_format="text"):
+        self.file_manager.export_all_metadata(export_format)
+
+
+    def export_perf_trace(self):
+        if not perf_monitor.events:
+            messagebox.showinfo("Export Performance Trace", "No timings were collected.\n\nShow the Performance HUD, or start with --perf, then use the app for a while.")
+            return
+        output_file = filedialog.asksaveasfilename(title="Export Performance Trace", defaultextension=".json", initialfile="IW_trace.json", filetypes=[("Trace Files", "*.json")])
+        if not output_file:
+            return
+        try:
+            count = perf_monitor.export_trace(output_file)
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to write the trace:\n{e}")
+            return
+        messagebox.showinfo("Export Performance Trace", f"Wrote {count} timings to:\n{output_file}\n\nOpen it in chrome://tracing or ui.perfetto.dev")
 
 
 #endregion
@@ -533,7 +888,10 @@ class ImageWatcher:
 
 
 def main():
-    app = ImageWatcher()
+    startup_trace = StartupTrace(TRACE_FLAG in sys.argv[1:] or bool(os.environ.get(TRACE_ENV_VAR)))
+    startup_trace.mark("imports")
+    perf_monitor.enable(PERF_FLAG in sys.argv[1:] or bool(os.environ.get(PERF_ENV_VAR)))
+    app = ImageWatcher(startup_trace)
     app.run()
 
 
@@ -0,0 +1,132 @@
+#region - Imports
+
+
+# First-party
+import os
+import sys
+import argparse
+
+# Local
+from metadata_export import EXPORT_FORMATS
+from progress_reporting import ConsoleProgress, NullProgress
+from watch_folder import WatchFolder, FILTER_FIELDS, TEXT_EXPORT_FORMAT
+
+
+#endregion
+#region - Constants
+
+
+MAX_LISTED_ERRORS = 10
+
+
+#endregion
+#region - Commands
+
+
+def run_index(watch_folder, args, progress):
+    records = watch_folder.index(args.workers, progress)
+    print(f"Indexed {records} images in {watch_folder.folder}")
+    return 0
+
+
+def run_query(watch_folder, args, progress):
+    paths = select_paths(watch_folder, args)
+    for path in paths[:args.limit] if args.limit else paths:
+        print(path)
+    return 0
+
+
+def run_export(watch_folder, args, progress):
+    paths = select_paths(watch_folder, args)
+    batch = watch_folder.export(paths, os.path.abspath(args.destination), args.format, progress)
+    if batch is None:
+        print("No metadata found for the selected images")
+        return 0
+    exported = len(batch.done) if args.format == TEXT_EXPORT_FORMAT else batch.written
+    print(f"Exported metadata of {exported} images to {args.destination}")
+    return report_errors(batch, "export")
+
+
+def run_move(watch_folder, args, progress):
+    if not args.filter and not args.all:
+        print("ERROR: move - give a --filter, or --all to move every image", file=sys.stderr)
+        return 2
+    paths = select_paths(watch_folder, args)
+    batch = watch_folder.move(paths, args.target, args.copy, args.workers, progress)
+    verb = "Copied" if args.copy else "Moved"
+    print(f"{verb} {len(batch.done)} of {len(paths)} images to {args.target}")
+    return report_errors(batch, "copy" if args.copy else "move")
+
+
+def select_paths(watch_folder, args):
+    fields = [field.strip() for field in args.fields.split(",")] if args.fields else FILTER_FIELDS
+    return watch_folder.query(args.filter or "", fields, args.include_saved)
+
+
+def report_errors(batch, action):
+    if batch.cancelled.is_set():
+        print(f"Cancelled, {len(batch.paths) - batch.processed} images were not processed", file=sys.stderr)
+    for path, message in batch.errors[:MAX_LISTED_ERRORS]:
+        print(f"ERROR: {action} - {path}: {message}", file=sys.stderr)
+    if len(batch.errors) > MAX_LISTED_ERRORS:
+        print(f"...and {len(batch.errors) - MAX_LISTED_ERRORS} more", file=sys.stderr)
+    return 1 if batch.errors or batch.cancelled.is_set() else 0
+
+
+#endregion
+#region - Main
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="image_watcher_cli", description="Index, search, export and move the images of a folder without the viewer.")
+    parser.add_argument("--quiet", action="store_true", help="Print no progress")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    index = commands.add_parser("index", help="Create or update the database of a folder")
+    index.add_argument("folder")
+    index.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processes parsing new and changed images (default: CPU count)")
+    index.set_defaults(run=run_index)
+
+    query = commands.add_parser("query", help="Print the images matching a filter, newest first")
+    query.add_argument("folder")
+    query.add_argument("filter", nargs="?", default="", help="Filter text as typed in the viewer, like 'castle -blurry steps>=30'")
+    query.add_argument("--limit", type=int, default=0)
+    query.set_defaults(run=run_query)
+
+    export = commands.add_parser("export", help="Export the metadata of the matching images")
+    export.add_argument("folder")
+    export.add_argument("destination", help="Output file, or a folder for the text format")
+    export.add_argument("--format", choices=[TEXT_EXPORT_FORMAT] + list(EXPORT_FORMATS), default="jsonl")
+    export.add_argument("--filter", default="")
+    export.set_defaults(run=run_export)
+
+    move = commands.add_parser("move", help="Move or copy the matching images to another folder")
+    move.add_argument("folder")
+    move.add_argument("target")
+    move.add_argument("--filter", default="")
+    move.add_argument("--all", action="store_true", help="Move every image when no filter is given")
+    move.add_argument("--copy", action="store_true", help="Copy instead of moving")
+    move.add_argument("--workers", type=int, default=None, help="Transfer threads (default: chosen by whether the target is on the same device)")
+    move.set_defaults(run=run_move)
+
+    for command in (query, export, move):
+        command.add_argument("--fields", help=f"Comma separated fields searched by text terms (default: all of {', '.join(FILTER_FIELDS)})")
+        command.add_argument("--include-saved", action="store_true", help="Also match images in the Saved Images folder")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not os.path.isdir(args.folder):
+        print(f"ERROR: main - {args.folder} is not a folder", file=sys.stderr)
+        return 2
+    progress = NullProgress() if args.quiet else ConsoleProgress()
+    watch_folder = WatchFolder(args.folder)
+    return args.run(watch_folder, args, progress)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+
+#endregion
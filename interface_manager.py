@@ -6,6 +6,9 @@ from tkinter import ttk, messagebox
 
 # Custom
 from scalable_image_label import ScalableImageLabel
+from thumbnail_grid import ThumbnailGrid
+from facet_index import FACET_FIELDS
+from perf_monitor import monitor as perf_monitor
 
 # Third-party
 from TkToolTip.TkToolTip import TkToolTip as ToolTip
@@ -14,6 +17,12 @@ from TkToolTip.TkToolTip import TkToolTip as ToolTip
 # UI padding
 PAD = 2
 
+# Facet menus
+MAX_FACET_ITEMS = 40
+
+# Performance HUD
+PERF_HUD_REFRESH_MS = 500
+
 # Tooltips
 TIP_PADX = 5
 TIP_PADY = 15
@@ -83,6 +92,9 @@ class ImageWatcherGUI:
         ttk.Label(count_frame, text="/").pack(side='left')
         self.total_count_label = ttk.Label(count_frame, text="0")
         self.total_count_label.pack(side='left')
+        # Selection label, empty while nothing is selected
+        self.selection_label = ttk.Label(count_frame, text="")
+        self.selection_label.pack(side='left', padx=(PAD, 0))
 
 
     def create_control_options_menu(self, control_frame):
@@ -104,10 +116,29 @@ class ImageWatcherGUI:
         self.edit_menu = tk.Menu(self.options_menu, tearoff=0)
         self.options_menu.add_cascade(label="Edit", menu=self.edit_menu)
         self.edit_menu.add_command(label="Delete Current Image", accelerator="Del", command=self.parent.delete_image)
+        self.edit_menu.add_command(label="Undo Delete", accelerator="Ctrl+Z", command=self.parent.undo_delete)
+        self.edit_menu.add_separator()
+        self.selection_menu = tk.Menu(self.edit_menu, tearoff=0)
+        self.edit_menu.add_cascade(label="Selection", menu=self.selection_menu)
+        self.selection_menu.add_command(label="Toggle Current Image", accelerator="Space", command=self.parent.toggle_selection)
+        self.selection_menu.add_command(label="Select Range to Current Image", accelerator="Shift+Space", command=self.parent.select_range)
+        self.selection_menu.add_command(label="Select All Listed", accelerator="Ctrl+A", command=self.parent.select_all)
+        self.selection_menu.add_command(label="Clear Selection", accelerator="Esc", command=self.parent.clear_selection)
+        self.selection_menu.add_separator()
+        self.selection_menu.add_command(label="Delete Selected", accelerator="Del", command=self.parent.delete_image)
+        self.selection_menu.add_command(label="Move Selected...", command=self.parent.move_selected)
+        self.selection_menu.add_command(label="Copy Selected...", command=self.parent.copy_selected)
         self.edit_menu.add_command(label="Save Current Image", accelerator="Ins", command=self.parent.move_image_to_saved_folder)
         self.edit_menu.add_separator()
         self.edit_menu.add_command(label="Export Current Image Metadata", command=self.parent.export_current_image_metadata)
-        self.edit_menu.add_command(label="Export ALL Image Metadata", command=self.parent.export_all_metadata)
+        self.export_menu = tk.Menu(self.edit_menu, tearoff=0)
+        self.edit_menu.add_cascade(label="Export ALL Image Metadata", menu=self.export_menu)
+        self.export_menu.add_command(label="As Text Files...", command=lambda: self.parent.export_all_metadata("text"))
+        self.export_menu.add_separator()
+        self.export_menu.add_command(label="As JSON Lines...", command=lambda: self.parent.export_all_metadata("jsonl"))
+        self.export_menu.add_command(label="As CSV...", command=lambda: self.parent.export_all_metadata("csv"))
+        self.export_menu.add_command(label="As Columnar JSON...", command=lambda: self.parent.export_all_metadata("columnar"))
+        self.set_export_enabled(False)  # Until the database is loaded
         self.edit_menu.add_separator()
         self.edit_menu.add_command(label="Move All...", command=self.parent.move_all_images)
         self.edit_menu.add_command(label="Move Current Image...", command=self.parent.move_image_to)
@@ -121,6 +152,12 @@ class ImageWatcherGUI:
         self.view_menu.add_checkbutton(label="Toggle: Live Mode", variable=self.parent.live_check_var, command=self.parent.toggle_live_updates)
         self.view_menu.add_checkbutton(label="Toggle: Command Row", variable=self.parent.show_command_row_var, command=self.toggle_command_row)
         self.view_menu.add_checkbutton(label="Toggle: Always On Top", variable=self.parent.always_on_top_var, command=self.toggle_always_on_top)
+        self.view_menu.add_checkbutton(label="Toggle: Thumbnail Grid", accelerator="G", variable=self.parent.show_grid_var, command=self.toggle_thumbnail_grid)
+        self.perf_menu = tk.Menu(self.view_menu, tearoff=0)
+        self.view_menu.add_cascade(label="Performance", menu=self.perf_menu)
+        self.perf_menu.add_checkbutton(label="Toggle: Performance HUD", variable=self.parent.show_perf_hud_var, command=self.toggle_perf_hud)
+        self.perf_menu.add_command(label="Export Performance Trace...", command=self.parent.export_perf_trace)
+        self.perf_menu.add_command(label="Reset Performance Stats", command=perf_monitor.reset)
         self.view_menu.add_separator()
         self.view_menu.add_radiobutton(label="Image Mode: Fill", variable=self.parent.image_scale_mode_var, value="fill", command=lambda: self.image_label.set_scale_mode('fill'))
         self.view_menu.add_radiobutton(label="Image Mode: Center", variable=self.parent.image_scale_mode_var, value="center", command=lambda: self.image_label.set_scale_mode('center'))
@@ -143,6 +180,11 @@ class ImageWatcherGUI:
         image_pane.grid_columnconfigure(0, weight=1)
         self.image_label = ScalableImageLabel(image_pane)
         self.image_label.grid(row=0, column=0, sticky="nsew")
+        # Thumbnail grid, takes the place of the image label while shown
+        self.thumbnail_grid = ThumbnailGrid(image_pane, on_click=self.on_thumbnail_click, on_activate=self.on_thumbnail_activate)
+        # Performance HUD, placed over the top left corner of the image while shown
+        self.perf_hud = tk.Label(image_pane, justify="left", anchor="nw", font=("Courier", 9), bg="#202020", fg="#e0e0e0", padx=6, pady=4)
+        self._perf_hud_job = None
         self.image_paned_window.add(image_pane, stretch="always", minsize=100)
         # Stats Pane
         self.stats_pane = ttk.Frame(self.image_paned_window)
@@ -238,6 +280,50 @@ class ImageWatcherGUI:
         param_options = ["Steps", "Sampler", "Schedule type", "CFG scale", "Size", "Model"]
         for option in param_options:
             filter_type_menu.add_checkbutton(label=option, variable=self.parent.filter_states[option], command=lambda opt=option: self.parent.handle_filter_type_change(opt))
+        filter_type_menu.add_separator()
+        # Near-duplicate views
+        filter_type_menu.add_command(label="Near-Duplicates of Current Image", command=self.parent.show_similar_images)
+        filter_type_menu.add_command(label="All Near-Duplicate Groups", command=self.parent.show_duplicate_groups)
+        filter_type_menu.add_separator()
+        # Saved searches
+        saved_searches_menu = tk.Menu(filter_type_menu, tearoff=0)
+        saved_searches_menu.configure(postcommand=lambda: self.populate_saved_searches_menu(saved_searches_menu))
+        filter_type_menu.add_cascade(label="Saved Searches", menu=saved_searches_menu)
+        # Facet counts of the listed images, clicking a value adds it to the filter
+        facets_menu = tk.Menu(filter_type_menu, tearoff=0)
+        filter_type_menu.add_cascade(label="Facets", menu=facets_menu)
+        for facet in FACET_FIELDS:
+            facet_menu = tk.Menu(facets_menu, tearoff=0)
+            facet_menu.configure(postcommand=lambda f=facet, m=facet_menu: self.populate_facet_menu(f, m))
+            facets_menu.add_cascade(label=facet, menu=facet_menu)
+        filter_type_menu.add_separator()
+        filter_type_menu.add_checkbutton(label="Include Saved Images", variable=self.parent.include_saved_var, command=self.parent.apply_filters)
+
+
+    def populate_saved_searches_menu(self, menu):
+        menu.delete(0, "end")
+        menu.add_command(label="Save Current Search...", command=self.parent.save_current_search)
+        names = self.parent.saved_searches.names() if self.parent.saved_searches else []
+        delete_menu = tk.Menu(menu, tearoff=0)
+        for name in names:
+            delete_menu.add_command(label=name, command=lambda n=name: self.parent.delete_saved_search(n))
+        menu.add_cascade(label="Delete Saved Search", menu=delete_menu, state="normal" if names else "disabled")
+        if names:
+            menu.add_separator()
+        for name in names:
+            menu.add_command(label=name, command=lambda n=name: self.parent.open_saved_search(n))
+
+
+    def populate_facet_menu(self, facet, menu):
+        menu.delete(0, "end")
+        values = self.parent.get_facets().top(facet)
+        if not values:
+            menu.add_command(label="(none)", state="disabled")
+            return
+        for key, label, count in values[:MAX_FACET_ITEMS]:
+            menu.add_command(label=f"{label}  ({count})", command=lambda k=key: self.parent.add_facet_filter(facet, k))
+        if len(values) > MAX_FACET_ITEMS:
+            menu.add_command(label=f"... {len(values) - MAX_FACET_ITEMS} more", state="disabled")
 
 
     def create_stats_frame(self):
@@ -263,6 +349,10 @@ class ImageWatcherGUI:
         scrollbar = ttk.Scrollbar(text_frame, orient="vertical", command=self.stats_text.yview)
         scrollbar.grid(row=0, column=1, sticky="ns")
         self.stats_text.configure(yscrollcommand=scrollbar.set)
+        self.stats_text.tag_configure("bold", font=("TkDefaultFont", 10, "bold"))
+        # Stats are not rendered while the pane can't be seen, catch up when it can
+        self.stats_text.bind("<Map>", self.parent.on_stats_pane_shown)
+        self.stats_text.bind("<Configure>", self.parent.on_stats_pane_shown)
 
 
 #endregion
@@ -272,14 +362,21 @@ class ImageWatcherGUI:
     def setup_bindings(self):
         # Store bindings for later management
         self.navigation_bindings = [
-            (self.root, '<Left>', lambda e: self.parent.navigate("prev")),
-            (self.root, '<Right>', lambda e: self.parent.navigate("next"))
+            (self.root, '<Left>', self.unless_typing(lambda e: self.parent.step_navigate("prev"))),
+            (self.root, '<Right>', self.unless_typing(lambda e: self.parent.step_navigate("next"))),
+            (self.root, '<Control-z>', self.unless_typing(lambda e: self.parent.undo_delete())),
+            (self.root, '<space>', self.unless_typing(lambda e: self.parent.toggle_selection())),
+            (self.root, '<Shift-space>', self.unless_typing(lambda e: self.parent.select_range())),
+            (self.root, '<Control-a>', self.unless_typing(lambda e: self.parent.select_all())),
+            (self.root, '<Escape>', self.unless_typing(lambda e: self.parent.clear_selection())),
+            (self.root, '<g>', self.unless_typing(lambda e: self.toggle_thumbnail_grid(toggle=True)))
         ]
         # Apply nav bindings
         self.apply_navigation_bindings()
         # Add non-navigation bindings
-        self.root.bind('<Delete>', lambda e: self.parent.delete_image())
-        self.root.bind('<Insert>', lambda e: self.parent.move_image_to_saved_folder())
+        self.root.bind('<Delete>', self.unless_typing(lambda e: self.parent.delete_image()))
+        self.root.bind('<Insert>', self.unless_typing(lambda e: self.parent.move_image_to_saved_folder()))
+        self.root.bind('<Map>', self.parent.on_stats_pane_shown, add="+")  # Restored from minimized
         # Index entry
         self.current_index_entry.bind('<Return>', self.on_index_entry)
         # Image Label
@@ -290,8 +387,16 @@ class ImageWatcherGUI:
         self.image_label.bind('<MouseWheel>', self.wheel_navigate)
         # Filter Entry
         self.filter_entry.bind('<Return>', lambda e: self.parent.apply_filters())
-        self.filter_entry.bind('<FocusIn>', self.on_filter_entry_focus)
-        self.filter_entry.bind('<FocusOut>', self.on_filter_entry_focus_out)
+        self.filter_entry.bind('<KeyRelease>', self.parent.schedule_filter)
+
+
+    def unless_typing(self, callback):
+        """Wrap a root key handler so keys typed into any entry or text box are left to it."""
+        def handler(event):
+            if isinstance(event.widget, (tk.Entry, tk.Text)):  # ttk entries, spinboxes and comboboxes included
+                return None
+            return callback(event)
+        return handler
 
 
     def apply_navigation_bindings(self):
@@ -299,19 +404,6 @@ class ImageWatcherGUI:
             widget.bind(key, callback)
 
 
-    def remove_navigation_bindings(self):
-        for widget, key, _ in self.navigation_bindings:
-            widget.unbind(key)
-
-
-    def on_filter_entry_focus(self, event):
-        self.remove_navigation_bindings()
-
-
-    def on_filter_entry_focus_out(self, event):
-        self.apply_navigation_bindings()
-
-
 #endregion
 #region - GUI Logic
 
@@ -335,6 +427,11 @@ class ImageWatcherGUI:
         self.check_bottom_frame_visibility()
 
 
+    def stats_pane_visible(self):
+        """True if the stats text is shown on screen and not collapsed by the paned window sash."""
+        return bool(self.stats_text.winfo_viewable()) and self.stats_text.winfo_width() > 1 and self.stats_text.winfo_height() > 1
+
+
     def toggle_stats(self):
         if self.parent.show_stats_var.get():
             self.stats_frame.grid()
@@ -357,6 +454,81 @@ class ImageWatcherGUI:
             self.current_index_entry.delete(0, tk.END)
             self.current_index_entry.insert(0, f"{current:0{pad_length}d}")
             self.total_count_label.config(text=str(total))
+            self.update_selection_label()
+            image_manager = self.parent.image_manager
+            self.thumbnail_grid.set_items(image_manager.image_files, image_manager.current_index, image_manager.selected, image_manager.get_mtime)
+
+
+    def set_export_enabled(self, enabled):
+        """Export of all images reads the loaded records only, it stays disabled while the database loads."""
+        self.edit_menu.entryconfig("Export ALL Image Metadata", state="normal" if enabled else "disabled")
+
+
+    def toggle_thumbnail_grid(self, toggle=False):
+        if toggle:
+            self.parent.show_grid_var.set(not self.parent.show_grid_var.get())
+        if self.parent.show_grid_var.get():
+            self.image_label.grid_remove()
+            self.thumbnail_grid.grid(row=0, column=0, sticky="nsew")
+            self.update_count_label()
+            self.thumbnail_grid.show(self.parent.get_thumbnail_cache())
+        else:
+            self.thumbnail_grid.hide()
+            self.thumbnail_grid.grid_remove()
+            self.image_label.grid()
+
+
+    def toggle_perf_hud(self):
+        if self.parent.show_perf_hud_var.get():
+            perf_monitor.enable()
+            self.perf_hud.place(x=PAD, y=PAD, anchor="nw")
+            self.perf_hud.lift()
+            self.update_perf_hud()
+        else:
+            if self._perf_hud_job is not None:
+                self.root.after_cancel(self._perf_hud_job)
+                self._perf_hud_job = None
+            self.perf_hud.place_forget()
+            perf_monitor.enable(self.parent.perf_always_on)
+
+
+    def update_perf_hud(self):
+        """Redraw the p50/p95 table of each timed stage, while the HUD is shown."""
+        lines = [f"{'stage':<22}{'calls':>7}{'p50':>9}{'p95':>9}  ms"]
+        for stage, calls, p50, p95, _ in perf_monitor.summary():
+            lines.append(f"{stage:<22}{calls:>7}{p50:>9.1f}{p95:>9.1f}")
+        if len(lines) == 1:
+            lines.append("No timed calls yet")
+        self.perf_hud.config(text="\n".join(lines))
+        self._perf_hud_job = self.root.after(PERF_HUD_REFRESH_MS, self.update_perf_hud)
+
+
+    def on_thumbnail_click(self, index, event):
+        image_manager = self.parent.image_manager
+        if ThumbnailGrid.is_toggle_click(event):
+            image_manager.toggle_selection(image_manager.image_files[index])
+            self.update_count_label()
+        elif ThumbnailGrid.is_range_click(event):
+            image_manager.select_range(image_manager.image_files[index])
+            self.update_count_label()
+        else:
+            self.parent.navigate(index=index)
+
+
+    def on_thumbnail_activate(self, index):
+        self.parent.navigate(index=index)
+        self.parent.show_grid_var.set(False)
+        self.toggle_thumbnail_grid()
+
+
+    def update_selection_label(self):
+        image_manager = self.parent.image_manager
+        selected = len(image_manager.selected)
+        if not selected:
+            self.selection_label.config(text="")
+            return
+        mark = "☑" if image_manager.is_selected(image_manager.get_current_image()) else "☐"
+        self.selection_label.config(text=f"{mark} {selected} selected")
 
 
     def configure_image_paned_window(self):
@@ -426,9 +598,9 @@ class ImageWatcherGUI:
         if not self.parent.image_manager:
             return
         if event.delta < 0:
-            self.parent.navigate("next")
+            self.parent.step_navigate("next")
         else:
-            self.parent.navigate("prev")
+            self.parent.step_navigate("prev")
 
 
     def on_status_flag_click(self):
@@ -0,0 +1,180 @@
+#region - Imports
+
+
+# First-party
+import os
+import csv
+import json
+import time
+import threading
+
+# Local
+from image_database_manager import BASIC_METADATA_KEYS
+
+
+#endregion
+#region - Constants
+
+
+# Format: (label, file extension)
+EXPORT_FORMATS = {
+    "jsonl": ("JSON Lines", ".jsonl"),
+    "csv": ("CSV", ".csv"),
+    "columnar": ("Columnar JSON", ".json"),
+}
+COLUMNAR_SCHEMA = 1
+PATH_COLUMN = "path"
+EXPORTED_BASIC_KEYS = ("file_size", "width", "height", "format", "modified_time_stamp")
+WRITE_BUFFER_BYTES = 1024 * 1024
+TEXT_FILE_WRITERS = 4  # Per-image text files are small, the writers mostly wait on file creation
+
+
+#endregion
+#region - Records
+
+
+def record_metadata(record):
+    """Return only the PNG text metadata of a database record."""
+    return {key: value for key, value in record.items() if key not in BASIC_METADATA_KEYS}
+
+
+def format_metadata(metadata):
+    """Format metadata as key: value on each line."""
+    lines = []
+    for key, value in metadata.items():
+        lines.append(f"{key}:\n{value}\n")
+    return "\n".join(lines)
+
+
+def export_columns(rows):
+    """Return the path and basic columns followed by every metadata key, in first seen order."""
+    columns = dict.fromkeys((PATH_COLUMN,) + EXPORTED_BASIC_KEYS)
+    for _, record in rows:
+        for key in record:
+            if key not in BASIC_METADATA_KEYS:
+                columns[key] = None
+    return list(columns)
+
+
+def export_row(file_path, record):
+    """Return the flat row of one record, metadata keys keep their stored text."""
+    row = {PATH_COLUMN: file_path}
+    for key in EXPORTED_BASIC_KEYS:
+        if key in record:
+            row[key] = record[key]
+    row.update(record_metadata(record))
+    return row
+
+
+#endregion
+#region - MetadataExport
+
+
+class MetadataExport:
+    """
+    Streams database records into a single JSONL, CSV or columnar JSON file on a worker thread.
+
+    No image is opened, every value comes from the records passed in. The file
+    is written under a temporary name and replaces the output only once complete.
+    Exposes the same counters as BatchOperation so the UI can poll either one.
+
+    Args:
+        rows (list): (path, record) pairs in export order
+        output_file (str): Destination file
+        export_format (str): A key of EXPORT_FORMATS
+    """
+    def __init__(self, rows, output_file, export_format):
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {export_format}")
+        self.rows = rows
+        self.paths = [file_path for file_path, _ in rows]
+        self.output_file = output_file
+        self.export_format = export_format
+        self.written = 0
+        self.errors = []  # (path, message)
+        self.cancelled = threading.Event()
+        self.finished = threading.Event()
+        self.started = None
+        self.elapsed = 0.0
+
+
+    def start(self):
+        self.started = time.perf_counter()
+        threading.Thread(target=self._work, daemon=True).start()
+
+
+    def cancel(self):
+        """Stop writing, a cancelled export leaves no partial file behind."""
+        self.cancelled.set()
+
+
+    @property
+    def processed(self):
+        return self.written
+
+
+    def throughput(self):
+        """Rows per second so far."""
+        elapsed = self.elapsed if self.finished.is_set() else time.perf_counter() - self.started
+        return self.written / elapsed if elapsed > 0 else 0.0
+
+
+    def _work(self):
+        temp_path = self.output_file + ".tmp"
+        try:
+            newline = '' if self.export_format == "csv" else None
+            with open(temp_path, 'w', encoding="utf-8", newline=newline, buffering=WRITE_BUFFER_BYTES) as f:
+                if self.export_format == "jsonl":
+                    self._write_jsonl(f)
+                elif self.export_format == "csv":
+                    self._write_csv(f)
+                else:
+                    self._write_columnar(f)
+            if self.cancelled.is_set():
+                os.remove(temp_path)
+            else:
+                os.replace(temp_path, self.output_file)
+        except (OSError, ValueError, TypeError) as e:
+            self.errors.append((self.output_file, str(e)))
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+        finally:
+            self.elapsed = time.perf_counter() - self.started
+            self.finished.set()
+
+
+    def _write_jsonl(self, f):
+        for file_path, record in self.rows:
+            if self.cancelled.is_set():
+                return
+            f.write(json.dumps(export_row(file_path, record), ensure_ascii=False))
+            f.write("\n")
+            self.written += 1
+
+
+    def _write_csv(self, f):
+        writer = csv.DictWriter(f, fieldnames=export_columns(self.rows), restval="")
+        writer.writeheader()
+        for file_path, record in self.rows:
+            if self.cancelled.is_set():
+                return
+            writer.writerow(export_row(file_path, record))
+            self.written += 1
+
+
+    def _write_columnar(self, f):
+        # One array per column, missing values are null so every array has a value per row
+        columns = {column: [] for column in export_columns(self.rows)}
+        for file_path, record in self.rows:
+            if self.cancelled.is_set():
+                return
+            row = export_row(file_path, record)
+            for column, values in columns.items():
+                values.append(row.get(column))
+            self.written += 1
+        json.dump({"schema": COLUMNAR_SCHEMA, "rows": self.written, "columns": columns}, f, ensure_ascii=False)
+
+
+#endregion
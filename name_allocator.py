@@ -0,0 +1,84 @@
+#region - Imports
+
+
+# First-party
+import os
+import threading
+
+
+#endregion
+#region - NameAllocator
+
+
+class NameAllocator:
+    """
+    Hands out collision free file names, listing each target folder only once.
+
+    Each folder keeps the set of taken names and the next free '_n' suffix per
+    base name, so allocating a name costs no stat calls. A name is claimed by
+    creating an empty placeholder with O_EXCL, which also catches files created
+    by other programs since the folder was listed. Callers then replace the
+    placeholder (move_file, copy_file or open(..., 'w')), or release it if
+    the transfer failed.
+    """
+    def __init__(self):
+        self._folders = {}  # {normcased folder: (taken normcased names, {normcased base + ext: next suffix})}
+        self._lock = threading.Lock()
+
+
+    def reserve(self, folder, filename):
+        """Claim a unique path for filename in folder and return it."""
+        base, ext = os.path.splitext(filename)
+        with self._lock:
+            taken, suffixes = self._get_folder(folder)
+            stem = os.path.normcase(base + ext)
+            counter = suffixes.get(stem, 0)
+            while True:
+                name = filename if counter == 0 else f"{base}_{counter}{ext}"
+                counter += 1
+                key = os.path.normcase(name)
+                if key in taken:
+                    continue
+                taken.add(key)
+                path = os.path.join(folder, name)
+                try:
+                    os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                except FileExistsError:
+                    continue  # Created by someone else since the folder was listed
+                suffixes[stem] = counter
+                return path
+
+
+    def release(self, path):
+        """Remove the placeholder of a reserved path whose transfer failed."""
+        try:
+            if os.path.getsize(path) == 0:
+                os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            entry = self._folders.get(os.path.normcase(os.path.dirname(path)))
+            if entry:
+                entry[0].discard(os.path.normcase(os.path.basename(path)))
+
+
+    def forget(self, folder=None):
+        """Drop the listing of a folder, or of every folder, so it is read again on next use."""
+        with self._lock:
+            if folder is None:
+                self._folders.clear()
+            else:
+                self._folders.pop(os.path.normcase(folder), None)
+
+
+    def _get_folder(self, folder):
+        key = os.path.normcase(folder)
+        entry = self._folders.get(key)
+        if entry is None:
+            with os.scandir(folder) as entries:
+                taken = {os.path.normcase(entry.name) for entry in entries}
+            entry = self._folders[key] = (taken, {})
+        return entry
+
+
+#endregion
@@ -0,0 +1,335 @@
+#region - Imports
+
+
+# First-party
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import compress
+
+
+#endregion
+#region - Constants
+
+
+# Filter alias: (record key, column type)
+PARAMETER_FIELDS = {
+    "steps": ("Steps", "int"),
+    "cfg": ("CFG scale", "float"),
+    "seed": ("Seed", "int"),
+    "width": ("width", "int"),
+    "height": ("height", "int"),
+    "denoise": ("Denoising strength", "float"),
+    "clipskip": ("Clip skip", "int"),
+    "sampler": ("Sampler", "category"),
+    "schedule": ("Schedule type", "category"),
+    "model": ("Model", "category"),
+    "format": ("format", "category"),
+}
+
+PREDICATE_PATTERN = re.compile(r"^(?P<field>[a-z]+)(?P<op>>=|<=|!=|=|>|<|:)(?P<value>.+)$")
+REINDEX_AFTER_EDITS = 64  # Past this many changes a column sorts again on its next query instead of shifting its index
+
+
+#endregion
+#region - Columns
+
+
+def convert_number(value, cast):
+    if cast is int:
+        try:
+            return int(value)
+        except ValueError:
+            return int(float(value))
+    value = float(value)
+    if value != value:
+        raise ValueError("NaN is not a parameter value")  # It can't be ordered, so it counts as missing
+    return value
+
+
+class NumericColumn:
+    """
+    Typed numeric values, one slot per row, with a presence mask.
+
+    Queries are answered from the present rows sorted by value, so a comparison,
+    range or equality is two bisects and a slice. The sorted index is built on
+    the first query and shifted on later changes, a bulk change drops it instead.
+    """
+    def __init__(self, typecode):
+        self.values = array(typecode)
+        self.present = bytearray()
+        self.cast = int if typecode == "q" else float
+        self._sorted_values = None  # Values of the present rows in ascending order, None until queried
+        self._sorted_rows = None
+        self._edits = 0
+
+    def append_empty(self):
+        self.values.append(0)
+        self.present.append(0)
+
+    def set(self, row, value):
+        self.clear(row)
+        try:
+            self.values[row] = self._convert(value)
+        except (TypeError, ValueError, OverflowError):
+            return
+        self.present[row] = 1
+        self._index(row)
+
+    def _convert(self, value):
+        return convert_number(value, self.cast)
+
+    def clear(self, row):
+        self._unindex(row)
+        self.values[row] = 0
+        self.present[row] = 0
+
+    def select(self, predicate):
+        """Return the rows whose value passes the predicate, ignoring its negation."""
+        if self._sorted_values is None:
+            self._build_index()
+        values, rows = self._sorted_values, self._sorted_rows
+        op, low, high = predicate.op, predicate.low, predicate.high
+        if op == "=":
+            return rows[bisect_left(values, low):bisect_right(values, low)]
+        if op == "!=":
+            return rows[:bisect_left(values, low)] + rows[bisect_right(values, low):]
+        if op == ">=":
+            return rows[bisect_left(values, low):]
+        if op == ">":
+            return rows[bisect_right(values, low):]
+        if op == "<=":
+            return rows[:bisect_right(values, low)]
+        if op == "<":
+            return rows[:bisect_left(values, low)]
+        if op == "range":
+            start = 0 if low is None else bisect_left(values, low)
+            end = len(values) if high is None else bisect_right(values, high)
+            return rows[start:end]
+        return []
+
+    def _build_index(self):
+        values = self.values
+        self._sorted_rows = sorted(compress(range(len(values)), self.present), key=values.__getitem__)
+        self._sorted_values = list(map(values.__getitem__, self._sorted_rows))
+        self._edits = 0
+
+    def _index(self, row):
+        if self._sorted_values is None:
+            return
+        value = self.values[row]
+        position = bisect_right(self._sorted_values, value)
+        self._sorted_values.insert(position, value)
+        self._sorted_rows.insert(position, row)
+
+    def _unindex(self, row):
+        if self._sorted_values is None:
+            return
+        self._edits += 1
+        if self._edits > REINDEX_AFTER_EDITS:
+            self._sorted_values = self._sorted_rows = None
+            return
+        if not self.present[row]:
+            return
+        value = self.values[row]
+        position = self._sorted_rows.index(row, bisect_left(self._sorted_values, value), bisect_right(self._sorted_values, value))
+        del self._sorted_values[position], self._sorted_rows[position]
+
+
+class CategoryColumn:
+    """Dictionary-encoded categorical values, -1 marks a missing value."""
+    def __init__(self):
+        self.codes = array("l")
+        self.vocabulary = []
+        self.code_of = {}
+
+    def append_empty(self):
+        self.codes.append(-1)
+
+    def set(self, row, value):
+        if value is None or value == "":
+            self.clear(row)
+            return
+        key = str(value).lower()
+        code = self.code_of.get(key)
+        if code is None:
+            code = len(self.vocabulary)
+            self.code_of[key] = code
+            self.vocabulary.append(key)
+        self.codes[row] = code
+
+    def clear(self, row):
+        self.codes[row] = -1
+
+    def select(self, predicate):
+        """Return the rows whose value passes the predicate, ignoring its negation."""
+        # Test each distinct value once, then scan the code column
+        matching = {code for code, value in enumerate(self.vocabulary) if predicate.test(value)}
+        if not matching:
+            return []
+        return list(compress(range(len(self.codes)), map(matching.__contains__, self.codes)))
+
+
+#endregion
+#region - Predicate
+
+
+class Predicate:
+    """A single typed comparison such as 'steps>=30' or 'cfg:5..7'."""
+    def __init__(self, field, op, low, high=None, negate=False):
+        self.field = field
+        self.op = op
+        self.low = low
+        self.high = high
+        self.negate = negate
+        self.kind = PARAMETER_FIELDS[field][1]
+
+    def test(self, value):
+        op, low, high = self.op, self.low, self.high
+        if op == "range":
+            return (low is None or value >= low) and (high is None or value <= high)
+        if op == "=":
+            return value == low
+        if op == "!=":
+            return value != low
+        if op == ">=":
+            return value >= low
+        if op == "<=":
+            return value <= low
+        if op == ">":
+            return value > low
+        if op == "<":
+            return value < low
+        if op == "contains":
+            return low in value
+        return False
+
+
+    def test_record(self, record):
+        """Test a single database record the same way ParameterStore.query would."""
+        value = record.get(PARAMETER_FIELDS[self.field][0])
+        matched = False
+        if value is not None and value != "":
+            try:
+                if self.kind == "category":
+                    value = str(value).lower()
+                else:
+                    value = convert_number(value, int if self.kind == "int" else float)
+                matched = self.test(value)
+            except (TypeError, ValueError, OverflowError):
+                matched = False
+        return not matched if self.negate else matched
+
+
+def parse_predicate(token):
+    """Parse a filter token into a Predicate, or return None if it is plain text."""
+    negate = token.startswith("-")
+    match = PREDICATE_PATTERN.match(token[1:] if negate else token)
+    if not match or match.group("field") not in PARAMETER_FIELDS:
+        return None
+    field, op, value = match.group("field"), match.group("op"), match.group("value").strip().lower()
+    kind = PARAMETER_FIELDS[field][1]
+    if kind == "category":
+        if op == ":":
+            return Predicate(field, "contains", value, negate=negate)
+        if op in ("=", "!="):
+            return Predicate(field, op, value, negate=negate)
+        return None
+    cast = int if kind == "int" else float
+    try:
+        if op == ":" and ".." in value:
+            low, high = value.split("..", 1)
+            return Predicate(field, "range", cast(low) if low else None, cast(high) if high else None, negate=negate)
+        return Predicate(field, "=" if op == ":" else op, cast(value), negate=negate)
+    except ValueError:
+        return None
+
+
+#endregion
+#region - ParameterStore
+
+
+class ParameterStore:
+    """Columnar store of typed generation parameters used for range and equality queries."""
+    def __init__(self):
+        self.clear()
+
+
+    def clear(self):
+        self.paths = []
+        self.row_of = {}
+        self.free_rows = []
+        self.columns = {}
+        for field, (_, kind) in PARAMETER_FIELDS.items():
+            if kind == "category":
+                self.columns[field] = CategoryColumn()
+            else:
+                self.columns[field] = NumericColumn("q" if kind == "int" else "d")
+
+
+    def build(self, database):
+        """Rebuild all columns from a path keyed database."""
+        self.clear()
+        for file_path, record in database.items():
+            self.upsert(file_path, record)
+
+
+    def upsert(self, file_path, record):
+        row = self.row_of.get(file_path)
+        if row is None:
+            row = self._allocate_row(file_path)
+        for field, (key, _) in PARAMETER_FIELDS.items():
+            column = self.columns[field]
+            value = record.get(key)
+            if value is None:
+                column.clear(row)
+            else:
+                column.set(row, value)
+
+
+    def remove(self, file_path):
+        row = self.row_of.pop(file_path, None)
+        if row is None:
+            return
+        self.paths[row] = None
+        for column in self.columns.values():
+            column.clear(row)
+        self.free_rows.append(row)
+
+
+    def _allocate_row(self, file_path):
+        if self.free_rows:
+            row = self.free_rows.pop()
+            self.paths[row] = file_path
+        else:
+            row = len(self.paths)
+            self.paths.append(file_path)
+            for column in self.columns.values():
+                column.append_empty()
+        self.row_of[file_path] = row
+        return row
+
+
+    def query(self, predicates):
+        """Return the set of paths matching every predicate."""
+        rows = None  # Every row until a predicate narrows them
+        # Narrow with the plain predicates first, a negated one only removes rows
+        for predicate in sorted(predicates, key=lambda predicate: predicate.negate):
+            selected = self.columns[predicate.field].select(predicate)
+            if predicate.negate:
+                if rows is None:
+                    rows = set(self.row_of.values())
+                rows.difference_update(selected)
+            elif rows is None:
+                rows = set(selected)
+            else:
+                rows.intersection_update(selected)
+            if not rows:
+                return set()
+        if rows is None:
+            return set(self.row_of)
+        paths = self.paths
+        return {paths[row] for row in rows}
+
+
+#endregion
@@ -0,0 +1,133 @@
+#region - Imports
+
+
+# First-party
+import os
+import json
+import time
+import threading
+import functools
+from collections import deque
+
+
+#endregion
+#region - Constants
+
+
+WINDOW_SIZE = 512  # Recent durations kept per stage for the percentiles
+MAX_TRACE_EVENTS = 100_000  # Spans kept for the trace file, the oldest are dropped first
+PERF_FLAG = "--perf"
+PERF_ENV_VAR = "IW_PERF"
+
+
+#endregion
+#region - StageStats
+
+
+class StageStats:
+    """Rolling window of the durations of one stage, plus totals since the last reset."""
+    __slots__ = ("durations", "count", "total", "longest")
+
+    def __init__(self):
+        self.durations = deque(maxlen=WINDOW_SIZE)
+        self.count = 0
+        self.total = 0.0
+        self.longest = 0.0
+
+    def add(self, seconds):
+        self.durations.append(seconds)
+        self.count += 1
+        self.total += seconds
+        self.longest = max(self.longest, seconds)
+
+    def percentile(self, fraction):
+        """Duration below which the given fraction of the recent calls finished."""
+        values = sorted(self.durations)
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+#endregion
+#region - PerfMonitor
+
+
+class PerfMonitor:
+    """
+    Collects timing spans of the hot paths while enabled.
+
+    Spans come from the timed decorator. Each one adds its duration to the
+    stage's rolling window and an event for the trace file. Worker threads
+    may record too, appending to a deque is atomic.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.stages = {}  # {stage: StageStats}
+        self.events = deque(maxlen=MAX_TRACE_EVENTS)  # (stage, start, end, thread id)
+        self.origin = time.perf_counter()
+
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+
+    def reset(self):
+        self.stages = {}
+        self.events.clear()
+        self.origin = time.perf_counter()
+
+
+    def record(self, stage, start, end):
+        stats = self.stages.get(stage)
+        if stats is None:
+            stats = self.stages.setdefault(stage, StageStats())
+        stats.add(end - start)
+        self.events.append((stage, start, end, threading.get_ident()))
+
+
+    def summary(self):
+        """Return [(stage, calls, p50 ms, p95 ms, max ms)], slowest p95 first."""
+        rows = [(stage, stats.count, stats.percentile(0.5) * 1000, stats.percentile(0.95) * 1000, stats.longest * 1000) for stage, stats in list(self.stages.items())]
+        rows.sort(key=lambda row: row[3], reverse=True)
+        return rows
+
+
+    def export_trace(self, file_path):
+        """Write the spans as Chrome trace events, viewable in chrome://tracing or Perfetto, and return the span count."""
+        events = list(self.events)
+        pid = os.getpid()
+        trace = {
+            "traceEvents": [
+                {"name": stage, "ph": "X", "ts": (start - self.origin) * 1e6, "dur": (end - start) * 1e6, "pid": pid, "tid": tid}
+                for stage, start, end, tid in events
+            ],
+            "displayTimeUnit": "ms",
+            "otherData": {"stages": [dict(zip(("stage", "calls", "p50_ms", "p95_ms", "max_ms"), row)) for row in self.summary()]},
+        }
+        temp_path = file_path + ".tmp"
+        with open(temp_path, 'w', encoding="utf-8") as f:
+            json.dump(trace, f)
+        os.replace(temp_path, file_path)
+        return len(events)
+
+
+monitor = PerfMonitor()
+
+
+def timed(stage):
+    """Decorator recording each call of a function as a span of stage, a single flag check while the monitor is off."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not monitor.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                monitor.record(stage, start, time.perf_counter())
+        return wrapper
+    return decorator
+
+
+#endregion
@@ -0,0 +1,181 @@
+#region - Imports
+
+
+# Third-party
+from PIL import Image
+
+
+#endregion
+#region - Constants
+
+
+HASH_SIZE = 8
+DEFAULT_MAX_DISTANCE = 6  # Bits out of 64 that may differ for two images to count as near-duplicates
+
+
+#endregion
+#region - Hashing
+
+
+def compute_dhash(image):
+    """
+    Compute a 64-bit difference hash from a reduced-size decode of the image.
+
+    Args:
+        image (PIL.Image.Image): An opened image, it is only decoded at reduced size when possible
+
+    Returns:
+        str: 16 character hex digest
+    """
+    # Let JPEG decoders skip most of the pixels, then shrink in steps with reduce()
+    image.draft("L", (HASH_SIZE * 8, HASH_SIZE * 8))
+    if image.mode not in ("L", "RGB"):
+        image = image.convert("RGB")
+    small = image.resize((HASH_SIZE + 1, HASH_SIZE), Image.BOX, reducing_gap=2.0).convert("L")
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return f"{value:016x}"
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+#endregion
+#region - BKTree
+
+
+class BKTree:
+    """Burkhard-Keller tree over integer hashes using the Hamming distance."""
+    def __init__(self):
+        self.root = None  # [hash, {distance: child}]
+        self.size = 0
+
+
+    def add(self, value):
+        if self.root is None:
+            self.root = [value, {}]
+            self.size = 1
+            return
+        node = self.root
+        while True:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = [value, {}]
+                self.size += 1
+                return
+            node = child
+
+
+    def search(self, value, max_distance):
+        """Return [(distance, hash)] for every stored hash within max_distance."""
+        if self.root is None:
+            return []
+        results = []
+        stack = [self.root]
+        while stack:
+            node_value, children = stack.pop()
+            distance = hamming_distance(value, node_value)
+            if distance <= max_distance:
+                results.append((distance, node_value))
+            # Triangle inequality: only children in [d - r, d + r] can hold matches
+            low, high = distance - max_distance, distance + max_distance
+            for child_distance, child in children.items():
+                if low <= child_distance <= high:
+                    stack.append(child)
+        return results
+
+
+#endregion
+#region - PerceptualHashIndex
+
+
+class PerceptualHashIndex:
+    """Maps image paths to perceptual hashes and answers near-duplicate queries through a BK-tree."""
+    def __init__(self):
+        self.clear()
+
+
+    def clear(self):
+        self.tree = BKTree()
+        self.paths_by_hash = {}
+        self.hash_by_path = {}
+        self.built = False
+
+
+    def build(self, database):
+        self.clear()
+        for file_path, record in database.items():
+            self.upsert(file_path, record)
+        self.built = True
+
+
+    def upsert(self, file_path, record):
+        self.remove(file_path)
+        digest = record.get("dhash")
+        if not digest:
+            return
+        value = int(digest, 16)
+        self.hash_by_path[file_path] = value
+        paths = self.paths_by_hash.get(value)
+        if paths is None:
+            paths = self.paths_by_hash[value] = set()
+            self.tree.add(value)
+        paths.add(file_path)
+
+
+    def remove(self, file_path):
+        # Hashes stay in the tree when their last path goes away, lookups skip them
+        value = self.hash_by_path.pop(file_path, None)
+        if value is not None:
+            self.paths_by_hash[value].discard(file_path)
+        if self.built and self.tree.size > 1000 and len(self.hash_by_path) < self.tree.size // 2:
+            self._rebuild_tree()
+
+
+    def _rebuild_tree(self):
+        self.paths_by_hash = {value: paths for value, paths in self.paths_by_hash.items() if paths}
+        self.tree = BKTree()
+        for value in self.paths_by_hash:
+            self.tree.add(value)
+
+
+    def find_similar(self, file_path, max_distance=DEFAULT_MAX_DISTANCE):
+        """Return the paths near file_path, closest first, including file_path itself."""
+        value = self.hash_by_path.get(file_path)
+        if value is None:
+            return []
+        results = []
+        for distance, match in sorted(self.tree.search(value, max_distance)):
+            results.extend(sorted(self.paths_by_hash.get(match, ())))
+        return results
+
+
+    def group_similar(self, max_distance=DEFAULT_MAX_DISTANCE):
+        """Return groups (lists of paths) of two or more near-duplicate images."""
+        parent = {value: value for value, paths in self.paths_by_hash.items() if paths}
+        def find(value):
+            while parent[value] != value:
+                parent[value] = parent[parent[value]]
+                value = parent[value]
+            return value
+        for value in parent:
+            for _, match in self.tree.search(value, max_distance):
+                if match in parent:
+                    root_a, root_b = find(value), find(match)
+                    if root_a != root_b:
+                        parent[root_b] = root_a
+        groups = {}
+        for value in parent:
+            groups.setdefault(find(value), []).extend(self.paths_by_hash[value])
+        return [paths for paths in groups.values() if len(paths) > 1]
+
+
+#endregion
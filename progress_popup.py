@@ -0,0 +1,59 @@
+#region - Imports
+
+
+# First-party
+import tkinter as tk
+from tkinter import ttk
+
+
+#endregion
+#region - ProgressPopup
+
+
+class ProgressPopup:
+    def __init__(self, parent, title="Updating Database", on_cancel=None):
+        self.popup = tk.Toplevel(parent)
+        self.popup.title(title)
+        self.popup.transient(parent)
+        self.popup.grab_set()
+        # Center the popup
+        self.popup.update_idletasks()
+        width = self.popup.winfo_width()
+        height = self.popup.winfo_height()
+        x = parent.winfo_x() + (parent.winfo_width() // 2) - (width // 2)
+        y = parent.winfo_y() + (parent.winfo_height() // 2) - (height // 2)
+        self.popup.geometry(f"+{x}+{y}")
+        # Status label
+        self.status_label = tk.Label(self.popup, text="Scanning files...", pady=10)
+        self.status_label.pack()
+        # Detail label
+        self.detail_label = tk.Label(self.popup, text="")
+        self.detail_label.pack()
+        # Progress bar
+        self.progressbar = ttk.Progressbar(self.popup, length=250, mode='determinate')
+        self.progressbar.pack(fill="x", padx=10, pady=10)
+        # Percent label
+        self.percent_label = tk.Label(self.popup, text="0%", anchor="e", width=10)
+        self.percent_label.pack(fill="x", padx=10, pady=(0, 10))
+        if on_cancel:
+            self.cancel_button = ttk.Button(self.popup, text="Cancel", command=on_cancel)
+            self.cancel_button.pack(pady=(0, 10))
+            self.popup.protocol("WM_DELETE_WINDOW", on_cancel)
+        else:
+            self.popup.protocol("WM_DELETE_WINDOW", lambda: None)  # Disable close button
+
+    def update(self, progress, status="", detail="", process_events=True):
+        self.progressbar['value'] = progress
+        self.percent_label['text'] = f"{int(progress)}%"
+        if status:
+            self.status_label['text'] = status
+        if detail:
+            self.detail_label['text'] = detail
+        if process_events:
+            self.popup.update()
+
+    def close(self):
+        self.popup.destroy()
+
+
+#endregion
@@ -0,0 +1,64 @@
+#region - Imports
+
+
+# First-party
+import sys
+import time
+
+
+#endregion
+#region - Constants
+
+
+CONSOLE_INTERVAL = 0.5  # Seconds between progress lines
+
+
+#endregion
+#region - Reporters
+
+
+class NullProgress:
+    """Stands in for ProgressPopup when there is no Tk root to show it on."""
+    def update(self, progress, status="", detail="", process_events=True):
+        pass
+
+    def close(self):
+        pass
+
+
+class ConsoleProgress:
+    """
+    Reports progress as text lines, the ProgressPopup interface without a display.
+
+    Updates arriving faster than the interval are dropped, apart from the
+    first and the last one, so a long run writes a readable log.
+
+    Args:
+        stream (file): Where lines are written, stderr by default
+        interval (float): Seconds between lines
+    """
+    def __init__(self, stream=None, interval=CONSOLE_INTERVAL):
+        self.stream = stream or sys.stderr
+        self.interval = interval
+        self.last_time = 0.0
+        self.last_line = ""
+        self.status = ""
+
+    def update(self, progress, status="", detail="", process_events=True):
+        if status:
+            self.status = status
+        now = time.monotonic()
+        if progress < 100 and now - self.last_time < self.interval:
+            return
+        line = f"{int(progress):3d}%  {self.status}" + (f"  {detail}" if detail else "")
+        if line == self.last_line:
+            return
+        self.last_time = now
+        self.last_line = line
+        print(line, file=self.stream, flush=True)
+
+    def close(self):
+        pass
+
+
+#endregion
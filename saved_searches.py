@@ -0,0 +1,158 @@
+#region - Imports
+
+
+# First-party
+import os
+import json
+from bisect import bisect_left
+
+# Local
+from filter_cache import FilterQuery
+
+
+#endregion
+#region - Constants
+
+
+SAVED_SEARCHES_SCHEMA = 1
+
+
+#endregion
+#region - SavedSearch
+
+
+class SavedSearch:
+    """A named filter whose result list, once built, is kept current one record at a time."""
+    def __init__(self, name, filter_text, fields, include_saved=False):
+        self.name = name
+        self.filter_text = filter_text
+        self.fields = tuple(fields)
+        self.include_saved = include_saved
+        self.query = FilterQuery(filter_text, self.fields, include_saved)
+        self.invalidate()
+
+
+    def invalidate(self):
+        self.paths = None  # Newest first, None until materialized
+        self._keys = []  # -mtime of each path, ascending so bisect works on the newest first order
+        self._mtimes = {}
+
+
+    @property
+    def materialized(self):
+        return self.paths is not None
+
+
+    def materialize(self, paths, database):
+        """Take a newest first result list computed by the regular filter."""
+        self.paths = list(paths)
+        self._mtimes = {file_path: database[file_path].get('modified_time_stamp') or 0 for file_path in self.paths}
+        self._keys = [-self._mtimes[file_path] for file_path in self.paths]
+
+
+    def update(self, file_path, record, is_saved_path):
+        """Add, move or drop one path after its record changed, record is None when it was removed."""
+        if not self.materialized:
+            return
+        self._discard(file_path)
+        if record is None:
+            return
+        if not self.include_saved and is_saved_path(file_path):
+            return
+        if self.query.matches_record(record):
+            mtime = record.get('modified_time_stamp') or 0
+            index = bisect_left(self._keys, -mtime)
+            self._keys.insert(index, -mtime)
+            self.paths.insert(index, file_path)
+            self._mtimes[file_path] = mtime
+
+
+    def _discard(self, file_path):
+        mtime = self._mtimes.pop(file_path, None)
+        if mtime is None:
+            return
+        index = bisect_left(self._keys, -mtime)
+        while index < len(self.paths) and self._keys[index] == -mtime:
+            if self.paths[index] == file_path:
+                del self.paths[index]
+                del self._keys[index]
+                return
+            index += 1
+
+
+    def to_dict(self):
+        return {"name": self.name, "filter": self.filter_text, "fields": list(self.fields), "include_saved": self.include_saved}
+
+
+#endregion
+#region - SavedSearches
+
+
+class SavedSearches:
+    """Saved search definitions of a folder, stored beside its database."""
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.searches = {}
+        self.load()
+
+
+    def load(self):
+        self.searches = {}
+        try:
+            with open(self.file_path, 'r', encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("schema") != SAVED_SEARCHES_SCHEMA:
+                return
+            for item in data["searches"]:
+                search = SavedSearch(item["name"], item["filter"], item["fields"], item.get("include_saved", False))
+                self.searches[search.name] = search
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            print(f"ERROR: load - reading {self.file_path}: {e}")
+
+
+    def save(self):
+        data = {"schema": SAVED_SEARCHES_SCHEMA, "searches": [search.to_dict() for search in self.searches.values()]}
+        try:
+            temp_path = self.file_path + ".tmp"
+            with open(temp_path, 'w', encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=1)
+            os.replace(temp_path, self.file_path)
+        except OSError as e:
+            print(f"ERROR: save - writing {self.file_path}: {e}")
+
+
+    def add(self, name, filter_text, fields, include_saved=False):
+        self.searches[name] = SavedSearch(name, filter_text, fields, include_saved)
+        self.save()
+        return self.searches[name]
+
+
+    def remove(self, name):
+        if self.searches.pop(name, None) is not None:
+            self.save()
+
+
+    def names(self):
+        return list(self.searches)
+
+
+    def match(self, query):
+        """Return the saved search defined by the same query, or None."""
+        for search in self.searches.values():
+            if search.query.key == query.key:
+                return search
+        return None
+
+
+    def on_record_changed(self, file_path, record, is_saved_path):
+        """Database listener, a None path means the whole database was replaced."""
+        for search in self.searches.values():
+            if file_path is None:
+                search.invalidate()
+            else:
+                search.update(file_path, record, is_saved_path)
+
+
+#endregion
@@ -7,6 +7,9 @@ import tkinter as tk
 # Third-party
 from PIL import Image, ImageTk
 
+# Local
+from perf_monitor import timed
+
 
 #endregion
 #region - Constants
@@ -48,6 +51,7 @@ class ScalableImageLabel(tk.Label):
         self.draw_method = self._validate_draw_method(draw_method)
         self.displayed_image = None
         self.original_image = None
+        self.preview_active = False  # original_image is a stand-in set by set_preview, not the decoded file
         self.resize_timer = None
         self.last_resize_time = 0
 
@@ -128,6 +132,7 @@ class ScalableImageLabel(tk.Label):
         return new_width, new_height
 
 
+    @timed("_resize_image")
     def _resize_image(self, width, height, high_quality=False):
         """
         Resize the image to the specified dimensions.
@@ -193,6 +198,7 @@ class ScalableImageLabel(tk.Label):
         self._resize_image(width, height, high_quality=True)
 
 
+    @timed("set_image")
     def set_image(self, image_path):
         """
         Update the displayed image with a new image file.
@@ -202,12 +208,30 @@ class ScalableImageLabel(tk.Label):
         """
         self.image_path = image_path
         self.original_image = Image.open(image_path)
+        self.preview_active = False
         if self.winfo_width() > 1 and self.winfo_height() > 1:
             self._final_resize(self.winfo_width(), self.winfo_height())
         else:
             self._final_resize(self.original_image.width, self.original_image.height)
 
 
+    def set_preview(self, image_path, image):
+        """
+        Show a small stand-in for an image, such as a cached thumbnail, until the image itself is set.
+
+        Args:
+            image_path (str): Path of the image the preview stands for
+            image (PIL.Image): Preview image, scaled without filtering
+        """
+        self.image_path = image_path
+        self.original_image = image
+        self.preview_active = True
+        if self.resize_timer is not None:
+            self.after_cancel(self.resize_timer)
+            self.resize_timer = None
+        self._resize_image(self.winfo_width(), self.winfo_height(), high_quality=False)
+
+
     def refresh_displayed_image(self):
         if self.original_image:
             self._final_resize(self.winfo_width(), self.winfo_height())
@@ -220,6 +244,7 @@ class ScalableImageLabel(tk.Label):
         """
         self.image_path = ""
         self.original_image = None
+        self.preview_active = False
         self.displayed_image = None
         self.config(image='')
 
@@ -0,0 +1,51 @@
+#region - Imports
+
+
+# First-party
+import sys
+import time
+
+
+#endregion
+#region - Constants
+
+
+IMPORT_START = time.perf_counter()  # Set when image_watcher starts importing its modules
+TRACE_FLAG = "--trace-startup"
+TRACE_ENV_VAR = "IW_TRACE_STARTUP"
+LAZY_MODULES = ("png", "watchdog.observers")  # Deferred imports, reported as loaded or not at each stage
+
+
+#endregion
+#region - StartupTrace
+
+
+class StartupTrace:
+    """
+    Prints how long each startup stage took, when enabled.
+
+    Each line gives the time since imports started, the time since the
+    previous stage, and which of the heavy modules are loaded so far, which
+    shows whether a lazy import was pulled in early.
+
+    Args:
+        enabled (bool): Print stages, otherwise mark does nothing
+    """
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.last = IMPORT_START
+        self._marked = set()
+
+
+    def mark(self, stage, once=False):
+        """Report a stage, with once=True only its first occurrence is reported."""
+        if not self.enabled or (once and stage in self._marked):
+            return
+        self._marked.add(stage)
+        now = time.perf_counter()
+        loaded = ", ".join(name for name in LAZY_MODULES if name in sys.modules) or "none"
+        print(f"Startup: {stage:<20} {(now - IMPORT_START) * 1000:8.1f} ms  (+{(now - self.last) * 1000:.1f} ms, loaded: {loaded})")
+        self.last = now
+
+
+#endregion
@@ -0,0 +1,275 @@
+#region - Imports
+
+
+# First-party
+import os
+import json
+import ctypes
+import hashlib
+import threading
+from collections import OrderedDict, deque
+
+# Third-party
+from PIL import Image
+
+
+#endregion
+#region - Constants
+
+
+THUMBNAIL_CACHE_FOLDER_NAME = ".IW_thumbnails"
+THUMBNAIL_INDEX_FILENAME = "index.json"
+THUMBNAIL_INDEX_SCHEMA = 1
+THUMBNAIL_SIZE = 128
+THUMBNAIL_QUALITY = 85
+THUMBNAIL_BACKGROUND = (64, 64, 64)  # Shown behind transparent areas
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+THUMBNAIL_WORKERS = 3
+FILE_ATTRIBUTE_HIDDEN = 0x02
+
+
+def thumbnail_key(file_path, mtime, size):
+    """Cache key of one version of an image, a changed file gets a new key."""
+    text = f"{os.path.normcase(file_path)}|{mtime!r}|{size}"
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def make_thumbnail(file_path, size=THUMBNAIL_SIZE):
+    """Decode an image at reduced size and return an RGB thumbnail that fits size x size."""
+    with Image.open(file_path) as image:
+        image.draft("RGB", (size, size))  # JPEG decodes straight to a smaller scale
+        image.thumbnail((size, size), Image.BILINEAR, reducing_gap=2.0)
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, THUMBNAIL_BACKGROUND)
+            background.paste(image, mask=image.getchannel("A"))
+            return background
+        return image.convert("RGB")
+
+
+#endregion
+#region - ThumbnailCache
+
+
+class ThumbnailCache:
+    """
+    Persistent thumbnails of a folder, produced by worker threads and limited in size by LRU eviction.
+
+    Thumbnails are JPEG files in a hidden folder of the watched folder, keyed by
+    path, mtime and file size. The UI only says which paths it wants right now,
+    replacing any earlier request, so fast scrolling never builds a backlog of
+    thumbnails that are no longer visible. Finished thumbnails are collected
+    with take_ready, nothing here touches Tk.
+
+    Args:
+        folder (str): Watched folder, the cache is stored inside it
+        max_bytes (int): Size limit of the cache folder
+        workers (int): Number of worker threads
+        size (int): Largest side of a thumbnail in pixels
+    """
+    def __init__(self, folder, max_bytes=MAX_CACHE_BYTES, workers=THUMBNAIL_WORKERS, size=THUMBNAIL_SIZE):
+        self.cache_folder = os.path.join(folder, THUMBNAIL_CACHE_FOLDER_NAME)
+        self.index_path = os.path.join(self.cache_folder, THUMBNAIL_INDEX_FILENAME)
+        self.max_bytes = max_bytes
+        self.size = size
+        self.workers = workers
+        self._entries = OrderedDict()  # {key: bytes}, least recently used first
+        self._total_bytes = 0
+        self._wanted = OrderedDict()  # {path: None}, most wanted first
+        self._ready = deque()  # (path, PIL image or None)
+        self._lock = threading.Lock()
+        self._work = threading.Condition(self._lock)
+        self._loaded = threading.Event()
+        self._dirty = False
+        self._stopped = False
+        self._threads = []
+
+
+    def start(self):
+        self._threads = [threading.Thread(target=self._work_loop, daemon=True) for _ in range(self.workers)]
+        threading.Thread(target=self._load_index, daemon=True).start()
+        for thread in self._threads:
+            thread.start()
+
+
+    def stop(self):
+        """Stop the workers and write the LRU order so the next session evicts the right files."""
+        with self._work:
+            self._stopped = True
+            self._wanted.clear()
+            self._work.notify_all()
+        self.save_index()
+
+
+    def request(self, paths):
+        """Replace the pending work with these paths, in priority order."""
+        with self._work:
+            self._wanted = OrderedDict.fromkeys(paths)
+            if self._wanted:
+                self._work.notify_all()
+
+
+    def get_cached(self, file_path):
+        """Return the stored thumbnail of a file right away, or None if there is none yet."""
+        if not self._loaded.is_set():
+            return None
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        key = thumbnail_key(file_path, stat.st_mtime, stat.st_size)
+        with self._lock:
+            if key not in self._entries:
+                return None
+        try:
+            with Image.open(os.path.join(self.cache_folder, key + ".jpg")) as image:
+                image.load()
+                return image
+        except OSError:
+            return None
+
+
+    def take_ready(self):
+        """Return the (path, image) pairs finished since the last call, image is None if the file could not be read."""
+        ready = []
+        while self._ready:
+            ready.append(self._ready.popleft())
+        return ready
+
+
+    def save_index(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = [[key, size] for key, size in self._entries.items()]
+            self._dirty = False
+        try:
+            os.makedirs(self.cache_folder, exist_ok=True)
+            temp_path = self.index_path + ".tmp"
+            with open(temp_path, 'w', encoding="utf-8") as f:
+                json.dump({"schema": THUMBNAIL_INDEX_SCHEMA, "entries": entries}, f, separators=(',', ':'))
+            os.replace(temp_path, self.index_path)
+        except OSError as e:
+            print(f"ERROR: save_index - writing {self.index_path}: {e}")
+
+
+#endregion
+#region - Workers
+
+
+    def _work_loop(self):
+        self._loaded.wait()
+        while True:
+            with self._work:
+                while not self._wanted and not self._stopped:
+                    self._work.wait()
+                if self._stopped:
+                    return
+                file_path, _ = self._wanted.popitem(last=False)
+            try:
+                image = self._get_thumbnail(file_path)
+            except Exception as e:
+                print(f"ERROR: _work_loop - thumbnail of {file_path}: {e}")
+                image = None
+            self._ready.append((file_path, image))
+
+
+    def _get_thumbnail(self, file_path):
+        stat = os.stat(file_path)
+        key = thumbnail_key(file_path, stat.st_mtime, stat.st_size)
+        cached_path = os.path.join(self.cache_folder, key + ".jpg")
+        with self._lock:
+            known = key in self._entries
+            if known:
+                self._entries.move_to_end(key)
+                self._dirty = True
+        if known:
+            try:
+                with Image.open(cached_path) as image:
+                    image.load()
+                    return image
+            except OSError:
+                self._forget(key)  # Removed or damaged, make it again
+        image = make_thumbnail(file_path, self.size)
+        self._store(key, cached_path, image)
+        return image
+
+
+    def _store(self, key, cached_path, image):
+        self._ensure_folder()
+        temp_path = f"{cached_path}.{threading.get_ident()}.tmp"
+        try:
+            image.save(temp_path, "JPEG", quality=THUMBNAIL_QUALITY)
+            os.replace(temp_path, cached_path)
+            size = os.path.getsize(cached_path)
+        except OSError as e:
+            print(f"ERROR: _store - writing {cached_path}: {e}")
+            return
+        with self._lock:
+            self._total_bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._dirty = True
+        self._evict()
+
+
+    def _evict(self):
+        """Remove least recently used thumbnails until the cache fits its size limit."""
+        evicted = []
+        with self._lock:
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                old_key, old_size = self._entries.popitem(last=False)
+                self._total_bytes -= old_size
+                evicted.append(old_key)
+            self._dirty |= bool(evicted)
+        for old_key in evicted:
+            try:
+                os.remove(os.path.join(self.cache_folder, old_key + ".jpg"))
+            except OSError:
+                pass
+
+
+    def _ensure_folder(self):
+        if os.path.isdir(self.cache_folder):
+            return
+        os.makedirs(self.cache_folder, exist_ok=True)
+        if os.name == "nt":
+            ctypes.windll.kernel32.SetFileAttributesW(self.cache_folder, FILE_ATTRIBUTE_HIDDEN)
+
+
+    def _forget(self, key):
+        with self._lock:
+            self._total_bytes -= self._entries.pop(key, 0)
+            self._dirty = True
+
+
+    def _load_index(self):
+        """Read the LRU order, files missing from it (after a crash) count as least recently used."""
+        try:
+            entries = OrderedDict()
+            try:
+                with open(self.index_path, 'r', encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("schema") == THUMBNAIL_INDEX_SCHEMA:
+                    entries.update((key, size) for key, size in data["entries"])
+            except (OSError, ValueError, KeyError, TypeError, AttributeError):
+                pass
+            on_disk = {}
+            try:
+                with os.scandir(self.cache_folder) as scan:
+                    for entry in scan:
+                        if entry.name.endswith(".jpg"):
+                            on_disk[entry.name[:-4]] = entry.stat().st_size
+            except OSError:
+                pass
+            ordered = OrderedDict((key, size) for key, size in on_disk.items() if key not in entries)
+            ordered.update((key, on_disk[key]) for key in entries if key in on_disk)
+            with self._lock:
+                self._entries = ordered
+                self._total_bytes = sum(ordered.values())
+                self._dirty = len(ordered) != len(entries)
+            self._evict()  # The limit may have been lowered since the last session
+        finally:
+            self._loaded.set()
+
+
+#endregion
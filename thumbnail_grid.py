@@ -0,0 +1,271 @@
+#region - Imports
+
+
+# First-party
+import tkinter as tk
+from tkinter import ttk
+from collections import OrderedDict
+
+# Third-party
+from PIL import ImageTk
+
+# Local
+from thumbnail_cache import THUMBNAIL_SIZE
+
+
+#endregion
+#region - Constants
+
+
+CELL_PADDING = 4
+GRID_BACKGROUND = "#2b2b2b"
+PLACEHOLDER_COLOR = "#3c3c3c"
+SELECTED_COLOR = "#3d6fb4"
+CURRENT_COLOR = "#f0c040"
+POLL_MS = 50  # How often finished thumbnails are collected while some are missing
+MIN_CACHED_PHOTOS = 300  # PhotoImages kept beyond the visible cells, scrolling back needs no reload
+SHIFT_MASK = 0x0001
+CONTROL_MASK = 0x0004
+
+
+#endregion
+#region - ThumbnailGrid
+
+
+class ThumbnailGrid(ttk.Frame):
+    """
+    Scrollable grid of thumbnails that only creates canvas items for the visible cells.
+
+    The canvas has no scroll region, a pixel offset into the virtual content
+    decides which images the pooled cell items show. Scrolling moves and
+    re-targets those items, so its cost follows the window size rather than
+    the number of images.
+
+    Args:
+        master: Parent widget
+        on_click (callable): on_click(index, event) when a thumbnail is clicked
+        on_activate (callable): on_activate(index) when a thumbnail is double clicked
+    """
+    def __init__(self, master=None, on_click=None, on_activate=None, *args, **kwargs):
+        super().__init__(master, *args, **kwargs)
+        self.on_click = on_click
+        self.on_activate = on_activate
+        self.cell_size = THUMBNAIL_SIZE + CELL_PADDING * 2
+        self.cache = None
+        self.paths = []
+        self.selected = set()
+        self.current_index = -1
+        self.get_mtime = None  # get_mtime(path) of the listed images, a changed file gets a new PhotoImage
+        self.offset = 0  # Pixels scrolled from the top of the virtual content
+        self.visible = False
+        self._cells = []  # Pooled (background item, image item) pairs
+        self._visible_paths = {}  # {path: cell index}
+        self._photos = OrderedDict()  # {(path, mtime): PhotoImage, or None if it can't be read}, least recently used first
+        self._poll_job = None
+        self.canvas = tk.Canvas(self, highlightthickness=0, background=GRID_BACKGROUND)
+        self.canvas.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+        self.canvas.bind("<Configure>", self._on_configure)
+        self.canvas.bind("<MouseWheel>", self._on_mousewheel)
+        self.canvas.bind("<Button-1>", self._on_click)
+        self.canvas.bind("<Double-Button-1>", self._on_double_click)
+
+
+    def show(self, cache):
+        """Start drawing from a thumbnail cache."""
+        if cache is not self.cache:
+            self._photos.clear()
+        self.cache = cache
+        self.visible = True
+        self.scroll_to(self.current_index)
+        self.redraw()
+
+
+    def hide(self):
+        """Stop asking for thumbnails while another view is shown."""
+        self.visible = False
+        self._cancel_poll()
+        if self.cache:
+            self.cache.request([])
+
+
+    def set_items(self, paths, current_index, selected, get_mtime=None):
+        """Show a new list state, the grid scrolls to keep the current image in view when it changed."""
+        index_changed = current_index != self.current_index
+        self.paths = paths
+        self.current_index = current_index
+        self.selected = selected
+        self.get_mtime = get_mtime
+        if not self.visible:
+            return
+        if index_changed:
+            self.scroll_to(current_index)
+        self.redraw()
+
+
+    def scroll_to(self, index):
+        """Scroll the least distance that brings a cell into view."""
+        if index < 0:
+            return
+        columns = self._columns()
+        top = (index // columns) * self.cell_size
+        height = self.canvas.winfo_height()
+        if top < self.offset:
+            self.offset = top
+        elif top + self.cell_size > self.offset + height:
+            self.offset = top + self.cell_size - height
+
+
+#endregion
+#region - Drawing
+
+
+    def redraw(self):
+        """Position the pooled cells over the visible part of the list and request missing thumbnails."""
+        if not self.visible:
+            return
+        height = self.canvas.winfo_height()
+        columns = self._columns()
+        cell = self.cell_size
+        content_height = -(-len(self.paths) // columns) * cell
+        self.offset = max(0, min(self.offset, content_height - height))
+        first_row = self.offset // cell
+        count = (height // cell + 2) * columns
+        while len(self._cells) < count:
+            background = self.canvas.create_rectangle(0, 0, 0, 0, width=2)
+            image = self.canvas.create_image(0, 0, anchor="center")
+            self._cells.append((background, image))
+        self._visible_paths = {}
+        missing = []
+        first_index = first_row * columns
+        for slot, (background, image) in enumerate(self._cells):
+            index = first_index + slot
+            if slot >= count or index >= len(self.paths):
+                self.canvas.itemconfigure(background, state="hidden")
+                self.canvas.itemconfigure(image, state="hidden")
+                continue
+            path = self.paths[index]
+            x = (slot % columns) * cell
+            y = (first_row + slot // columns) * cell - self.offset
+            fill = SELECTED_COLOR if path in self.selected else PLACEHOLDER_COLOR
+            outline = CURRENT_COLOR if index == self.current_index else fill
+            self.canvas.coords(background, x + 1, y + 1, x + cell - 1, y + cell - 1)
+            self.canvas.itemconfigure(background, state="normal", fill=fill, outline=outline)
+            self.canvas.coords(image, x + cell // 2, y + cell // 2)
+            self._visible_paths[path] = slot
+            key = self._photo_key(path)
+            if key in self._photos:
+                self._photos.move_to_end(key)
+                self.canvas.itemconfigure(image, state="normal", image=self._photos[key] or "")
+            else:
+                self.canvas.itemconfigure(image, state="hidden", image="")
+                missing.append(path)
+        if content_height > height:
+            self.scrollbar.set(self.offset / content_height, (self.offset + height) / content_height)
+        else:
+            self.scrollbar.set(0, 1)
+        if self.cache:
+            self.cache.request(missing)
+            if missing:
+                self._schedule_poll()
+
+
+    def _poll(self):
+        """Turn finished thumbnails into PhotoImages on the UI thread and show the visible ones."""
+        self._poll_job = None
+        if not self.visible or not self.cache:
+            return
+        for path, image in self.cache.take_ready():
+            key = self._photo_key(path)
+            self._photos[key] = ImageTk.PhotoImage(image) if image is not None else None
+            slot = self._visible_paths.get(path)
+            if slot is not None:
+                self.canvas.itemconfigure(self._cells[slot][1], state="normal", image=self._photos[key] or "")
+        limit = max(MIN_CACHED_PHOTOS, len(self._cells) * 3)
+        while len(self._photos) > limit:
+            self._photos.popitem(last=False)
+        if any(self._photo_key(path) not in self._photos for path in self._visible_paths):
+            self._schedule_poll()
+
+
+    def _photo_key(self, path):
+        # Keyed by mtime like the disk cache, so a file overwritten in place is drawn again
+        return (path, self.get_mtime(path) if self.get_mtime else None)
+
+
+    def _schedule_poll(self):
+        if self._poll_job is None:
+            self._poll_job = self.after(POLL_MS, self._poll)
+
+
+    def _cancel_poll(self):
+        if self._poll_job is not None:
+            self.after_cancel(self._poll_job)
+            self._poll_job = None
+
+
+    def _columns(self):
+        return max(1, self.canvas.winfo_width() // self.cell_size)
+
+
+#endregion
+#region - Events
+
+
+    def _index_at(self, x, y):
+        columns = self._columns()
+        column = x // self.cell_size
+        if column >= columns:
+            return None
+        index = int((y + self.offset) // self.cell_size) * columns + int(column)
+        return index if 0 <= index < len(self.paths) else None
+
+
+    def _on_click(self, event):
+        index = self._index_at(event.x, event.y)
+        if index is not None and self.on_click:
+            self.on_click(index, event)
+
+
+    def _on_double_click(self, event):
+        index = self._index_at(event.x, event.y)
+        if index is not None and self.on_activate:
+            self.on_activate(index)
+
+
+    def _on_configure(self, event):
+        # The column count may change, keep the current image in view
+        self.scroll_to(self.current_index)
+        self.redraw()
+
+
+    def _on_mousewheel(self, event):
+        self.offset -= int(event.delta / 120 * self.cell_size / 2)
+        self.redraw()
+
+
+    def _on_scrollbar(self, *args):
+        height = self.canvas.winfo_height()
+        content_height = -(-len(self.paths) // self._columns()) * self.cell_size
+        if args[0] == "moveto":
+            self.offset = int(float(args[1]) * content_height)
+        elif args[0] == "scroll":
+            step = height if args[2] == "pages" else self.cell_size // 2
+            self.offset += int(args[1]) * step
+        self.redraw()
+
+
+    @staticmethod
+    def is_range_click(event):
+        return bool(event.state & SHIFT_MASK)
+
+
+    @staticmethod
+    def is_toggle_click(event):
+        return bool(event.state & CONTROL_MASK)
+
+
+#endregion
@@ -0,0 +1,217 @@
+#region - Imports
+
+
+# First-party
+import os
+import time
+import ctypes
+import itertools
+import threading
+
+
+#endregion
+#region - Constants
+
+
+STAGING_FOLDER_NAME = ".IW_trash"
+MAX_UNDO_DELETES = 100  # Undo steps, a batch delete is one step
+PURGE_MAX_AGE_SECONDS = 24 * 60 * 60  # Staged files older than this are deleted for good
+PURGE_MAX_BYTES = 2 * 1024 ** 3  # Oldest staged files are deleted first once staging grows past this
+PURGE_BATCH_SIZE = 200  # Files removed per purge pass, the rest waits for the next pass
+FILE_ATTRIBUTE_HIDDEN = 0x02
+
+
+#endregion
+#region - StagedDelete
+
+
+class StagedDelete:
+    """A deleted file waiting in staging, with what is needed to put it back."""
+    def __init__(self, original_path, staged_path, record=None, index=None):
+        self.original_path = original_path
+        self.staged_path = staged_path
+        self.record = record  # Database record at the time of the delete, None if unknown
+        self.index = index  # List position at the time of the delete
+
+
+#endregion
+#region - TrashStaging
+
+
+class TrashStaging:
+    """
+    Deletes files by renaming them into a hidden staging folder of the watched folder.
+
+    The folder is on the same volume, so a delete is a single rename and can be
+    undone. Staged names start with the staging time in nanoseconds and a
+    sequence number, which keeps them unique and lets the purger order them
+    without reading any metadata. Only the purger removes file data, on a
+    worker thread, in batches.
+
+    Args:
+        folder (str): Watched folder, staging is created inside it
+        max_age (float): Seconds a staged file is kept
+        max_bytes (int): Total size of staging before the oldest files are purged early
+    """
+    def __init__(self, folder, max_age=PURGE_MAX_AGE_SECONDS, max_bytes=PURGE_MAX_BYTES):
+        self.folder = folder
+        self.staging_folder = os.path.join(folder, STAGING_FOLDER_NAME)
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.undo_stack = []
+        self._lock = threading.Lock()
+        self._sequence = itertools.count()
+        self._purging = False
+
+
+    def staging_path(self, file_path):
+        """Return a new unique path in staging for a file, safe to call from worker threads."""
+        self._ensure_folder()
+        return os.path.join(self.staging_folder, f"{time.time_ns()}.{next(self._sequence)}_{os.path.basename(file_path)}")
+
+
+    def stage(self, file_path, record=None, index=None):
+        """Move a file into staging and push it on the undo stack, raises OSError if it can't be moved."""
+        staged_path = self.staging_path(file_path)
+        os.replace(file_path, staged_path)
+        entry = StagedDelete(file_path, staged_path, record, index)
+        self.push([entry])
+        return entry
+
+
+    def push(self, entries):
+        """Add files already renamed into staging as one undo step."""
+        if not entries:
+            return
+        with self._lock:
+            self.undo_stack.append(list(entries))
+            del self.undo_stack[:-MAX_UNDO_DELETES]
+
+
+    def undo(self):
+        """
+        Move the files of the last undo step back and return their StagedDelete entries, empty if there is nothing to undo.
+
+        Entries whose name was taken meanwhile stay on the stack as their own
+        step. Entries whose staged file is gone are dropped, so the older steps
+        stay reachable. Raises OSError if none of the files could be restored.
+        """
+        restored, blocked, lost = [], [], []
+        # Renamed back under the lock, so the purger never removes a file that is being restored
+        with self._lock:
+            if not self.undo_stack:
+                return []
+            entries = self.undo_stack.pop()
+            for entry in entries:
+                # Never overwrite a file that took the name meanwhile, those entries stay undoable
+                if os.path.exists(entry.original_path):
+                    blocked.append(entry)
+                    continue
+                if not os.path.exists(entry.staged_path):
+                    lost.append(entry)  # Removed from staging, it can never come back
+                    continue
+                try:
+                    os.replace(entry.staged_path, entry.original_path)
+                except FileNotFoundError:
+                    lost.append(entry)
+                    continue
+                except OSError:
+                    blocked.append(entry)
+                    continue
+                restored.append(entry)
+            if blocked:
+                self.undo_stack.append(blocked)
+        for entry in lost:
+            print(f"ERROR: undo - {entry.staged_path} is gone, {os.path.basename(entry.original_path)} can't be restored")
+        if not restored:
+            if blocked:
+                raise FileExistsError(f"{os.path.basename(blocked[0].original_path)} could not be restored, the name is taken")
+            if lost:
+                raise FileNotFoundError(f"{os.path.basename(lost[0].original_path)} is no longer in staging and could not be restored")
+        return restored
+
+
+    def start_purge(self, on_finished=None):
+        """Purge expired files on a worker thread, on_finished(removed count) is called from that thread."""
+        with self._lock:
+            if self._purging:
+                return False
+            self._purging = True
+        def worker():
+            removed = 0
+            try:
+                removed = self.purge()
+            except Exception as e:
+                print(f"ERROR: start_purge - purging {self.staging_folder}: {e}")
+            finally:
+                with self._lock:
+                    self._purging = False
+            if on_finished:
+                on_finished(removed)
+        threading.Thread(target=worker, daemon=True).start()
+        return True
+
+
+    def purge(self, now=None):
+        """Delete up to one batch of staged files past the age or size limit, oldest first, and return the count."""
+        now = time.time_ns() if now is None else now
+        staged = []
+        try:
+            with os.scandir(self.staging_folder) as entries:
+                for entry in entries:
+                    staged_time = self._staged_time(entry.name)
+                    if staged_time is None:
+                        continue
+                    try:
+                        staged.append((staged_time, entry.path, entry.stat().st_size))
+                    except OSError:
+                        continue
+        except FileNotFoundError:
+            return 0
+        staged.sort()
+        total_bytes = sum(size for _, _, size in staged)
+        expired = []
+        for staged_time, staged_path, size in staged:
+            if len(expired) >= PURGE_BATCH_SIZE:
+                break
+            if (now - staged_time) / 1e9 < self.max_age and total_bytes <= self.max_bytes:
+                break
+            expired.append(staged_path)
+            total_bytes -= size
+        if not expired:
+            return 0
+        # Purged files can no longer be restored
+        expired_set = set(expired)
+        with self._lock:
+            steps = ([entry for entry in entries if entry.staged_path not in expired_set] for entries in self.undo_stack)
+            self.undo_stack = [entries for entries in steps if entries]
+        removed = 0
+        for staged_path in expired:
+            try:
+                os.remove(staged_path)
+                removed += 1
+            except FileNotFoundError:
+                continue  # Restored by an undo that took its step before the filter above
+            except OSError as e:
+                print(f"ERROR: purge - removing {staged_path}: {e}")
+        return removed
+
+
+    def _ensure_folder(self):
+        if os.path.isdir(self.staging_folder):
+            return
+        os.makedirs(self.staging_folder, exist_ok=True)
+        if os.name == "nt":
+            ctypes.windll.kernel32.SetFileAttributesW(self.staging_folder, FILE_ATTRIBUTE_HIDDEN)
+
+
+    @staticmethod
+    def _staged_time(name):
+        prefix, separator, _ = name.partition("_")
+        staged_time = prefix.partition(".")[0]
+        if not separator or not staged_time.isdigit():
+            return None
+        return int(staged_time)
+
+
+#endregion
@@ -0,0 +1,113 @@
+#region - Imports
+
+
+# First-party
+import os
+
+# Local
+from batch_operations import run_batch
+from file_operations import FileOperations
+from filter_cache import FilterCache, FilterQuery, find_matches
+from image_database_manager import DatabaseManager
+from image_manager import ImageManager
+from metadata_export import MetadataExport
+from progress_reporting import NullProgress
+
+
+#endregion
+#region - Constants
+
+
+VALID_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.tif', '.tiff')
+SAVED_FOLDER_NAME = "Saved Images"
+IMAGE_DB_FILENAME = "IW_database.json"
+IMAGE_INDEX_FILENAME = "IW_index.json"
+SAVED_SEARCHES_FILENAME = "IW_searches.json"
+FILTER_FIELDS = ("Positive Prompt", "Negative Prompt", "Steps", "Sampler", "Schedule type", "CFG scale", "Size", "Model")
+TEXT_EXPORT_FORMAT = "text"  # One .txt file per image, the other formats are the keys of EXPORT_FORMATS
+
+
+#endregion
+#region - WatchFolder
+
+
+class WatchFolder:
+    """
+    The index, database and file operations of one folder, with no Tk or display needed.
+
+    Reads and writes the same database and index snapshot files as the viewer,
+    so a folder indexed here opens without a rebuild. Progress goes to any
+    reporter with update and close, like ConsoleProgress.
+
+    Args:
+        folder (str): Folder holding the images
+    """
+    def __init__(self, folder):
+        self.folder = os.path.abspath(folder)
+        self.database_manager = DatabaseManager(None, self.folder, VALID_EXTENSIONS, IMAGE_DB_FILENAME, SAVED_FOLDER_NAME)
+        self.image_manager = ImageManager(self.folder, VALID_EXTENSIONS)
+        self.file_operations = FileOperations(self.folder, self.image_manager, SAVED_FOLDER_NAME, self.database_manager)
+        self.filter_cache = FilterCache()
+
+
+    def close(self):
+        """Write pending database changes and the index snapshot."""
+        self.database_manager.flush_pending_save()
+        self.image_manager.save_snapshot(os.path.join(self.folder, IMAGE_INDEX_FILENAME))
+
+
+#endregion
+#region - Commands
+
+
+    def index(self, workers=1, progress=None):
+        """Bring the database up to date with the folder and its Saved Images folder, and return the number of records."""
+        database = self.database_manager.update_database(progress=progress or NullProgress(), workers=workers)
+        self.close()
+        return len(database)
+
+
+    def query(self, filter_text="", fields=FILTER_FIELDS, include_saved=False):
+        """Return the paths matching a filter newest first, or every listed image for an empty filter."""
+        query = FilterQuery(filter_text, fields, include_saved)
+        if query.is_empty():
+            return list(self.image_manager.image_files)
+        # Like the viewer, skip records of files that are no longer in the folder
+        get_mtime = self.image_manager.get_mtime
+        is_saved_path = self.database_manager.is_saved_path
+        return [path for path in find_matches(self.database_manager, self.filter_cache, query, self.folder) if get_mtime(path) is not None or is_saved_path(path)]
+
+
+    def export(self, paths, destination, export_format="jsonl", progress=None):
+        """
+        Export the metadata of paths and return the finished batch, or None if there was nothing to export.
+
+        Args:
+            paths (list): Images to export
+            destination (str): Output file, or a folder for the text format
+            export_format (str): TEXT_EXPORT_FORMAT or a key of EXPORT_FORMATS
+            progress (object): Reporter with update and close
+        """
+        rows = self.file_operations.export_rows(paths)
+        if export_format == TEXT_EXPORT_FORMAT:
+            batch = self.file_operations.text_export_batch(rows, destination)
+            if batch is None:
+                return None
+            return run_batch(batch, progress or NullProgress(), "Exported")
+        if not rows:
+            return None
+        return run_batch(MetadataExport(rows, destination, export_format), progress or NullProgress(), "Exported", unit="rows")
+
+
+    def move(self, paths, target_folder, copy=False, workers=None, progress=None):
+        """Move or copy paths into a folder, the records follow the files, and return the finished batch."""
+        self.database_manager.load_database()
+        file_operations = self.file_operations
+        batch = file_operations.transfer_batch(paths, os.path.abspath(target_folder), copy, workers)
+        run_batch(batch, progress or NullProgress(), "Copied" if copy else "Moved")
+        file_operations.finish_transfer_batch(batch, copy)
+        self.close()
+        return batch
+
+
+#endregion
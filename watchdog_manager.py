@@ -1,28 +1,128 @@
 #region - Imports
 
 
-# Third-party
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
-from threading import Timer
+# First-party
+import os
+from threading import Timer, Lock
+
+
+#endregion
+#region - FileChanges
+
+
+class FileChanges:
+    """Coalesced set of file events collected between two debounce ticks."""
+    def __init__(self):
+        self.created = set()
+        self.removed = set()
+        self.moved = {}
+
+    def __bool__(self):
+        return bool(self.created or self.removed or self.moved)
+
+    def add_created(self, path):
+        self.removed.discard(path)
+        self.created.add(path)
+
+    def add_removed(self, path):
+        self.created.discard(path)
+        for src, dest in list(self.moved.items()):
+            if dest == path:
+                del self.moved[src]
+                self.removed.add(src)
+        self.removed.add(path)
+
+    def add_moved(self, src, dest):
+        self.removed.discard(dest)
+        if src in self.created:
+            # Created and renamed within the same tick, only the final name matters
+            self.created.discard(src)
+            self.created.add(dest)
+            return
+        for origin, target in self.moved.items():
+            if target == src:
+                self.moved[origin] = dest
+                return
+        self.moved[src] = dest
 
 
 #endregion
 #region - ImageEventHandler
 
 
-class ImageEventHandler(FileSystemEventHandler):
-    def __init__(self, update_callback):
-        super().__init__()
+class ImageEventHandler:
+    """
+    Watchdog event handler collecting image changes, flushed once events pause for debounce_time.
+
+    Observers only call dispatch, so this needs no watchdog base class and
+    watchdog is not imported until the first observer is created.
+    """
+    def __init__(self, folder_path, update_callback, valid_extensions=None):
+        self.folder_path = folder_path
         self.update_callback = update_callback
+        self.valid_extensions = valid_extensions
         self.timer = None
         self.debounce_time = 1  # One second delay
+        self.lock = Lock()
+        self.changes = FileChanges()
+        self._folder_key = os.path.normcase(os.path.abspath(folder_path))
+
+    def dispatch(self, event):
+        self.on_any_event(event)
 
     def on_any_event(self, event):
-        if self.timer:
-            self.timer.cancel()
-        self.timer = Timer(self.debounce_time, self.update_callback)
-        self.timer.start()
+        if event.is_directory or not self._record_event(event):
+            return
+        with self.lock:
+            if self.timer:
+                self.timer.cancel()
+            self.timer = Timer(self.debounce_time, self._flush)
+            self.timer.start()
+
+    def _record_event(self, event):
+        """Add the event to the pending changes, return False if it is not relevant."""
+        src = self._normalize_path(event.src_path)
+        if event.event_type == "moved":
+            dest = self._normalize_path(event.dest_path)
+            with self.lock:
+                if src and dest:
+                    self.changes.add_moved(src, dest)
+                elif src:
+                    self.changes.add_removed(src)
+                elif dest:
+                    self.changes.add_created(dest)
+                else:
+                    return False
+            return True
+        if not src:
+            return False
+        with self.lock:
+            if event.event_type in ("created", "modified", "closed"):
+                self.changes.add_created(src)
+            elif event.event_type == "deleted":
+                self.changes.add_removed(src)
+            else:
+                return False
+        return True
+
+    def _normalize_path(self, path):
+        """Return the path as the managers key it, or None if it is not a watched image."""
+        if isinstance(path, bytes):
+            path = os.fsdecode(path)
+        if not path:
+            return None
+        if self.valid_extensions and not path.lower().endswith(self.valid_extensions):
+            return None
+        if os.path.normcase(os.path.dirname(os.path.abspath(path))) != self._folder_key:
+            return None
+        return os.path.join(self.folder_path, os.path.basename(path))
+
+    def _flush(self):
+        with self.lock:
+            changes, self.changes = self.changes, FileChanges()
+            self.timer = None
+        if changes:
+            self.update_callback(changes)
 
 
 #endregion
@@ -30,9 +130,10 @@ class ImageEventHandler(FileSystemEventHandler):
 
 
 class WatchdogManager:
-    def __init__(self, folder_path, update_callback):
+    def __init__(self, folder_path, update_callback, valid_extensions=None):
         self.folder_path = folder_path
         self.update_callback = update_callback
+        self.valid_extensions = valid_extensions
         self.observer = None
 
 
@@ -43,7 +144,8 @@ class WatchdogManager:
 
 
     def create_observer(self):
-        event_handler = ImageEventHandler(self.update_callback)
+        from watchdog.observers import Observer  # Imported on first use, after the first image is shown
+        event_handler = ImageEventHandler(self.folder_path, self.update_callback, self.valid_extensions)
         observer = Observer()
         observer.schedule(event_handler, path=self.folder_path, recursive=False)
         return observer
@@ -56,15 +158,17 @@ class WatchdogManager:
                 self.observer.start()
         else:
             if self.observer:
-                self.observer.stop()
-                self.observer.join()
+                if self.observer.is_alive():
+                    self.observer.stop()
+                    self.observer.join()
                 self.observer = None
 
 
     def stop(self):
         if self.observer:
-            self.observer.stop()
-            self.observer.join()
+            if self.observer.is_alive():
+                self.observer.stop()
+                self.observer.join()
             self.observer = None
 
 